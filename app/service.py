@@ -0,0 +1,250 @@
+# app/service.py
+# Long-running prediction service: loads the model once and answers HTTP requests,
+# grouping concurrent lookups into micro-batches before each model call.
+# Append ?mode=fast to /predict or /predict/batch to use the linear surrogate instead.
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(root_dir / "scripts"))
+from predictor import load_model_package, predict_matrix, serving_model_path, to_input_matrix
+from prediction_cache import shared_cache
+from surrogate import MODES
+
+logger = logging.getLogger("bmp.service")
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+class MicroBatcher:
+    """Coalesces concurrent prediction requests into one model call.
+
+    A batch is flushed once `max_batch` rows are waiting or `window` seconds after
+    its first request arrived, whichever comes first. The model runs in a worker
+    thread so the event loop keeps collecting the next batch meanwhile.
+    """
+
+    def __init__(self, package, window=0.005, max_batch=256, cache=None):
+        self.package = package
+        self.window = window
+        self.max_batch = max_batch
+        self.cache = cache
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.rows = 0
+
+    async def predict(self, inputs):
+        """Queue an (n, n_inputs) matrix and wait for its (n, n_targets) predictions"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((inputs, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        rows = len(items[0][0])
+        deadline = loop.time() + self.window
+        while rows < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            rows += len(item[0])
+        return items
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            inputs = np.vstack([matrix for matrix, _ in items])
+            try:
+                predictions = await loop.run_in_executor(
+                    None, predict_matrix, inputs, self.package, self.cache
+                )
+            except Exception as e:
+                logger.exception("Batch of %d rows failed", len(inputs))
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(inputs)
+            offset = 0
+            for matrix, future in items:
+                if not future.done():
+                    future.set_result(predictions[offset:offset + len(matrix)])
+                offset += len(matrix)
+
+class PredictionService:
+    """Minimal HTTP/1.1 front end (keep-alive, JSON bodies) over a MicroBatcher"""
+
+    def __init__(self, package, model_path, window=0.005, max_batch=256, cache=shared_cache):
+        self.package = package
+        self.model_path = str(model_path)
+        self.batcher = MicroBatcher(package, window, max_batch, cache)
+
+    def _records(self, predictions):
+        targets = self.package["target_features"]
+        return [
+            {col: (None if np.isnan(value) else float(value)) for col, value in zip(targets, row)}
+            for row in predictions
+        ]
+
+    async def route(self, method, path, body, query=""):
+        if method == "GET" and path == "/health":
+            return HTTPStatus.OK, {
+                "status": "ok",
+                "model": self.model_path,
+                "fast_mode": self.package.get("surrogate") is not None,
+                "batches": self.batcher.batches,
+                "rows": self.batcher.rows,
+                "cache": self.batcher.cache.stats() if self.batcher.cache else None,
+            }
+
+        if method != "POST" or path not in ("/predict", "/predict/batch"):
+            return HTTPStatus.NOT_FOUND, {"error": f"No route for {method} {path}"}
+
+        mode = parse_qs(query).get("mode", ["accurate"])[-1]
+        if mode not in MODES:
+            return HTTPStatus.BAD_REQUEST, {"error": f"mode must be one of: {', '.join(MODES)}"}
+        if mode == "fast" and self.package.get("surrogate") is None:
+            return HTTPStatus.BAD_REQUEST, {"error": "This model has no fast-mode surrogate"}
+
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {e}"}
+
+        if path == "/predict":
+            if not isinstance(payload, dict):
+                return HTTPStatus.BAD_REQUEST, {"error": "Expected a JSON object of input measurements"}
+            rows = [payload]
+        else:
+            rows = payload.get("rows") if isinstance(payload, dict) else payload
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                return HTTPStatus.BAD_REQUEST, {"error": "Expected {\"rows\": [{...}, ...]}"}
+            if not rows:
+                return HTTPStatus.OK, {"predictions": []}
+
+        try:
+            inputs = to_input_matrix(rows, self.package["input_features"])
+        except (TypeError, ValueError) as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+
+        if mode == "fast":
+            # One small matrix multiply: cheaper inline than a trip through the batcher
+            predictions = predict_matrix(inputs, self.package, mode="fast")
+        else:
+            predictions = await self.batcher.predict(inputs)
+        records = self._records(predictions)
+        if path == "/predict":
+            return HTTPStatus.OK, {"predictions": records[0]}
+        return HTTPStatus.OK, {"predictions": records}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    path, _, query = target.partition("?")
+                    status, payload = await self.route(method, path, body, query)
+                except Exception as e:
+                    logger.exception("Request %s %s failed", method, target)
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+async def serve(model_path, host="127.0.0.1", port=8000, window=0.005, max_batch=256):
+    started = time.perf_counter()
+    package = load_model_package(str(model_path))
+    logger.info("Loaded %s in %.1f ms", model_path, (time.perf_counter() - started) * 1000)
+
+    service = PredictionService(package, model_path, window, max_batch)
+    batch_task = asyncio.create_task(service.batcher.run())
+    server = await asyncio.start_server(service.handle, host, port)
+    logger.info("Serving on http://%s:%d (window %.1f ms, max batch %d)", host, port, window * 1000, max_batch)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="Body measurement prediction service")
+    parser.add_argument("--model", default=None,
+                        help="model .pkl or native artifact directory (default: the native export of the v5 model)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--window-ms", type=float, default=5.0, help="micro-batch collection window")
+    parser.add_argument("--max-batch", type=int, default=256, help="flush once this many rows are waiting")
+    args = parser.parse_args()
+    # Pickle-free by default: retrain_model exports the native artifact next to the .pkl
+    model_path = args.model or serving_model_path()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    print("🚀 Starting prediction service...")
+    try:
+        asyncio.run(serve(model_path, args.host, args.port, args.window_ms / 1000, args.max_batch))
+    except KeyboardInterrupt:
+        print("🏁 Stopped.")
+
+if __name__ == "__main__":
+    main()
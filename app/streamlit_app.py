@@ -1,8 +1,9 @@
 # app/streamlit_app.py
+import logging
+import sys
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
 from pathlib import Path
 
 # ---------------------------
@@ -10,15 +11,26 @@ from pathlib import Path
 # ---------------------------
 current_file = Path(__file__).resolve()
 root_dir = current_file.parent.parent
-model_path = root_dir / "models/body_measurement_predictor_v5.pkl"
+
+# Shared prediction engine lives in scripts/ (reruns reuse the process, so add it once)
+scripts_dir = str(root_dir / "scripts")
+if scripts_dir not in sys.path:
+    sys.path.append(scripts_dir)
+from predictor import load_model_package, predict_batch, serving_model_path
+from prediction_cache import shared_cache
+from body_index import bodies_frame, default_index_path, load_body_index, nearest_bodies
+
+# The native artifact retrain_model writes next to the .pkl (the .pkl if it hasn't been exported)
+model_path = Path(serving_model_path(str(root_dir / "models/body_measurement_predictor_v5.pkl")))
 
 # ---------------------------
 # 2. LOAD MODEL WITH METADATA
 # ---------------------------
+# Streamlit re-runs this file on every interaction; the package stays loaded in the
+# predictor registry and is only re-read when the model changes on disk.
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 try:
-    hybrid_model = joblib.load(model_path)
-    model = hybrid_model["model"]
-    fashion_rules = hybrid_model["rules"]
+    hybrid_model = load_model_package(str(model_path))
     input_features = hybrid_model["input_features"]
     target_features = hybrid_model["target_features"]
 except Exception as e:
@@ -31,24 +43,6 @@ except Exception as e:
 def convert_units(value, to_inches):
     return round(float(value)/2.54, 1) if to_inches else round(float(value), 1)
 
-def gentle_rule_adjustment(raw_pred, user_inputs):
-    adjusted = raw_pred.copy()
-    for measurement, rules in fashion_rules.items():
-        if measurement in input_features:
-            continue  # Skip user-provided measurements
-            
-        for rule in rules:
-            try:
-                if rule["type"] == "proportion" and rule["base"] in user_inputs:
-                    base_value = user_inputs[rule["base"]]
-                    if not pd.isna(base_value):
-                        rule_value = base_value * rule["multiplier"]
-                        current = adjusted.get(measurement, rule_value)
-                        adjusted[measurement] = (current * 0.8) + (rule_value * 0.2)
-            except Exception:
-                continue
-    return adjusted
-
 # ---------------------------
 # 4. STREAMLIT UI
 # ---------------------------
@@ -59,6 +53,11 @@ st.title("👗 Body Measurement Predictor")
 unit = st.selectbox("Measurement Units", ["Centimeters (cm)", "Inches (in)"])
 to_inches = unit == "Inches (in)"
 
+# Fast mode: linear approximation of the model, only offered when the package has one
+fast_mode = hybrid_model.get("surrogate") is not None and st.checkbox(
+    "⚡ Fast mode (linear approximation)", value=False
+)
+
 # ---------------------------
 # 5. USER INPUTS
 # ---------------------------
@@ -103,13 +102,10 @@ if len(selected) >= 2 and st.button("🚀 Predict All Measurements"):
         full_input = {col: np.nan for col in input_features}
         full_input.update(user_input)
         
-        # Predict
-        input_df = pd.DataFrame([full_input])[input_features]
-        raw_pred = model.predict(input_df)[0]
-        pred_results = dict(zip(target_features, raw_pred))
-        
-        # Apply rules to predictions only
-        adjusted_preds = gentle_rule_adjustment(pred_results, full_input)
+        # Predict (model + rule blend) through the shared batch engine
+        adjusted_preds = predict_batch(
+            [full_input], hybrid_model, cache=shared_cache, mode="fast" if fast_mode else "accurate"
+        ).iloc[0].to_dict()
         final_results = {**full_input, **adjusted_preds}
         
         # Display
@@ -160,6 +156,19 @@ if len(selected) >= 2 and st.button("🚀 Predict All Measurements"):
                     st.progress(float(np.clip(progress, 0.0, 1.0)))
                     st.caption(f"{convert_units(value, to_inches):.1f} {'in' if to_inches else 'cm'}")
 
+        # Closest measured bodies (built by scripts/body_index.py; skipped if not built)
+        index_path = default_index_path(str(model_path))
+        if Path(index_path).exists():
+            with st.expander("👯 Closest Measured Bodies"):
+                body_index = load_body_index(index_path)
+                query = np.array([[full_input[col] for col in body_index["input_features"]]], dtype=float)
+                distances, rows = nearest_bodies(query, body_index, k=5)
+                neighbours = bodies_frame(body_index, distances[0], rows[0])
+                if to_inches:
+                    neighbours[body_index["columns"]] = (neighbours[body_index["columns"]] / 2.54).round(1)
+                st.caption("Distance is in standard deviations over the measurements you provided")
+                st.dataframe(neighbours, hide_index=True, use_container_width=True)
+
     except Exception as e:
         st.error(f"⚠️ Error: {str(e)}")
 elif len(selected) < 2:
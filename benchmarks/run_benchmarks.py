@@ -0,0 +1,289 @@
+# benchmarks/run_benchmarks.py
+# Times every pipeline stage and the prediction path on seeded synthetic data and
+# saves the results as JSON, so runs from different commits can be compared.
+#
+#   python benchmarks/run_benchmarks.py                      # 1k..1M rows, all benchmarks
+#   python benchmarks/run_benchmarks.py --only predict --sizes 1000,100000
+#   python benchmarks/run_benchmarks.py --compare benchmarks/results/<old>.json
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(root_dir / "scripts"))
+sys.path.append(str(root_dir / "notebooks"))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from synthetic_data import make_history, make_measurements, make_rule_sheets
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+BENCHMARKS = {}
+
+def benchmark(name, max_rows=None, fixed_rows=None):
+    """Register `setup(n_rows, workdir) -> (prepare, run)`.
+
+    prepare() builds fresh arguments outside the timed region; run(*args) is timed.
+    `max_rows` skips sizes that would take too long; `fixed_rows` runs one size only.
+    """
+    def register(setup):
+        BENCHMARKS[name] = {"setup": setup, "max_rows": max_rows, "fixed_rows": fixed_rows}
+        return setup
+    return register
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the scripts' status prints while timing"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+@benchmark("clean_data.apply_fashion_rules")
+def bench_apply_fashion_rules(n_rows, workdir):
+    import clean_data
+    data = make_measurements(n_rows, missing=0.3)
+    return (lambda: (data.copy(),)), clean_data.apply_fashion_rules
+
+@benchmark("clean_data.fill_historical")
+def bench_fill_historical(n_rows, workdir):
+    import clean_data
+    history = make_history(n_rows)
+    return (lambda: (history.copy(),)), clean_data.fill_historical
+
+@benchmark("history_store.add_visits")
+def bench_add_visits(n_rows, workdir):
+    from history_store import DATE_COL, HistoryStore
+    # A fixed batch of new sessions against a growing history: the cost should stay flat
+    store = HistoryStore.from_history(make_history(n_rows))
+    visits = make_history(300, seed=1)
+    visits[DATE_COL] += np.timedelta64(365, "D")
+    return (lambda: (visits,)), store.add_visits
+
+@benchmark("augment_data.augment_data")
+def bench_augment_data(n_rows, workdir):
+    import augment_data
+    # Originals + 4 copies each ≈ n_rows output rows
+    source = make_measurements(max(n_rows // 5, 1), missing=0.1)
+    return (lambda: (source,)), (lambda df: augment_data.augment_data(df, seed=0))
+
+@benchmark("excel_to_rules.generate_fashion_rules", max_rows=100_000)
+def bench_generate_fashion_rules(n_rows, workdir):
+    # The converter's module-level basicConfig would append to the tracked
+    # rule_conversion.log in the project root; configure logging into the workdir first
+    logging.basicConfig(filename=Path(workdir) / "rule_conversion.log", level=logging.INFO, force=True)
+    import excel_to_rules
+    from data_store import write_table
+
+    sheet_dir = Path(workdir) / f"rules_{n_rows}"
+    (sheet_dir / "data").mkdir(parents=True, exist_ok=True)
+    relationships, descriptions = make_rule_sheets(n_rows)
+    write_table(relationships, sheet_dir / "data" / "measurement_relationships.xlsx")
+    write_table(descriptions, sheet_dir / "data" / "measurement_descriptions.xlsx")
+
+    def run():
+        # The converter works on paths relative to the project root
+        previous = os.getcwd()
+        os.chdir(sheet_dir)
+        try:
+            with quiet():
+                excel_to_rules.generate_fashion_rules(str(sheet_dir / "fashion_rules.py"), incremental=False)
+        finally:
+            os.chdir(previous)
+
+    return (lambda: ()), run
+
+@benchmark("retrain_model.retrain_hybrid_model", max_rows=100_000)
+def bench_retrain(n_rows, workdir):
+    from data_store import write_table
+    from retrain_model import retrain_hybrid_model
+
+    data_path = Path(workdir) / f"train_{n_rows}.xlsx"
+    model_path = Path(workdir) / f"model_{n_rows}.pkl"
+    write_table(make_measurements(n_rows), data_path)
+
+    def run():
+        with quiet():
+            retrain_hybrid_model(data_path=str(data_path), model_path=str(model_path))
+
+    return (lambda: ()), run
+
+_bench_package = None
+
+def bench_package(workdir):
+    """Model package trained once on 1k synthetic rows, shared by the predict benchmarks"""
+    global _bench_package
+    if _bench_package is None:
+        from data_store import write_table
+        from predictor import load_model_package
+        from retrain_model import retrain_hybrid_model
+
+        data_path = Path(workdir) / "predict_train.xlsx"
+        model_path = Path(workdir) / "predict_model.pkl"
+        write_table(make_measurements(1_000), data_path)
+        with quiet():
+            retrain_hybrid_model(data_path=str(data_path), model_path=str(model_path))
+        _bench_package = load_model_package(str(model_path))
+    return _bench_package
+
+def _request_rows(n_rows, package, seed=1):
+    """Inputs as the app sends them: height plus 2-4 circumferences, the rest NaN"""
+    rng = np.random.default_rng(seed)
+    inputs = make_measurements(n_rows, seed=seed)[package["input_features"]].to_numpy(dtype=float)
+    optional = inputs[:, 1:]
+    optional[rng.random(optional.shape) < 0.3] = np.nan
+    return inputs
+
+@benchmark("predict.single_row", fixed_rows=1)
+def bench_single_row(n_rows, workdir):
+    from predictor import gentle_rule_adjustment
+
+    package = bench_package(workdir)
+    row = _request_rows(1, package)
+    booster, rules = package["booster"], package["compiled_rules"]
+
+    def run():
+        raw = booster.inplace_predict(np.ascontiguousarray(row, dtype=np.float32), validate_features=False)
+        gentle_rule_adjustment(np.asarray(raw, dtype=float).reshape(1, -1), row, rules)
+
+    return (lambda: ()), run
+
+@benchmark("predict.batch")
+def bench_batch(n_rows, workdir):
+    from predictor import predict_batch
+
+    package = bench_package(workdir)
+    rows = _request_rows(n_rows, package)
+    return (lambda: ()), (lambda: predict_batch(rows, package))
+
+@benchmark("predict.batch_fast")
+def bench_batch_fast(n_rows, workdir):
+    from predictor import predict_batch
+
+    package = bench_package(workdir)
+    rows = _request_rows(n_rows, package)
+    return (lambda: ()), (lambda: predict_batch(rows, package, mode="fast"))
+
+def time_benchmark(prepare, run, min_repeats=3, max_repeats=50, budget=2.0):
+    """Repeat until `budget` seconds are spent (at least `min_repeats`); returns timings"""
+    timings = []
+    spent = 0.0
+    while len(timings) < max_repeats and (len(timings) < min_repeats or spent < budget):
+        args = prepare()
+        started = time.perf_counter()
+        run(*args)
+        elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+        spent += elapsed
+    return timings
+
+def run_metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=root_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+
+    versions = {}
+    for module in ("numpy", "pandas", "xgboost", "pyarrow"):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+def compare(current, baseline_path, threshold):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["name"], r["rows"]): r for r in baseline["results"]}
+
+    print(f"\n📊 Compared with {baseline['meta']['commit']} ({baseline_path})")
+    print(f"{'benchmark':<40} {'rows':>9} {'before (s)':>11} {'after (s)':>11} {'ratio':>7}")
+    regressions = 0
+    for result in current["results"]:
+        before = previous.get((result["name"], result["rows"]))
+        if before is None:
+            continue
+        ratio = result["median_s"] / before["median_s"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = " ⚠️ slower"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = " ✅ faster"
+        print(f"{result['name']:<40} {result['rows']:>9} {before['median_s']:>11.4f} "
+              f"{result['median_s']:>11.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline and prediction benchmarks")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated row counts")
+    parser.add_argument("--only", default=None, help="run benchmarks whose name contains this text")
+    parser.add_argument("--no-caps", action="store_true", help="ignore per-benchmark max_rows")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds of timing per case")
+    parser.add_argument("--output", default=None, help="JSON path (default: results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change flagged as regression")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    report = {"meta": run_metadata(), "results": []}
+    print(f"🚀 Benchmarks at {report['meta']['commit']}")
+    with tempfile.TemporaryDirectory(prefix="bmp_bench_") as workdir:
+        for name, spec in BENCHMARKS.items():
+            if args.only and args.only not in name:
+                continue
+            case_sizes = [spec["fixed_rows"]] if spec["fixed_rows"] else sizes
+            for n_rows in case_sizes:
+                if spec["max_rows"] and n_rows > spec["max_rows"] and not args.no_caps:
+                    print(f"⏭️ {name} @ {n_rows} rows skipped (max_rows={spec['max_rows']})")
+                    continue
+                prepare, run = spec["setup"](n_rows, workdir)
+                timings = time_benchmark(prepare, run, budget=args.budget)
+                result = {
+                    "name": name,
+                    "rows": n_rows,
+                    "median_s": statistics.median(timings),
+                    "min_s": min(timings),
+                    "max_s": max(timings),
+                    "repeats": len(timings),
+                }
+                report["results"].append(result)
+                print(f"⏱️ {name:<40} {n_rows:>9} rows  median {result['median_s']:.4f}s "
+                      f"({result['repeats']} runs)")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['meta']['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results saved to: {output}")
+
+    if args.compare:
+        regressions = compare(report, args.compare, args.threshold)
+        if regressions:
+            print(f"⚠️ {regressions} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
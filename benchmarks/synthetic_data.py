@@ -0,0 +1,113 @@
+# benchmarks/synthetic_data.py
+# Seeded generator of fake bodies with the same columns as data/model_ready_measurements.xlsx.
+import numpy as np
+import pandas as pd
+
+# column -> (driver, ratio, noise sd in cm); drivers are generated first
+COLUMN_MODEL = {
+    "bust_height_cm": ("height_cm", 0.155, 1.0),
+    "breast_distance_cm": ("bust_cm", 0.2, 1.0),
+    "bust_radius_cm": ("bust_cm", 0.1, 0.6),
+    "front_waist_length_cm": ("height_cm", 0.26, 1.2),
+    "back_waist_length_cm": ("height_cm", 0.245, 1.2),
+    "back_width_cm": ("bust_cm", 0.37, 1.5),
+    "back_shoulder_cm": ("height_cm", 0.235, 1.2),
+    "hand_entry_cm": ("height_cm", 0.12, 0.8),
+    "elbow_length_cm": ("height_cm", 0.21, 1.0),
+    "sleeve_length_cm": ("height_cm", 0.36, 1.5),
+    "dress_knee_length_cm": ("height_cm", 0.58, 2.0),
+    "dress_full_length_cm": ("height_cm", 0.85, 2.5),
+    "skirt_knee_length_cm": ("height_cm", 0.36, 1.5),
+    "skirt_full_length_cm": ("height_cm", 0.62, 2.0),
+    "flare_out_cm": ("height_cm", 0.3, 1.5),
+    "walking_step_cm": ("hip_cm", 0.95, 3.0),
+    "pant_full_length_cm": ("height_cm", 0.62, 2.0),
+    "pant_knee_length_cm": ("height_cm", 0.36, 1.5),
+    "pant_calf_length_cm": ("height_cm", 0.46, 1.5),
+    "pant_ankle_length_cm": ("height_cm", 0.57, 2.0),
+    "pant_high_ankle_length_cm": ("height_cm", 0.54, 2.0),
+    "foot_entry_cm": ("height_cm", 0.19, 1.0),
+    "around_elbow_cm": ("bust_cm", 0.27, 1.2),
+    "around_neck_cm": ("bust_cm", 0.38, 1.2),
+    "around_thigh_cm": ("hip_cm", 0.58, 2.0),
+    "around_knee_cm": ("hip_cm", 0.38, 1.5),
+    "around_calf_cm": ("hip_cm", 0.36, 1.5),
+    "around_high_ankle_cm": ("hip_cm", 0.24, 1.0),
+    "around_ankle_cm": ("hip_cm", 0.23, 1.0),
+    "waist_hip_distance_cm": ("height_cm", 0.12, 1.0),
+    "neck_sweetheart_front_distance_cm": ("height_cm", 0.12, 1.0),
+    "shoulder_underbust_distance_cm": ("height_cm", 0.2, 1.0),
+    "pant_hip_cm": ("hip_cm", 1.02, 1.5),
+    "pant_waist_cm": ("waist_cm", 1.01, 1.5),
+    "around_armhole_cm": ("bust_cm", 0.44, 1.5),
+    "around_wrist_cm": ("height_cm", 0.095, 0.6),
+    "pant_body_rise_cm": ("height_cm", 0.16, 1.0),
+    "pant_outseam_cm": ("height_cm", 0.62, 2.0),
+    "pant_inseam_cm": ("height_cm", 0.46, 2.0),
+    "around_bicep_cm": ("bust_cm", 0.31, 1.5),
+    "neck_sweetheart_back_distance_cm": ("height_cm", 0.1, 1.0),
+    "pant_waist_hip_seam_cm": ("height_cm", 0.12, 1.0),
+}
+
+def make_measurements(n_rows, seed=0, missing=0.0):
+    """n_rows fake bodies; `missing` blanks that share of the non-id cells"""
+    rng = np.random.default_rng(seed)
+    data = {
+        "height_cm": np.clip(rng.normal(163, 7, n_rows), 140, 200),
+        "bust_cm": np.clip(rng.normal(92, 9, n_rows), 65, 150),
+    }
+    data["chest_cm"] = data["bust_cm"] - 2 + rng.normal(0, 2, n_rows)
+    data["id"] = np.arange(1, n_rows + 1)
+    data["waist_cm"] = 0.78 * data["bust_cm"] + rng.normal(0, 5, n_rows)
+    data["hip_cm"] = 1.08 * data["bust_cm"] + rng.normal(0, 5, n_rows)
+    for col, (driver, ratio, sd) in COLUMN_MODEL.items():
+        data[col] = ratio * data[driver] + rng.normal(0, sd, n_rows)
+
+    df = pd.DataFrame(data)
+    measurement_cols = [col for col in df.columns if col != "id"]
+    df[measurement_cols] = df[measurement_cols].round(1)
+    if missing:
+        df[measurement_cols] = df[measurement_cols].mask(rng.random((n_rows, len(measurement_cols))) < missing)
+    return df
+
+def make_history(n_rows, visits=3, seed=0, missing=0.2):
+    """Measurement sessions for n_rows // visits customers, as clean_data.load_data returns them"""
+    rng = np.random.default_rng(seed)
+    df = make_measurements(n_rows, seed=seed, missing=missing)
+    df["id"] = np.arange(n_rows) // visits + 1
+    df["Date Measured (YYYY-MM-DD)"] = (
+        pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n_rows), unit="D")
+    )
+    return df.sort_values(by=["id", "Date Measured (YYYY-MM-DD)"]).reset_index(drop=True)
+
+def make_rule_sheets(n_rules, seed=0):
+    """(relationships, descriptions) sheets shaped like the data/measurement_*.xlsx inputs"""
+    rng = np.random.default_rng(seed)
+    n_columns = max(48, n_rules // 4)
+    names = np.array([f"m{i}_cm" for i in range(n_columns)])
+    targets = rng.integers(0, n_columns, n_rules)
+    bases = rng.integers(0, n_columns, n_rules)
+    extra = rng.integers(0, n_columns, n_rules)
+    kinds = rng.random(n_rules)
+
+    formulas = []
+    for target, base, other, kind in zip(names[targets], names[bases], names[extra], kinds):
+        coefficient = round(float(rng.uniform(0.1, 2.0)), 2)
+        if kind < 0.7:
+            formulas.append(f"{target} = {coefficient} * {base}")
+        elif kind < 0.85:
+            formulas.append(f"{target} = {base} + {coefficient * 10:.1f}")
+        else:
+            formulas.append(f"{target} = {base} - {coefficient} * {other}")
+
+    relationships = pd.DataFrame({
+        "Typical Formula": formulas,
+        "Priority": rng.integers(1, 4, n_rules),
+        "Tolerance": rng.uniform(0.01, 1.0, n_rules).round(2),
+        "Notes": "Synthetic rule",
+    })
+    descriptions = pd.DataFrame({
+        "Measurement Name": names,
+        "Description": [f"Synthetic measurement {name}" for name in names],
+    })
+    return relationships, descriptions
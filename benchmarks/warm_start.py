@@ -0,0 +1,94 @@
+# benchmarks/warm_start.py
+# Time-to-model and held-out error of warm-start updates against a full retrain, on a
+# seeded synthetic "existing data + this week's customers" split.
+#
+#   python benchmarks/warm_start.py
+#   python benchmarks/warm_start.py --base-rows 50000 --new-rows 500 --trees 50 --replay 0.1
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(root_dir / "scripts"))
+sys.path.append(str(root_dir / "notebooks"))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import numpy as np
+import pandas as pd
+
+from run_benchmarks import quiet
+from synthetic_data import make_measurements
+
+def held_out_mae(model_path, test):
+    """Mean absolute error over all targets, after the rule blend, on rows never trained on"""
+    from predictor import load_model_package, predict_batch
+
+    package = load_model_package(str(model_path))
+    predictions = predict_batch(test[package["input_features"]], package)
+    errors = (predictions - test[package["target_features"]]).abs()
+    return float(np.nanmean(errors.to_numpy()))
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    with quiet():
+        func(*args, **kwargs)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-start update vs full retrain")
+    parser.add_argument("--base-rows", type=int, default=20_000, help="rows the current model was trained on")
+    parser.add_argument("--new-rows", type=int, default=500, help="newly measured rows")
+    parser.add_argument("--test-rows", type=int, default=5_000)
+    parser.add_argument("--trees", type=int, default=50, help="trees added by the warm-start update")
+    parser.add_argument("--replay", type=float, default=0.1, help="fraction of old rows replayed")
+    parser.add_argument("--shift", type=float, default=2.0,
+                        help="cm added to the new customers' heights, so the update has something to learn")
+    args = parser.parse_args()
+
+    from data_store import write_table
+    from retrain_model import retrain_hybrid_model, update_hybrid_model
+
+    base = make_measurements(args.base_rows, seed=0)
+    new = make_measurements(args.new_rows, seed=1)
+    new["height_cm"] += args.shift
+    test = pd.concat([
+        make_measurements(args.test_rows // 2, seed=2),
+        make_measurements(args.test_rows - args.test_rows // 2, seed=3).assign(
+            height_cm=lambda df: df["height_cm"] + args.shift
+        ),
+    ], ignore_index=True)
+
+    with tempfile.TemporaryDirectory(prefix="bmp_warm_") as workdir:
+        workdir = Path(workdir)
+        base_path, new_path, all_path = workdir / "base.xlsx", workdir / "new.xlsx", workdir / "all.xlsx"
+        write_table(base, base_path)
+        write_table(new, new_path)
+        write_table(pd.concat([base, new], ignore_index=True), all_path)
+
+        print(f"🤖 Training the starting model on {args.base_rows} rows...")
+        base_model = workdir / "base.pkl"
+        with quiet():
+            retrain_hybrid_model(data_path=str(base_path), model_path=str(base_model))
+
+        runs = {
+            "stale (no update)": (0.0, base_model),
+            "full retrain": (timed(retrain_hybrid_model, data_path=str(all_path),
+                                   model_path=str(workdir / "full.pkl")), workdir / "full.pkl"),
+            "warm start, new rows": (timed(update_hybrid_model, str(new_path), model_path=str(base_model),
+                                           n_estimators=args.trees, output_path=str(workdir / "warm.pkl")),
+                                     workdir / "warm.pkl"),
+            f"warm start, {args.replay:.0%} replay": (
+                timed(update_hybrid_model, str(new_path), model_path=str(base_model),
+                      base_data_path=str(base_path), replay=args.replay, n_estimators=args.trees,
+                      output_path=str(workdir / "replay.pkl")),
+                workdir / "replay.pkl"),
+        }
+
+        print(f"\n{'strategy':<26} {'time to model (s)':>18} {'held-out MAE (cm)':>18}")
+        for name, (seconds, model_path) in runs.items():
+            print(f"{name:<26} {seconds:>18.2f} {held_out_mae(model_path, test):>18.3f}")
+
+if __name__ == "__main__":
+    main()
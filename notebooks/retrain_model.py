@@ -1,55 +1,415 @@
 # notebooks/retrain_model.py
+import argparse
 import sys
 import os
+import time
 import pandas as pd
 import numpy as np
 import joblib
 from xgboost import XGBRegressor
 
-# Allow imports from project root
+# Allow imports from project root and scripts/
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from fashion_rules import CUSTOM_RULES
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from predictor import (
+    export_native, input_patterns, native_artifact_path, pattern_mask,
+    predict_matrix, serving_booster, serving_package,
+)
+from data_store import file_hash, read_table
+from instrumentation import stage
+from rules_artifact import blend_rules, load_rules_artifact
+from surrogate import fit_surrogate, with_missing_patterns
 
-def retrain_hybrid_model():
-    # Path configuration
-    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_path = os.path.join(root_dir, "data", "model_ready_measurements.xlsx")
-    model_path = os.path.join(root_dir, "models", "body_measurement_predictor_v5.pkl")
-    
-    # Create models directory if missing
-    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+INPUT_FEATURES = ["height_cm", "bust_cm", "waist_cm", "hip_cm", "chest_cm"]
 
-    print("📂 Loading dataset...")
-    df = pd.read_excel(data_path)
+TRAINING_CONFIG = {
+    "n_estimators": 300,
+    "learning_rate": 0.1,
+    "tree_method": "hist",
+    "n_jobs": os.cpu_count(),
+    # "one_output_per_tree": a tree per target each round; "multi_output_tree": one tree
+    # with vector leaves for all targets (fewer, larger trees)
+    "multi_strategy": "one_output_per_tree",
+    "early_stopping_rounds": 20,
+    # Share of rows held out to pick the round count and for the per-target MAE report;
+    # the saved model is then refit on every row for that many rounds
+    "validation_fraction": 0.1,
+    "random_state": 0,
+}
+MULTI_STRATEGIES = ["one_output_per_tree", "multi_output_tree"]
 
-    # Clean and validate data
+def load_training_data(data_path):
+    """Read a workbook and keep the rows that have at least one measurement"""
+    df = read_table(data_path)
     measurement_cols = [col for col in df.columns if col.endswith("_cm")]
     df[measurement_cols] = df[measurement_cols].astype(float)
-    df = df.dropna(subset=measurement_cols, how='all')
-
-    # Define model inputs/outputs
-    input_features = ["height_cm", "bust_cm", "waist_cm", "hip_cm", "chest_cm"]
-    target_features = [col for col in measurement_cols if col not in input_features]
-
-    print(f"🤖 Training on {len(df)} samples with {len(target_features)} targets...")
-    model = XGBRegressor(
-        n_estimators=300,
-        learning_rate=0.1,
-        verbosity=1,
-        enable_categorical=True
-    )
-    model.fit(df[input_features], df[target_features])
-
-    # Save hybrid model package
-    hybrid_model = {
-        "model": model,
-        "rules": CUSTOM_RULES,
-        "input_features": input_features,
-        "target_features": target_features,
-        "data_columns": measurement_cols
+    return df.dropna(subset=measurement_cols, how='all'), measurement_cols
+
+def check_targets(df, target_features, data_path):
+    """Refuse a workbook that lacks target columns: XGBoost can't train on all-NaN labels"""
+    missing = [col for col in target_features if col not in df.columns]
+    if missing:
+        raise ValueError(f"{os.path.basename(data_path)} has no column for {len(missing)} target(s) "
+                         f"of the model: {', '.join(missing)}")
+
+def lineage_entry(mode, data_path, rows, trees_added, total_trees, **extra):
+    return {
+        "mode": mode,
+        "data": os.path.basename(data_path),
+        "data_sha256": file_hash(data_path),
+        "rows": int(rows),
+        "trees_added": int(trees_added),
+        "total_trees": int(total_trees),
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **extra,
+    }
+
+def holdout_split(df, config):
+    """(validation, train) for a training config; validation is empty when the fraction is 0"""
+    if not config["validation_fraction"]:
+        return df.iloc[:0], df
+    validation = df.sample(frac=config["validation_fraction"], random_state=config["random_state"])
+    return validation, df.drop(validation.index)
+
+def fit_model(df, input_features, target_features, config=None, refit=True):
+    """Fit one regressor with the training config; returns (model, report).
+
+    The held-out rows only pick the number of rounds (early stopping) and give the
+    MAE report: with `refit` the returned model is trained again on every row for
+    that many rounds.
+    The report holds fit time, kept trees, serialized model size and per-target
+    MAE on the held-out rows (None when validation_fraction is 0), measured on the
+    early-stopped model before the refit.
+    """
+    config = {**TRAINING_CONFIG, **(config or {})}
+    params = {key: value for key, value in config.items() if key != "validation_fraction"}
+    validation, train = holdout_split(df, config)
+    if not len(validation):
+        params["early_stopping_rounds"] = None
+
+    model = XGBRegressor(verbosity=1, enable_categorical=True, **params)
+    started = time.perf_counter()
+    if len(validation):
+        model.fit(train[input_features], train[target_features],
+                  eval_set=[(validation[input_features], validation[target_features])], verbose=False)
+    else:
+        model.fit(train[input_features], train[target_features])
+    seconds = time.perf_counter() - started
+
+    booster = serving_booster(model)
+    mae = None
+    if len(validation):
+        predictions = booster.inplace_predict(
+            np.ascontiguousarray(validation[input_features], dtype=np.float32), validate_features=False
+        ).reshape(len(validation), -1)
+        errors = np.abs(predictions - validation[target_features].to_numpy(dtype=float))
+        mae = dict(zip(target_features, np.nanmean(errors, axis=0).round(4).tolist()))
+
+    if refit and len(validation):
+        rounds = booster.num_boosted_rounds()
+        model = XGBRegressor(verbosity=1, enable_categorical=True,
+                             **{**params, "n_estimators": rounds, "early_stopping_rounds": None})
+        model.fit(df[input_features], df[target_features])
+        seconds = time.perf_counter() - started
+        booster, train = model.get_booster(), df
+
+    report = {
+        "strategy": config["multi_strategy"],
+        "fit_seconds": round(seconds, 3),
+        "trees": booster.num_boosted_rounds(),
+        "size_kb": round(len(booster.save_raw("ubj")) / 1024, 1),
+        "train_rows": len(train),
+        "validation_rows": len(validation),
+        "mae": mae,
     }
+    return model, report
+
+def print_training_report(reports):
+    """Summary line per strategy, then per-target held-out MAE side by side"""
+    print(f"\n{'strategy':<22} {'fit (s)':>9} {'trees':>7} {'size (KB)':>10} {'mean MAE':>9} {'worst MAE':>10}")
+    for report in reports:
+        mae = report["mae"] or {}
+        mean = np.mean(list(mae.values())) if mae else float("nan")
+        worst = max(mae.values()) if mae else float("nan")
+        print(f"{report['strategy']:<22} {report['fit_seconds']:>9.2f} {report['trees']:>7} "
+              f"{report['size_kb']:>10.1f} {mean:>9.3f} {worst:>10.3f}")
+
+    if all(report["mae"] for report in reports):
+        print(f"\n{'target':<36}" + "".join(f"{report['strategy']:>22}" for report in reports))
+        for target in reports[0]["mae"]:
+            print(f"{target:<36}" + "".join(f"{report['mae'][target]:>22.3f}" for report in reports))
+
+def compare_strategies(data_path=None, strategies=MULTI_STRATEGIES, config=None):
+    """Train once per multi-target strategy on the same split and print the report"""
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data_path = data_path or os.path.join(root_dir, "data", "model_ready_measurements.xlsx")
+    df, measurement_cols = load_training_data(data_path)
+    target_features = [col for col in measurement_cols if col not in INPUT_FEATURES]
+
+    reports = []
+    for strategy in strategies:
+        print(f"🤖 Training with multi_strategy={strategy}...")
+        with stage(f"retrain_model.compare_strategies.{strategy}", rows=len(df)):
+            _, report = fit_model(df, INPUT_FEATURES, target_features, {**(config or {}), "multi_strategy": strategy},
+                                  refit=False)
+        reports.append(report)
+    print_training_report(reports)
+    return reports
+
+def pattern_label(features):
+    return "+".join(col.replace("_cm", "") for col in features)
+
+def fit_pattern_models(df, input_features, target_features, general_booster, config=None, min_rows=50):
+    """One model per allowed input pattern, trained only on the inputs that pattern has.
+
+    Returns {mask: entry} for predictor.route_predict. Each report also holds the
+    all-features model's MAE on the same held-out rows with the absent inputs NaN.
+    """
+    config = {**TRAINING_CONFIG, **(config or {})}
+    patterns = {}
+    print(f"\n{'input pattern':<30} {'rows':>8} {'trees':>6} {'size (KB)':>10} {'MAE':>7} {'NaN-fed MAE':>12}")
+    for features in input_patterns(input_features):
+        rows = df.dropna(subset=features)
+        if len(rows) < min_rows:
+            print(f"⏭️ {pattern_label(features)}: only {len(rows)} complete rows, left to the main model")
+            continue
+        model, report = fit_model(rows, features, target_features, config)
+
+        validation, _ = holdout_split(rows, config)
+        report["mean_mae"] = report["general_mae"] = None
+        if len(validation):
+            truth = validation[target_features].to_numpy(dtype=float)
+            report["mean_mae"] = round(float(np.nanmean(list(report["mae"].values()))), 4)
+            # The main model may have trained on some of these rows, so this comparison is
+            # tilted in its favour
+            nan_fed = validation[input_features].to_numpy(dtype=np.float32)
+            nan_fed[:, [col not in features for col in input_features]] = np.nan
+            general = general_booster.inplace_predict(nan_fed, validate_features=False).reshape(len(validation), -1)
+            report["general_mae"] = round(float(np.nanmean(np.abs(general - truth))), 4)
+
+        patterns[pattern_mask(features, input_features)] = {
+            "features": features,
+            "columns": [input_features.index(col) for col in features],
+            "model": model,
+            "report": report,
+        }
+        print(f"{pattern_label(features):<30} {report['train_rows']:>8} {report['trees']:>6} "
+              f"{report['size_kb']:>10.1f} {report['mean_mae'] or float('nan'):>7.3f} "
+              f"{report['general_mae'] or float('nan'):>12.3f}")
+    return patterns
+
+# Training inputs kept in the package so a warm start can refit the surrogate over
+# the training distribution when the base workbook isn't given
+SURROGATE_SAMPLE_ROWS = 20_000
+
+def surrogate_sample(df, input_features, seed=0):
+    if len(df) > SURROGATE_SAMPLE_ROWS:
+        df = df.sample(n=SURROGATE_SAMPLE_ROWS, random_state=seed)
+    return df[input_features].to_numpy(dtype=np.float32)
+
+def fit_fast_surrogate(hybrid_model, df, copies=2, max_rows=200_000, seed=0):
+    """Fit the fast-mode ridge surrogate to the full model's blended outputs.
+
+    Uses the training inputs plus copies with optional inputs blanked, so partial
+    requests are covered; at most `max_rows` source rows are used. Rows without
+    measured targets (the retained input sample) only count towards the fit.
+    """
+    input_features, target_features = hybrid_model["input_features"], hybrid_model["target_features"]
+    if len(df) > max_rows:
+        df = df.sample(n=max_rows, random_state=seed)
+    inputs = with_missing_patterns(df[input_features].to_numpy(dtype=float), copies=copies, seed=seed)
+    truth = np.tile(df[target_features].to_numpy(dtype=float), (copies + 1, 1))
+    outputs = predict_matrix(inputs, serving_package(hybrid_model))
+
+    surrogate = fit_surrogate(inputs, outputs, target_features, truth=truth, seed=seed)
+    print(f"⚡ Fast-mode surrogate: mean MAE {np.mean(list(surrogate['mae_vs_model'].values())):.3f} cm vs model, "
+          f"{np.nanmean(list(surrogate['mae_vs_truth'].values())):.3f} cm vs measured")
+    return surrogate
+
+def save_model_package(hybrid_model, model_path):
+    """Write the joblib package and the native artifact next to it"""
     joblib.dump(hybrid_model, model_path)
     print(f"✅ Model v5 saved to: {model_path}")
 
+    # Pickle-free export for serving (booster UBJSON + JSON header)
+    native_dir = export_native(serving_package(hybrid_model), native_artifact_path(model_path))
+    print(f"✅ Native artifact saved to: {native_dir}")
+
+def retrain_hybrid_model(data_path=None, model_path=None, config=None, patterns=True):
+    # Path configuration
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data_path = data_path or os.path.join(root_dir, "data", "model_ready_measurements.xlsx")
+    model_path = model_path or os.path.join(root_dir, "models", "body_measurement_predictor_v5.pkl")
+
+    # Create models directory if missing
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+
+    with stage("retrain_model.retrain_hybrid_model"):
+        print("📂 Loading dataset...")
+        with stage("load_dataset") as s:
+            df, measurement_cols = load_training_data(data_path)
+            s.set_rows(len(df))
+        rules = load_rules_artifact()
+
+        # Define model inputs/outputs
+        input_features = INPUT_FEATURES
+        target_features = [col for col in measurement_cols if col not in input_features]
+
+        print(f"🤖 Training on {len(df)} samples with {len(target_features)} targets...")
+        with stage("fit", rows=len(df)):
+            model, report = fit_model(df, input_features, target_features, config)
+        print_training_report([report])
+
+        # Save hybrid model package
+        hybrid_model = {
+            "model": model,
+            "rules_digest": rules["digest"],
+            "compiled_rules": blend_rules(rules, input_features, target_features),
+            "input_features": input_features,
+            "target_features": target_features,
+            "data_columns": measurement_cols,
+            "training_report": report,
+            "lineage": [lineage_entry("full", data_path, report["train_rows"], report["trees"], report["trees"])],
+        }
+        if patterns:
+            print("🧩 Training one model per input pattern...")
+            with stage("fit_patterns", rows=len(df)):
+                hybrid_model["patterns"] = fit_pattern_models(
+                    df, input_features, target_features, serving_booster(model), config
+                )
+        with stage("fit_surrogate", rows=len(df)):
+            hybrid_model["surrogate"] = fit_fast_surrogate(hybrid_model, df)
+        hybrid_model["surrogate_inputs"] = surrogate_sample(df, input_features)
+        with stage("save_package"):
+            save_model_package(hybrid_model, model_path)
+
+    return hybrid_model
+
+def update_hybrid_model(new_data_path, model_path=None, base_data_path=None, replay=0.0,
+                        n_estimators=50, output_path=None, seed=0):
+    """Continue boosting an existing package on newly measured rows instead of retraining.
+
+    Adds `n_estimators` trees fitted to the new rows, optionally mixed with a `replay`
+    fraction of the rows in `base_data_path` so the update doesn't drift towards the
+    latest batch. Targets and inputs stay those of the existing package.
+    """
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    model_path = model_path or os.path.join(root_dir, "models", "body_measurement_predictor_v5.pkl")
+    output_path = output_path or model_path
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    with stage("retrain_model.update_hybrid_model"):
+        print(f"📂 Loading model package: {model_path}")
+        base_package = joblib.load(model_path)
+        base_model = base_package["model"]
+        input_features = base_package["input_features"]
+        target_features = base_package["target_features"]
+        base_booster = serving_booster(base_model)
+        base_trees = base_booster.num_boosted_rounds()
+
+        print("📂 Loading new measurements...")
+        with stage("load_dataset") as s:
+            new_df, _ = load_training_data(new_data_path)
+            check_targets(new_df, target_features, new_data_path)
+            train_df = new_df
+            replay_rows = 0
+            base_df = None
+            if replay and not base_data_path:
+                print("⚠️ Replay needs the previous training data; updating on the new rows only")
+            if base_data_path:
+                base_df, _ = load_training_data(base_data_path)
+                check_targets(base_df, target_features, base_data_path)
+            if replay and base_df is not None:
+                replay_df = base_df.sample(frac=replay, random_state=seed)
+                replay_rows = len(replay_df)
+                train_df = pd.concat([replay_df, new_df], ignore_index=True)
+            # An input column the workbook lacks is just a missing input (NaN) to XGBoost
+            train_df = train_df.reindex(columns=input_features + target_features)
+            s.set_rows(len(train_df))
+
+        print(f"🤖 Adding {n_estimators} trees on {len(new_df)} new + {replay_rows} replayed rows "
+              f"(base model has {base_trees})...")
+        # No validation split here: the new batch is too small to early-stop on
+        model = XGBRegressor(**{**base_model.get_params(), "n_estimators": n_estimators,
+                                "early_stopping_rounds": None})
+        with stage("fit", rows=len(train_df)):
+            model.fit(train_df[input_features], train_df[target_features], xgb_model=base_booster)
+
+        patterns = {}
+        for mask, entry in base_package.get("patterns", {}).items():
+            rows = train_df.dropna(subset=entry["features"])
+            if not len(rows):
+                patterns[mask] = entry
+                continue
+            pattern_model = XGBRegressor(**{**entry["model"].get_params(), "n_estimators": n_estimators,
+                                            "early_stopping_rounds": None})
+            with stage(f"fit_pattern.{pattern_label(entry['features'])}", rows=len(rows)):
+                pattern_model.fit(rows[entry["features"]], rows[target_features],
+                                  xgb_model=serving_booster(entry["model"]))
+            patterns[mask] = {**entry, "model": pattern_model}
+
+        hybrid_model = {
+            **base_package,
+            "model": model,
+            "patterns": patterns,
+            "lineage": list(base_package.get("lineage", [])) + [lineage_entry(
+                "warm_start", new_data_path, len(train_df), n_estimators, base_trees + n_estimators,
+                new_rows=len(new_df), replay_rows=replay_rows,
+                replay_data=os.path.basename(base_data_path) if replay_rows else None,
+                parent_sha256=file_hash(model_path),
+            )],
+        }
+        # The old surrogate mimics the old trees; refit it over the training distribution
+        # (base data, else the package's retained inputs) plus the new rows, not the batch alone
+        if base_df is not None:
+            surrogate_df = pd.concat([base_df, new_df], ignore_index=True)
+        elif base_package.get("surrogate_inputs") is not None:
+            retained = pd.DataFrame(base_package["surrogate_inputs"], columns=input_features, dtype=float)
+            surrogate_df = pd.concat([retained, new_df], ignore_index=True)
+        else:
+            print("⚠️ No base data or retained inputs; refitting the fast-mode surrogate on the new rows only")
+            surrogate_df = new_df
+        surrogate_df = surrogate_df.reindex(columns=input_features + target_features)
+        with stage("fit_surrogate", rows=len(surrogate_df)):
+            hybrid_model["surrogate"] = fit_fast_surrogate(hybrid_model, surrogate_df)
+        hybrid_model["surrogate_inputs"] = surrogate_sample(surrogate_df, input_features, seed)
+        with stage("save_package"):
+            save_model_package(hybrid_model, output_path)
+
+    return hybrid_model
+
 if __name__ == "__main__":
-    retrain_hybrid_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train and save the hybrid model package")
+    parser.add_argument("--data", default=None, help="training workbook (default: data/model_ready_measurements.xlsx)")
+    parser.add_argument("--model", default=None, help="output .pkl (default: models/body_measurement_predictor_v5.pkl)")
+    parser.add_argument("--update", metavar="NEW_DATA",
+                        help="continue boosting the existing --model on this workbook instead of retraining")
+    parser.add_argument("--replay", type=float, default=0.0,
+                        help="with --update: fraction of the --data rows to mix into the update")
+    parser.add_argument("--trees", type=int, default=50, help="with --update: trees to add")
+    parser.add_argument("--output", default=None, help="with --update: where to save (default: overwrite --model)")
+    parser.add_argument("--strategy", choices=MULTI_STRATEGIES, default=TRAINING_CONFIG["multi_strategy"])
+    parser.add_argument("--jobs", type=int, default=TRAINING_CONFIG["n_jobs"], help="XGBoost threads")
+    parser.add_argument("--no-early-stopping", action="store_true",
+                        help="train all n_estimators rounds on every row")
+    parser.add_argument("--no-patterns", action="store_true",
+                        help="skip the per-input-pattern models (requests then all go to the main model)")
+    parser.add_argument("--compare-strategies", action="store_true",
+                        help="only print time/size/MAE for each multi-target strategy; saves nothing")
+    args = parser.parse_args()
+    config = {"multi_strategy": args.strategy, "n_jobs": args.jobs}
+    if args.no_early_stopping:
+        config.update(early_stopping_rounds=None, validation_fraction=0.0)
+
+    if args.compare_strategies:
+        compare_strategies(args.data, config=config)
+    elif args.update:
+        try:
+            update_hybrid_model(args.update, model_path=args.model, base_data_path=args.data,
+                                replay=args.replay, n_estimators=args.trees, output_path=args.output)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    else:
+        retrain_hybrid_model(data_path=args.data, model_path=args.model, config=config,
+                             patterns=not args.no_patterns)
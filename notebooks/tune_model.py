@@ -0,0 +1,263 @@
+# notebooks/tune_model.py
+# Hyperparameter search for the hybrid model: random candidates, successive halving over
+# boosting rounds, every fit in a process pool. The train/validation matrices are copied
+# once into shared memory and the workers map them instead of receiving pickled copies.
+#
+#   python notebooks/tune_model.py                        # 27 candidates, 3 rungs, save winner
+#   python notebooks/tune_model.py --method random --trials 12 --max-rounds 300
+#   python notebooks/tune_model.py --latency-weight 1.0   # favour faster models
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import xgboost as xgb
+from xgboost import XGBRegressor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from retrain_model import INPUT_FEATURES, MULTI_STRATEGIES, TRAINING_CONFIG, load_training_data, retrain_hybrid_model
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (kind, *bounds); "log" samples uniformly in log space
+SEARCH_SPACE = {
+    "learning_rate": ("log", 0.02, 0.3),
+    "max_depth": ("int", 3, 8),
+    "min_child_weight": ("log", 0.5, 10.0),
+    "subsample": ("uniform", 0.6, 1.0),
+    "colsample_bytree": ("uniform", 0.6, 1.0),
+    "reg_lambda": ("log", 0.1, 10.0),
+    "multi_strategy": ("choice", MULTI_STRATEGIES),
+}
+
+def sample_candidate(rng, space=SEARCH_SPACE):
+    params = {}
+    for name, (kind, *bounds) in space.items():
+        if kind == "log":
+            params[name] = round(float(np.exp(rng.uniform(np.log(bounds[0]), np.log(bounds[1])))), 4)
+        elif kind == "int":
+            params[name] = int(rng.integers(bounds[0], bounds[1] + 1))
+        elif kind == "uniform":
+            params[name] = round(float(rng.uniform(bounds[0], bounds[1])), 3)
+        else:
+            params[name] = bounds[0][int(rng.integers(len(bounds[0])))]
+    return params
+
+class SharedArrays:
+    """Numpy arrays copied once into named shared-memory blocks.
+
+    `specs` (name, shape, dtype per array) is all a worker needs to map them.
+    """
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.specs = {}
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[key] = (block.name, array.shape, array.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        return False
+
+_worker_blocks = []
+_worker_arrays = {}
+_worker_threads = 1
+
+def _init_worker(specs, threads):
+    global _worker_threads
+    _worker_threads = threads
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(block)  # keep the mapping alive for the worker's lifetime
+        _worker_arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+def single_row_latency_us(booster, row, repeat=200):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        booster.inplace_predict(row, validate_features=False)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+def measure_latency(results, row):
+    """Time each result's booster on one row, one after another in this process.
+
+    Workers fit in parallel and would contend for the CPU while timing, so latency is
+    only measured here, once the pool is done, with boosters loaded the way serving does.
+    """
+    for result in results:
+        booster = xgb.Booster()
+        booster.load_model(result.pop("model"))
+        result["latency_us"] = round(single_row_latency_us(booster, row), 1)
+    return results
+
+def evaluate_candidate(task):
+    """Fit one candidate for `rounds` rounds on the shared matrices and score it.
+
+    The fitted booster comes back as raw bytes under "model" for measure_latency.
+    """
+    trial, params, rounds = task
+    x_train, y_train = _worker_arrays["x_train"], _worker_arrays["y_train"]
+    x_val, y_val = _worker_arrays["x_val"], _worker_arrays["y_val"]
+
+    model = XGBRegressor(
+        n_estimators=rounds, tree_method="hist", n_jobs=_worker_threads,
+        random_state=TRAINING_CONFIG["random_state"], verbosity=0, **params,
+    )
+    started = time.perf_counter()
+    model.fit(x_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    booster = model.get_booster()
+    predictions = booster.inplace_predict(x_val, validate_features=False).reshape(len(x_val), -1)
+    mae = float(np.nanmean(np.abs(predictions - y_val)))
+    raw = booster.save_raw("ubj")
+    return {
+        "trial": trial,
+        "params": params,
+        "rounds": rounds,
+        "mae": round(mae, 4),
+        "fit_seconds": round(fit_seconds, 3),
+        "size_kb": round(len(raw) / 1024, 1),
+        "model": raw,
+    }
+
+def rank_candidates(results, latency_weight):
+    """Sort by mae/best_mae + latency_weight * latency/best_latency; mark the Pareto front"""
+    best_mae = min(result["mae"] for result in results)
+    best_latency = min(result["latency_us"] for result in results)
+    for result in results:
+        result["score"] = round(
+            result["mae"] / best_mae + latency_weight * result["latency_us"] / best_latency, 4
+        )
+        result["pareto"] = not any(
+            other["mae"] <= result["mae"] and other["latency_us"] <= result["latency_us"]
+            and (other["mae"] < result["mae"] or other["latency_us"] < result["latency_us"])
+            for other in results
+        )
+    return sorted(results, key=lambda result: result["score"])
+
+def successive_halving(pool, candidates, min_rounds, max_rounds, eta):
+    """Train every candidate briefly, keep the best 1/eta by MAE, give survivors eta× the rounds.
+
+    Returns (last rung's results, every result). The last rung is the leaderboard:
+    all of its candidates were trained with the same number of rounds. Only the last
+    rung keeps its "model" bytes; ranking by MAE needs no latency before that.
+    """
+    survivors = list(enumerate(candidates))
+    rounds = min_rounds
+    history = []
+    while True:
+        print(f"🔁 Rung: {len(survivors)} candidate(s) × {rounds} rounds")
+        results = list(pool.map(evaluate_candidate, [(trial, params, rounds) for trial, params in survivors]))
+        history.extend(results)
+        if len(survivors) <= 1 or rounds >= max_rounds:
+            return results, history
+        for result in results:
+            del result["model"]
+        results.sort(key=lambda result: result["mae"])
+        survivors = [(result["trial"], result["params"]) for result in results[:max(1, len(results) // eta)]]
+        rounds = min(rounds * eta, max_rounds)
+
+def print_leaderboard(results, limit=10):
+    print(f"\n{'#':>2} {'trial':>5} {'MAE (cm)':>9} {'latency (µs)':>13} {'fit (s)':>8} {'size (KB)':>10} "
+          f"{'score':>7} {'pareto':>6}  params")
+    for rank, result in enumerate(results[:limit], 1):
+        params = ", ".join(f"{key}={value}" for key, value in result["params"].items())
+        print(f"{rank:>2} {result['trial']:>5} {result['mae']:>9.3f} {result['latency_us']:>13.1f} "
+              f"{result['fit_seconds']:>8.2f} {result['size_kb']:>10.1f} {result['score']:>7.3f} "
+              f"{'✓' if result['pareto'] else '':>6}  {params}")
+
+def tune_hybrid_model(data_path=None, model_path=None, trials=27, method="halving", min_rounds=50,
+                      max_rounds=450, eta=3, processes=None, latency_weight=0.25, seed=0,
+                      leaderboard_path=None, save=True):
+    data_path = data_path or os.path.join(ROOT_DIR, "data", "model_ready_measurements.xlsx")
+    model_path = model_path or os.path.join(ROOT_DIR, "models", "body_measurement_predictor_v5.pkl")
+    leaderboard_path = leaderboard_path or os.path.join(os.path.dirname(model_path), "tuning_leaderboard.json")
+
+    print("📂 Loading dataset...")
+    df, measurement_cols = load_training_data(data_path)
+    target_features = [col for col in measurement_cols if col not in INPUT_FEATURES]
+    validation = df.sample(frac=TRAINING_CONFIG["validation_fraction"], random_state=TRAINING_CONFIG["random_state"])
+    train = df.drop(validation.index)
+
+    rng = np.random.default_rng(seed)
+    candidates = [sample_candidate(rng) for _ in range(trials)]
+    if method == "random":
+        min_rounds = max_rounds
+    processes = processes or min(trials, os.cpu_count() or 1)
+    threads = max(1, (os.cpu_count() or 1) // processes)
+
+    print(f"🤖 Searching {trials} candidates ({method}) on {len(train)} rows, "
+          f"{processes} worker(s) × {threads} thread(s)...")
+    started = time.perf_counter()
+    arrays = {
+        "x_train": train[INPUT_FEATURES].to_numpy(dtype=np.float32),
+        "y_train": train[target_features].to_numpy(dtype=np.float32),
+        "x_val": validation[INPUT_FEATURES].to_numpy(dtype=np.float32),
+        "y_val": validation[target_features].to_numpy(dtype=np.float32),
+    }
+    with SharedArrays(arrays) as shared, ProcessPoolExecutor(
+        processes, initializer=_init_worker, initargs=(shared.specs, threads)
+    ) as pool:
+        final, history = successive_halving(pool, candidates, min_rounds, max_rounds, eta)
+    print(f"⏱️ Search finished in {time.perf_counter() - started:.1f}s ({len(history)} fits)")
+    print(f"⏱️ Timing {len(final)} finalist(s) one at a time...")
+    measure_latency(final, arrays["x_val"][:1])
+
+    leaderboard = rank_candidates(final, latency_weight)
+    print_leaderboard(leaderboard)
+    winner = leaderboard[0]
+
+    os.makedirs(os.path.dirname(os.path.abspath(leaderboard_path)), exist_ok=True)
+    with open(leaderboard_path, "w", encoding="utf-8") as f:
+        json.dump({"data": os.path.basename(data_path), "method": method, "latency_weight": latency_weight,
+                   "seed": seed, "leaderboard": leaderboard, "history": history}, f, indent=2)
+    print(f"💾 Leaderboard saved to: {leaderboard_path}")
+
+    if save:
+        print(f"🏆 Retraining trial {winner['trial']} on the full dataset...")
+        # Exactly the evaluated model: all rows, all rounds, no early-stopping holdout
+        retrain_hybrid_model(data_path, model_path, config={
+            **winner["params"], "n_estimators": winner["rounds"],
+            "early_stopping_rounds": None, "validation_fraction": 0.0,
+        })
+    return winner
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter search for the hybrid model")
+    parser.add_argument("--data", default=None, help="training workbook (default: data/model_ready_measurements.xlsx)")
+    parser.add_argument("--model", default=None, help="where the winner is saved (default: models/body_measurement_predictor_v5.pkl)")
+    parser.add_argument("--method", choices=["halving", "random"], default="halving",
+                        help="successive halving over rounds, or plain random search at --max-rounds")
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--min-rounds", type=int, default=50)
+    parser.add_argument("--max-rounds", type=int, default=450)
+    parser.add_argument("--eta", type=int, default=3, help="halving factor")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--latency-weight", type=float, default=0.25,
+                        help="weight of relative single-row latency against relative MAE in the ranking")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--leaderboard", default=None, help="JSON path (default: next to the model)")
+    parser.add_argument("--no-save", action="store_true", help="only print and save the leaderboard")
+    args = parser.parse_args()
+
+    tune_hybrid_model(args.data, args.model, trials=args.trials, method=args.method, min_rounds=args.min_rounds,
+                      max_rounds=args.max_rounds, eta=args.eta, processes=args.processes,
+                      latency_weight=args.latency_weight, seed=args.seed, leaderboard_path=args.leaderboard,
+                      save=not args.no_save)
@@ -1,161 +1,107 @@
 # augment_data.py
+import argparse
+import os
+from itertools import chain
 import pandas as pd
-import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 
+from data_store import DATA_DIR, read_table, write_table
+from instrumentation import instrumented, stage
+from rule_engine import apply_fashion_rules
+from synthetic_dataset import PERTURB_COLUMNS, SyntheticDataset, generate_parallel
+
+@instrumented("load_data")
 def load_data():
-    input_path = r"C:\Users\User\Documents\my_project\body-measurement-predictor\data\rounded_measurements.xlsx"
-    return pd.read_excel(input_path)
+    input_path = os.path.join(DATA_DIR, "rounded_measurements.xlsx")
+    return read_table(input_path)
+
+def generate_synthetic(df, copies=4, noise_range=(-2, 2), perturb_columns=PERTURB_COLUMNS,
+                       chunk_size=100_000, seed=None):
+    """Yield the copies × N synthetic block in chunks of at most `chunk_size` rows.
 
-def perturb_row(row, perturb_columns, noise_range=(-2, 2)):
-    synthetic_row = row.copy()
-    for col in perturb_columns:
-        if pd.notnull(synthetic_row[col]):
-            noise = np.random.uniform(*noise_range)
-            synthetic_row[col] = round(synthetic_row[col] + noise, 1)  # Round to 1 decimal
-    return synthetic_row
+    Synthetic row i is a noisy copy of source row i // copies, in the same order as
+    the old per-row loop. Noise is counter-based (see SyntheticDataset), so a given
+    seed yields the same rows whatever the chunk size.
+    """
+    dataset = SyntheticDataset(df, copies, noise_range, perturb_columns, seed)
+    for start in range(0, len(dataset), chunk_size):
+        yield dataset[start:start + chunk_size]
 
-def apply_fashion_rules(data):
-    rules = {
-        # Height Rules
-        "height_cm": [
-            {"formula": lambda row: row["front_waist_length_cm"] / 0.26, "inputs": ["front_waist_length_cm"], "priority": 1},
-            {"formula": lambda row: row["skirt_knee_length_cm"] / 0.4, "inputs": ["skirt_knee_length_cm"], "priority": 2},
-            {"formula": lambda row: row["around_thigh_cm"] / 0.4, "inputs": ["around_thigh_cm"], "priority": 3}
-        ],
-        
-        # Upper Body Rules
-        "shoulder_underbust_distance_cm": [
-            {"formula": lambda row: row["bust_height_cm"] + row["bust_radius_cm"], "inputs": ["bust_height_cm", "bust_radius_cm"], "priority": 1}
-        ],
-        
-        # Arm Measurements
-        "around_elbow_cm": [
-            {"formula": lambda row: 0.85 * row["around_bicep_cm"], "inputs": ["around_bicep_cm"], "priority": 1}
-        ],
-        "around_bicep_cm": [
-            {"formula": lambda row: row["around_elbow_cm"] / 0.85, "inputs": ["around_elbow_cm"], "priority": 1}
-        ],
-        
-        # Wrist/Hand Rules
-        "around_wrist_cm": [
-            {"formula": lambda row: 0.85 * row["hand_entry_cm"], "inputs": ["hand_entry_cm"], "priority": 1}
-        ],
-        "hand_entry_cm": [
-            {"formula": lambda row: row["around_wrist_cm"] / 0.85, "inputs": ["around_wrist_cm"], "priority": 1}
-        ],
-        
-        # Dress/Elbow Rules
-        "elbow_length_cm": [
-            {"formula": lambda row: 0.23 * row["height_cm"], "inputs": ["height_cm"], "priority": 1}
-        ],
-        "dress_knee_length_cm": [
-            {"formula": lambda row: row["front_waist_length_cm"] + row["skirt_knee_length_cm"], "inputs": ["front_waist_length_cm", "skirt_knee_length_cm"], "priority": 1}
-        ],
-        
-        # Full Length Rules
-        "dress_full_length_cm": [
-            {"formula": lambda row: 0.9 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
-            {"formula": lambda row: row["front_waist_length_cm"] + row["skirt_full_length_cm"], "inputs": ["front_waist_length_cm", "skirt_full_length_cm"], "priority": 2}
-        ],
-        
-        # Skirt Rules
-        "skirt_knee_length_cm": [
-            {"formula": lambda row: 0.4 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
-            {"formula": lambda row: 0.6 * row["skirt_full_length_cm"], "inputs": ["skirt_full_length_cm"], "priority": 2}
-        ],
-        "skirt_full_length_cm": [
-            {"formula": lambda row: 0.67 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
-            {"formula": lambda row: row["skirt_knee_length_cm"] / 0.6, "inputs": ["skirt_knee_length_cm"], "priority": 2}
-        ],
-        
-        # Flare/Walking Rules
-        "flare_out_cm": [
-            {"formula": lambda row: row["skirt_knee_length_cm"] - 8, "inputs": ["skirt_knee_length_cm"], "priority": 1}
-        ],
-        "walking_step_cm": [
-            {"formula": lambda row: row["hip_cm"] - 5, "inputs": ["hip_cm"], "priority": 1}
-        ],
-        
-        # Pants Rules
-        "pant_waist_cm": [
-            {"formula": lambda row: row["waist_cm"] * 1, "inputs": ["waist_cm"], "priority": 1}
-        ],
-        "pant_hip_cm": [
-            {"formula": lambda row: row["hip_cm"] * 1, "inputs": ["hip_cm"], "priority": 1}
-        ],
-        "pant_waist_hip_seam_cm": [
-            {"formula": lambda row: row["waist_hip_distance_cm"] * 1, "inputs": ["waist_hip_distance_cm"], "priority": 1}
-        ],
-        "pant_body_rise_cm": [
-            {"formula": lambda row: 0.35 * row["waist_cm"], "inputs": ["waist_cm"], "priority": 1},
-            {"formula": lambda row: row["pant_outseam_cm"] - row["pant_inseam_cm"], "inputs": ["pant_outseam_cm", "pant_inseam_cm"], "priority": 2}
-        ],
-        "pant_outseam_cm": [
-            {"formula": lambda row: row["pant_ankle_length_cm"] * 1, "inputs": ["pant_ankle_length_cm"], "priority": 1},
-            {"formula": lambda row: row["pant_inseam_cm"] + row["pant_body_rise_cm"], "inputs": ["pant_inseam_cm", "pant_body_rise_cm"], "priority": 2}
-        ],
-        "pant_inseam_cm": [
-            {"formula": lambda row: row["pant_outseam_cm"] - row["pant_body_rise_cm"], "inputs": ["pant_outseam_cm", "pant_body_rise_cm"], "priority": 1}
-        ],
-        "pant_full_length_cm": [
-            {"formula": lambda row: row["skirt_full_length_cm"] * 1, "inputs": ["skirt_full_length_cm"], "priority": 1}
-        ],
-        
-        # Leg Measurements
-        "around_thigh_cm": [
-            {"formula": lambda row: 0.45 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
-            {"formula": lambda row: 0.6 * row["hip_cm"], "inputs": ["hip_cm"], "priority": 2}
-        ],
-        "around_knee_cm": [
-            {"formula": lambda row: 0.65 * row["around_thigh_cm"], "inputs": ["around_thigh_cm"], "priority": 1},
-            {"formula": lambda row: 1.5 * row["around_ankle_cm"], "inputs": ["around_ankle_cm"], "priority": 2}
-        ],
-        "around_calf_cm": [
-            {"formula": lambda row: row["around_thigh_cm"] / 1.7, "inputs": ["around_thigh_cm"], "priority": 1}
-        ],
-        "around_ankle_cm": [
-            {"formula": lambda row: 0.5 * row["around_thigh_cm"], "inputs": ["around_thigh_cm"], "priority": 1}
-        ]
-    }
+def finalize_chunk(chunk):
+    """Fill gaps with the fashion rules, then round ALL numeric columns to 1 decimal"""
+    chunk = apply_fashion_rules(chunk)
+    numeric_cols = chunk.select_dtypes(include=['number']).columns
+    chunk[numeric_cols] = chunk[numeric_cols].round(1)
+    return chunk
 
-    for target_col in rules:
-        sorted_rules = sorted(rules[target_col], key=lambda x: x["priority"])
-        for index, row in data.iterrows():
-            if pd.isnull(row[target_col]):
-                for rule in sorted_rules:
-                    if all(pd.notnull(row[col]) for col in rule["inputs"]):
-                        data.at[index, target_col] = rule["formula"](row)
-                        break
-    return data
+def augment_data(df, copies=4, noise_range=(-2, 2), seed=None):
+    synthetic = generate_synthetic(df, copies=copies, noise_range=noise_range, seed=seed)
+    augmented_df = pd.concat([df, *synthetic], ignore_index=True)
+    return finalize_chunk(augmented_df)
 
-def augment_data(df):
-    perturb_columns = ["height_cm", "waist_cm", "hip_cm", "bust_cm"]
-    synthetic_data = []
-    
-    for _, row in df.iterrows():
-        for _ in range(4):  # 4 synthetic versions per original
-            synthetic_row = perturb_row(row, perturb_columns)
-            synthetic_data.append(synthetic_row)
-    
-    augmented_df = pd.concat([df, pd.DataFrame(synthetic_data)])
-    augmented_df = apply_fashion_rules(augmented_df)
-    
-    # Round ALL numeric columns to 1 decimal after rules
-    numeric_cols = augmented_df.select_dtypes(include=['number']).columns
-    augmented_df[numeric_cols] = augmented_df[numeric_cols].round(1)
-    
-    return augmented_df
+def stream_augmented(df, output_path, copies=4, noise_range=(-2, 2), chunk_size=100_000, seed=None):
+    """Write originals + synthetic rows to Parquet chunk by chunk; memory stays at one chunk"""
+    writer = None
+    rows = 0
+    try:
+        synthetic = generate_synthetic(df, copies, noise_range, chunk_size=chunk_size, seed=seed)
+        for chunk in chain([df.reset_index(drop=True)], synthetic):
+            table = pa.Table.from_pandas(finalize_chunk(chunk), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
 
 def save_data(augmented_df):
-    output_path = r"C:\Users\User\Documents\my_project\body-measurement-predictor\data\augmented_measurements.xlsx"
-    augmented_df.to_excel(output_path, index=False)
+    output_path = os.path.join(DATA_DIR, "augmented_measurements.xlsx")
+    write_table(augmented_df, output_path)
     print(f"✅ Augmented data saved to: {output_path}")
 
 def main():
-    df = load_data()
-    augmented_df = augment_data(df)
-    save_data(augmented_df)
-    print(f"Final dataset size: {len(augmented_df)} rows")
+    parser = argparse.ArgumentParser(description="Noise-based augmentation of the rounded measurements")
+    parser.add_argument("--copies", type=int, default=4, help="synthetic versions per original row")
+    parser.add_argument("--noise", type=float, default=2.0, help="uniform noise range ± cm")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--stream", metavar="PARQUET_PATH",
+                        help="stream chunks to a Parquet file instead of building the workbook in memory")
+    parser.add_argument("--parallel", metavar="OUTPUT_DIR",
+                        help="fill shards in a process pool, one Parquet file per shard (originals in shard 0)")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    noise_range = (-args.noise, args.noise)
+
+    with stage("augment_data.main"):
+        df = load_data()
+
+        if args.parallel:
+            with stage("generate_parallel") as s:
+                dataset = SyntheticDataset(df, args.copies, noise_range, seed=args.seed)
+                shards = generate_parallel(dataset, args.parallel, processes=args.processes,
+                                           transform=finalize_chunk, include_source=True)
+                s.set_rows(sum(rows for _, rows in shards))
+            print(f"✅ Wrote {sum(rows for _, rows in shards)} rows in {len(shards)} shards "
+                  f"to: {args.parallel} (seed {dataset.seed})")
+            return
+
+        if args.stream:
+            with stage("stream_augmented") as s:
+                rows = stream_augmented(df, args.stream, args.copies, noise_range, args.chunk_size, args.seed)
+                s.set_rows(rows)
+            print(f"✅ Streamed {rows} rows to: {args.stream}")
+            return
+
+        with stage("augment_data") as s:
+            augmented_df = augment_data(df, copies=args.copies, noise_range=noise_range, seed=args.seed)
+            s.set_rows(len(augmented_df))
+        with stage("save_data", rows=len(augmented_df)):
+            save_data(augmented_df)
+        print(f"Final dataset size: {len(augmented_df)} rows")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,147 @@
+# body_index.py
+# Nearest actually-measured bodies for a request: one cKDTree per input pattern over the
+# standardized inputs that pattern has, built offline and saved next to the model.
+#
+#   python scripts/body_index.py                  # data/model_ready_measurements.xlsx
+#   python scripts/body_index.py --data other.xlsx --k 5
+import argparse
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from data_store import DATA_DIR, read_table
+from predictor import DEFAULT_MODEL_PATH, input_masks, input_patterns, native_artifact_path, pattern_mask
+
+INPUT_FEATURES = ["height_cm", "bust_cm", "waist_cm", "hip_cm", "chest_cm"]
+DEFAULT_DATA_PATH = os.path.join(DATA_DIR, "model_ready_measurements.xlsx")
+
+# Batches at least this large are spread over all cores by cKDTree.query
+PARALLEL_QUERY_ROWS = 1_024
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+def default_index_path(model_path=DEFAULT_MODEL_PATH):
+    return native_artifact_path(model_path) + "_bodies.pkl"
+
+def build_body_index(df, input_features=INPUT_FEATURES):
+    """Standardize the inputs and build one KD-tree per allowed input pattern.
+
+    Each tree holds only the rows that have every input of its pattern, so a
+    request is compared on exactly the measurements it provided.
+    """
+    measurement_cols = [col for col in df.columns if col.endswith("_cm")]
+    inputs = df[input_features].to_numpy(dtype=float)
+    means = np.nanmean(inputs, axis=0)
+    scales = np.nanstd(inputs, axis=0)
+    scales[~(scales > 0)] = 1.0
+
+    trees = {}
+    for features in input_patterns(input_features):
+        columns = [input_features.index(col) for col in features]
+        rows = np.flatnonzero(~np.isnan(inputs[:, columns]).any(axis=1))
+        if not len(rows):
+            continue
+        points = (inputs[np.ix_(rows, columns)] - means[columns]) / scales[columns]
+        trees[pattern_mask(features, input_features)] = {
+            "features": features,
+            "columns": columns,
+            "rows": rows,
+            "tree": cKDTree(points),
+        }
+
+    return {
+        "input_features": list(input_features),
+        "means": means,
+        "scales": scales,
+        "trees": trees,
+        "columns": measurement_cols,
+        "ids": df["id"].to_numpy() if "id" in df.columns else np.arange(len(df)),
+        "bodies": df[measurement_cols].to_numpy(dtype=np.float32),
+    }
+
+def load_body_index(path=None):
+    """Load a saved index once per process; re-read when the file changes"""
+    path = os.path.abspath(path or default_index_path())
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _loaded_lock:
+        entry = _loaded.get(path)
+        if entry is None or entry[0] != mtime_ns:
+            entry = _loaded[path] = (mtime_ns, joblib.load(path))
+        return entry[1]
+
+def nearest_bodies(inputs, index, k=5):
+    """k nearest measured bodies for every row of an (N, n_inputs) matrix.
+
+    Returns (distances, rows), both (N, k): distances in standard deviations over
+    the inputs the row provided, rows indexing index["bodies"]. Rows whose input
+    pattern has no tree get distance inf and row -1.
+    """
+    inputs = np.atleast_2d(np.asarray(inputs, dtype=float))
+    distances = np.full((len(inputs), k), np.inf)
+    rows = np.full((len(inputs), k), -1, dtype=np.intp)
+    masks = input_masks(inputs)
+    for mask in np.unique(masks):
+        entry = index["trees"].get(int(mask))
+        if entry is None:
+            continue
+        selected = np.flatnonzero(masks == mask)
+        columns = entry["columns"]
+        points = (inputs[np.ix_(selected, columns)] - index["means"][columns]) / index["scales"][columns]
+        workers = -1 if len(selected) >= PARALLEL_QUERY_ROWS else 1
+        found, positions = entry["tree"].query(points, k=k, workers=workers)
+        found, positions = found.reshape(len(selected), -1), positions.reshape(len(selected), -1)
+
+        # Trees with fewer than k rows pad with inf distance and an out-of-range position
+        valid = positions < len(entry["rows"])
+        distances[selected, :found.shape[1]] = found
+        positions = np.minimum(positions, len(entry["rows"]) - 1)
+        rows[selected, :found.shape[1]] = np.where(valid, entry["rows"][positions], -1)
+    return distances, rows
+
+def bodies_frame(index, distances, rows):
+    """The bodies behind one query row as a DataFrame (closest first), with their distance"""
+    keep = rows >= 0
+    frame = pd.DataFrame(index["bodies"][rows[keep]], columns=index["columns"])
+    frame.insert(0, "id", index["ids"][rows[keep]])
+    frame.insert(1, "distance", distances[keep].round(3))
+    return frame
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the nearest-body index saved next to the model")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="measured bodies (default: model_ready_measurements.xlsx)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="model the index is saved next to")
+    parser.add_argument("--out", default=None, help="index path (default: <model>_bodies.pkl)")
+    parser.add_argument("--k", type=int, default=5, help="neighbours used for the timing check")
+    args = parser.parse_args()
+
+    print("📂 Loading measured bodies...")
+    df = read_table(args.data)
+    started = time.perf_counter()
+    index = build_body_index(df)
+    print(f"🌳 Built {len(index['trees'])} trees over {len(df)} bodies in {time.perf_counter() - started:.2f}s")
+
+    out = args.out or default_index_path(args.model)
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    joblib.dump(index, out)
+    print(f"✅ Index saved to: {out}")
+
+    # Query latency on bodies drawn from the data, one at a time and as one batch
+    queries = df[INPUT_FEATURES].dropna().to_numpy(dtype=float)[:1_000]
+    if len(queries):
+        started = time.perf_counter()
+        for row in queries[:200]:
+            nearest_bodies(row, index, args.k)
+        single_us = (time.perf_counter() - started) / min(len(queries), 200) * 1e6
+        started = time.perf_counter()
+        nearest_bodies(queries, index, args.k)
+        batch_us = (time.perf_counter() - started) / len(queries) * 1e6
+        print(f"⏱️ k={args.k}: {single_us:.0f} µs per single query, {batch_us:.1f} µs/row in a batch of {len(queries)}")
+
+if __name__ == "__main__":
+    main()
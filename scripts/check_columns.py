@@ -1,21 +1,21 @@
 # check_columns.py (place in project root folder)
 import sys
 import os
-import pandas as pd
 from pathlib import Path
 
 # Add project root to Python path
 current_dir = Path(__file__).resolve().parent
 sys.path.append(str(current_dir))
 
-from fashion_rules import CUSTOM_RULES
+from rules_artifact import load_rules_artifact, rule_targets
+from data_store import read_table
 
 # Load data
 excel_path = current_dir / "data/model_ready_measurements.xlsx"
-df = pd.read_excel(excel_path)
+df = read_table(excel_path)
 
 # Compare columns
-rule_cols = set(CUSTOM_RULES.keys())
+rule_cols = set(rule_targets(load_rules_artifact()))
 data_cols = set(df.columns)
 
 print("\n🔍 Column Analysis:")
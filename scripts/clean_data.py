@@ -1,141 +1,52 @@
 # clean_data.py
+#
+#   python scripts/clean_data.py                               # clean the whole history
+#   python scripts/clean_data.py --append data/new_visits.xlsx # clean only new sessions
+import argparse
+import os
 import pandas as pd
 import numpy as np
 
-def load_data():
-    input_path = r"C:\Users\User\Documents\my_project\body-measurement-predictor\data\original_measurements.xlsx"
-    data = pd.read_excel(input_path)
-    data["Date Measured (YYYY-MM-DD)"] = pd.to_datetime(data["Date Measured (YYYY-MM-DD)"])
-    return data.sort_values(by=["id", "Date Measured (YYYY-MM-DD)"])
+from data_store import DATA_DIR, read_table, write_table
+from history_store import (DATE_COL, DEFAULT_HISTORY_PATH, STABLE_COLS, TIME_SENSITIVE_COLS, HistoryStore,
+                           append_visit_log, fold_visit_log, read_visit_log)
+from instrumentation import stage
+from rule_engine import apply_fashion_rules
+
+INPUT_PATH = os.path.join(DATA_DIR, "original_measurements.xlsx")
+OUTPUT_PATH = os.path.join(DATA_DIR, "cleaned_measurements.xlsx")
+HISTORY_PATH = DEFAULT_HISTORY_PATH
+
+def load_data(input_path=None):
+    data = read_table(input_path or INPUT_PATH)
+    data[DATE_COL] = pd.to_datetime(data[DATE_COL])
+    return data.sort_values(by=["id", DATE_COL])
+
+def load_history():
+    """The source workbook plus every session added with --append since"""
+    data = load_data()
+    logged = read_visit_log("raw")
+    if logged is None:
+        return data
+    return pd.concat([data, logged], ignore_index=True).sort_values(by=["id", DATE_COL])
 
 def fill_historical(data):
-    stable_cols = ["height_cm", "elbow_length_cm", "around_bicep_cm", "around_elbow_cm"]
-    for col in stable_cols:
-        data[col] = data.groupby("id")[col].transform(lambda x: x.fillna(x.mean()))
-    
-    time_sensitive_cols = ["waist_cm", "hip_cm", "bust_cm"]
-    for col in time_sensitive_cols:
-        data[col] = data.groupby("id")[col].ffill()
-    return data
+    grouped = data.groupby("id")
+    for col in STABLE_COLS:
+        data[col] = data[col].fillna(grouped[col].transform("mean"))
 
-def apply_fashion_rules(data):
-    rules = {
-        # Height Rules
-        "height_cm": [
-            {"formula": lambda row: row["front_waist_length_cm"] / 0.26, "inputs": ["front_waist_length_cm"], "priority": 1},
-            {"formula": lambda row: row["skirt_knee_length_cm"] / 0.4, "inputs": ["skirt_knee_length_cm"], "priority": 2},
-            {"formula": lambda row: row["around_thigh_cm"] / 0.4, "inputs": ["around_thigh_cm"], "priority": 3}
-        ],
-        
-        # Upper Body Rules
-        "shoulder_underbust_distance_cm": [
-            {"formula": lambda row: row["bust_height_cm"] + row["bust_radius_cm"], "inputs": ["bust_height_cm", "bust_radius_cm"], "priority": 1}
-        ],
-        
-        # Arm Measurements
-        "around_elbow_cm": [
-            {"formula": lambda row: 0.85 * row["around_bicep_cm"], "inputs": ["around_bicep_cm"], "priority": 1}
-        ],
-        "around_bicep_cm": [
-            {"formula": lambda row: row["around_elbow_cm"] / 0.85, "inputs": ["around_elbow_cm"], "priority": 1}
-        ],
-        
-        # Wrist/Hand Rules
-        "around_wrist_cm": [
-            {"formula": lambda row: 0.85 * row["hand_entry_cm"], "inputs": ["hand_entry_cm"], "priority": 1}
-        ],
-        "hand_entry_cm": [
-            {"formula": lambda row: row["around_wrist_cm"] / 0.85, "inputs": ["around_wrist_cm"], "priority": 1}
-        ],
-        
-        # Dress/Elbow Rules
-        "elbow_length_cm": [
-            {"formula": lambda row: 0.23 * row["height_cm"], "inputs": ["height_cm"], "priority": 1}
-        ],
-        "dress_knee_length_cm": [
-            {"formula": lambda row: row["front_waist_length_cm"] + row["skirt_knee_length_cm"], "inputs": ["front_waist_length_cm", "skirt_knee_length_cm"], "priority": 1}
-        ],
-        
-        # Full Length Rules
-        "dress_full_length_cm": [
-            {"formula": lambda row: 0.9 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
-            {"formula": lambda row: row["front_waist_length_cm"] + row["skirt_full_length_cm"], "inputs": ["front_waist_length_cm", "skirt_full_length_cm"], "priority": 2}
-        ],
-        
-        # Skirt Rules
-        "skirt_knee_length_cm": [
-            {"formula": lambda row: 0.4 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
-            {"formula": lambda row: 0.6 * row["skirt_full_length_cm"], "inputs": ["skirt_full_length_cm"], "priority": 2}
-        ],
-        "skirt_full_length_cm": [
-            {"formula": lambda row: 0.67 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
-            {"formula": lambda row: row["skirt_knee_length_cm"] / 0.6, "inputs": ["skirt_knee_length_cm"], "priority": 2}
-        ],
-        
-        # Flare/Walking Rules
-        "flare_out_cm": [
-            {"formula": lambda row: row["skirt_knee_length_cm"] - 8, "inputs": ["skirt_knee_length_cm"], "priority": 1}
-        ],
-        "walking_step_cm": [
-            {"formula": lambda row: row["hip_cm"] - 5, "inputs": ["hip_cm"], "priority": 1}
-        ],
-        
-        # Pants Rules
-        "pant_waist_cm": [
-            {"formula": lambda row: row["waist_cm"] * 1, "inputs": ["waist_cm"], "priority": 1}
-        ],
-        "pant_hip_cm": [
-            {"formula": lambda row: row["hip_cm"] * 1, "inputs": ["hip_cm"], "priority": 1}
-        ],
-        "pant_waist_hip_seam_cm": [
-            {"formula": lambda row: row["waist_hip_distance_cm"] * 1, "inputs": ["waist_hip_distance_cm"], "priority": 1}
-        ],
-        "pant_body_rise_cm": [
-            {"formula": lambda row: 0.35 * row["waist_cm"], "inputs": ["waist_cm"], "priority": 1},
-            {"formula": lambda row: row["pant_outseam_cm"] - row["pant_inseam_cm"], "inputs": ["pant_outseam_cm", "pant_inseam_cm"], "priority": 2}
-        ],
-        "pant_outseam_cm": [
-            {"formula": lambda row: row["pant_ankle_length_cm"] * 1, "inputs": ["pant_ankle_length_cm"], "priority": 1},
-            {"formula": lambda row: row["pant_inseam_cm"] + row["pant_body_rise_cm"], "inputs": ["pant_inseam_cm", "pant_body_rise_cm"], "priority": 2}
-        ],
-        "pant_inseam_cm": [
-            {"formula": lambda row: row["pant_outseam_cm"] - row["pant_body_rise_cm"], "inputs": ["pant_outseam_cm", "pant_body_rise_cm"], "priority": 1}
-        ],
-        "pant_full_length_cm": [
-            {"formula": lambda row: row["skirt_full_length_cm"] * 1, "inputs": ["skirt_full_length_cm"], "priority": 1}
-        ],
-        
-        # Leg Measurements
-        "around_thigh_cm": [
-            {"formula": lambda row: 0.45 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
-            {"formula": lambda row: 0.6 * row["hip_cm"], "inputs": ["hip_cm"], "priority": 2}
-        ],
-        "around_knee_cm": [
-            {"formula": lambda row: 0.65 * row["around_thigh_cm"], "inputs": ["around_thigh_cm"], "priority": 1},
-            {"formula": lambda row: 1.5 * row["around_ankle_cm"], "inputs": ["around_ankle_cm"], "priority": 2}
-        ],
-        "around_calf_cm": [
-            {"formula": lambda row: row["around_thigh_cm"] / 1.7, "inputs": ["around_thigh_cm"], "priority": 1}
-        ],
-        "around_ankle_cm": [
-            {"formula": lambda row: 0.5 * row["around_thigh_cm"], "inputs": ["around_thigh_cm"], "priority": 1}
-        ]
-    }
-
-    for target_col in rules:
-        sorted_rules = sorted(rules[target_col], key=lambda x: x["priority"])
-        for index, row in data.iterrows():
-            if pd.isnull(row[target_col]):
-                for rule in sorted_rules:
-                    if all(not pd.isnull(row[col]) for col in rule["inputs"]):
-                        data.at[index, target_col] = rule["formula"](row)
-                        break
+    for col in TIME_SENSITIVE_COLS:
+        data[col] = grouped[col].ffill()
     return data
 
-def final_cleanup(data):
+def final_cleanup(data, medians=None):
+    """Fill what is still missing with column medians (of `data`, or the stored ones)"""
     for col in data.columns:
         if data[col].isnull().sum() > 0:
-            data[col] = data[col].fillna(data[col].median())
+            if medians is None:
+                data[col] = data[col].fillna(data[col].median())
+            elif col in medians:
+                data[col] = data[col].fillna(medians[col])
     return data
 
 def validate_data(data):
@@ -144,18 +55,86 @@ def validate_data(data):
         print("ALERT: Impossible heights detected!\n", invalid_heights[["id", "height_cm"]])
     return data
 
-def save_data(data):
-    output_path = r"C:\Users\User\Documents\my_project\body-measurement-predictor\data\cleaned_measurements.xlsx"
-    data.to_excel(output_path, index=False)
+def save_data(data, output_path=None):
+    output_path = output_path or OUTPUT_PATH
+    write_table(data, output_path)
     print(f"✅ Cleaned data saved to: {output_path}")
 
 def main():
-    data = load_data()
-    data = fill_historical(data)
-    data = apply_fashion_rules(data)
-    data = final_cleanup(data)
-    validate_data(data)
-    save_data(data)
+    with stage("clean_data.main"):
+        with stage("load_data") as s:
+            data = load_history()
+            s.set_rows(len(data))
+        with stage("build_history", rows=len(data)):
+            history = HistoryStore.from_history(data)
+        with stage("fill_historical", rows=len(data)):
+            data = fill_historical(data)
+        with stage("apply_fashion_rules", rows=len(data)):
+            data = apply_fashion_rules(data)
+        history.medians = {col: float(value) for col, value in data.median(numeric_only=True).dropna().items()}
+        with stage("final_cleanup", rows=len(data)):
+            data = final_cleanup(data)
+        with stage("validate_data", rows=len(data)):
+            validate_data(data)
+        with stage("save_data", rows=len(data)):
+            save_data(data)
+            history.save(HISTORY_PATH)
+            fold_visit_log()
+        print(f"🗂️ History of {len(history)} customers saved to: {HISTORY_PATH}")
+
+def append_visits(visits_path):
+    """Clean only newly measured sessions against the stored history, then log them.
+
+    Gaps are filled from each customer's running means and last known values, so
+    the cost depends on the new sessions, not on the history. Means only cover
+    sessions up to the new one, and leftovers use the medians of the last full run.
+    Nothing already stored is rewritten: the raw and cleaned sessions go to the
+    visit log as a new batch. round_and_validate reads the cleaned batches after
+    the cleaned workbook, and a full run folds the raw ones into the history.
+    Sessions not newer than a customer's stored history are skipped, so appending
+    the same workbook twice doesn't count its sessions twice.
+    """
+    with stage("clean_data.append_visits"):
+        if not os.path.exists(HISTORY_PATH):
+            print("⚠️ No customer history yet; cleaning the whole dataset first...")
+            main()
+        history = HistoryStore.load(HISTORY_PATH)
+
+        with stage("load_visits") as s:
+            visits = load_data(visits_path)
+            s.set_rows(len(visits))
+        new = history.is_new(visits)
+        if not new.all():
+            print(f"⚠️ Skipped {(~new).sum()} session(s) not newer than the stored history (already appended?). "
+                  "Add older sessions to the source workbook and run a full clean.")
+            visits = visits[new]
+        if visits.empty:
+            print("✅ No new sessions to append.")
+            return
+        known = sum(customer in history.rows for customer in visits["id"].unique())
+        print(f"🆕 {len(visits)} new session(s), {known} returning customer(s)")
+
+        with stage("fill_historical", rows=len(visits)):
+            cleaned = history.add_visits(visits)
+        with stage("apply_fashion_rules", rows=len(cleaned)):
+            cleaned = apply_fashion_rules(cleaned)
+        with stage("final_cleanup", rows=len(cleaned)):
+            cleaned = final_cleanup(cleaned, history.medians)
+        with stage("validate_data", rows=len(cleaned)):
+            validate_data(cleaned)
+
+        with stage("save_data", rows=len(cleaned)):
+            batch = append_visit_log(visits, cleaned)
+            history.save(HISTORY_PATH)
+        print(f"🗂️ History updated: {len(history)} customers; sessions logged as batch {batch}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fill gaps in the measurement history")
+    parser.add_argument("--append", default=None, metavar="VISITS",
+                        help="workbook of new sessions to clean against the stored history")
+    args = parser.parse_args()
+
+    if args.append:
+        append_visits(args.append)
+    else:
+        main()
\ No newline at end of file
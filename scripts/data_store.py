@@ -0,0 +1,95 @@
+# data_store.py
+# Excel is only parsed at the edges: every workbook gets a hidden Arrow (Feather) copy
+# next to it, and later reads come from that copy while the workbook is unchanged.
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+
+def cache_paths(path):
+    """Return (arrow_path, meta_path) for the hidden copy kept next to a workbook"""
+    directory, name = os.path.split(os.path.abspath(path))
+    return (
+        os.path.join(directory, f".{name}.feather"),
+        os.path.join(directory, f".{name}.meta.json"),
+    )
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_meta(meta_path, meta):
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+def _read_arrow(arrow_path):
+    # Uncompressed IPC + memory_map lets numeric columns come back without a copy
+    table = feather.read_table(arrow_path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+def _write_arrow(df, path, digest):
+    arrow_path, meta_path = cache_paths(path)
+    # Write beside and swap in: frames read earlier may still map the old copy
+    tmp_path = arrow_path + ".tmp"
+    try:
+        df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+        os.replace(tmp_path, arrow_path)
+    except (pa.ArrowException, TypeError, ValueError, OSError) as e:
+        # Mixed-type columns (e.g. 'N/A' next to numbers) can't be stored as Arrow, and
+        # Windows refuses to replace a file that is still mapped
+        print(f"⚠️ No columnar cache for {os.path.basename(path)}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    _write_meta(meta_path, {**_fingerprint(path), "sha256": digest})
+
+def is_fresh(path):
+    """True when the Arrow copy matches the workbook on disk"""
+    arrow_path, meta_path = cache_paths(path)
+    meta = _read_meta(meta_path)
+    if meta is None or not os.path.exists(arrow_path):
+        return False
+
+    source = _fingerprint(path)
+    if meta["mtime_ns"] == source["mtime_ns"] and meta["size"] == source["size"]:
+        return True
+    # Touched but maybe not edited (checkout, copy): fall back to the content hash
+    if meta["size"] == source["size"] and meta["sha256"] == file_hash(path):
+        _write_meta(meta_path, {**meta, **source})
+        return True
+    return False
+
+def read_table(path):
+    """Load a workbook, parsing the .xlsx only when its Arrow copy is stale"""
+    if is_fresh(path):
+        return _read_arrow(cache_paths(path)[0])
+
+    df = pd.read_excel(path)
+    _write_arrow(df, path, file_hash(path))
+    return df
+
+def write_table(df, path):
+    """Export a DataFrame to .xlsx and refresh its Arrow copy for the next stage"""
+    df.to_excel(path, index=False)
+    _write_arrow(df, path, file_hash(path))
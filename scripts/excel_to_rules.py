@@ -1,13 +1,22 @@
 # scripts/excel_to_rules.py
 
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
 import pandas as pd
 import numpy as np
-import re
 import traceback
 import logging
 from collections import defaultdict
-from networkx import DiGraph, topological_sort, NetworkXUnfeasible
-from networkx.algorithms.cycles import find_cycle
+from networkx import DiGraph, topological_sort, strongly_connected_components
+
+from data_store import read_table
+from formula_compiler import clean_name, split_rule
+from instrumentation import stage
+from rules_artifact import RULES_META_FILE, compile_rules, default_rules_dir, write_rules_artifact
 
 # Setup logging
 logging.basicConfig(
@@ -16,48 +25,39 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def clean_name(text):
-    """Convert measurement names to snake_case"""
-    cleaned = re.sub(r'[^a-z0-9_]', '_', str(text).strip().lower())
-    return re.sub(r'_+', '_', cleaned)
+RELATIONSHIPS_PATH = "data/measurement_relationships.xlsx"
+DESCRIPTIONS_PATH = "data/measurement_descriptions.xlsx"
+# Next to this script, so the artifact lands where rules_artifact.DEFAULT_RULES_DIR reads it
+DEFAULT_OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fashion_rules.py")
+
+# Bump when parsing or cycle resolution changes so cached rows and decisions are redone
+RULE_STATE_FORMAT = "bmp-rule-rows-2"
+ROW_COLUMNS = ("Typical Formula", "Priority", "Tolerance", "Notes")
 
 def parse_formula(formula: str, priority: int):
     """Parses a formula and returns structured rule with dependencies"""
-    formula = formula.replace(" ", "")
-    if '=' not in formula:
-        raise ValueError("Missing '=' in formula")
-    
-    left_side, right_side = formula.split('=')
-    target = clean_name(left_side.strip())
-    
-    if sum(op in right_side for op in ['+', '-', '*', '/']) > 1:
-        raise ValueError("Complex formulas require step-by-step implementation")
-    
-    for op in ['+', '-', '*', '/']:
-        if op in right_side:
-            parts = right_side.split(op)
-            if len(parts) != 2:
-                raise ValueError("Invalid operator structure")
-            
-            # Determine base and value
-            base = clean_name(parts[0]) if not parts[0].replace('.', '', 1).isdigit() else clean_name(parts[1])
-            value = float(parts[1]) if parts[1].replace('.', '', 1).isdigit() else float(parts[0])
-
-            return {
-                'target': target,
-                'type': {
-                    '*': 'proportion',
-                    '/': 'ratio',
-                    '+': 'offset',
-                    '-': 'offset'
-                }[op],
-                'base': base,
-                'value': value,
-                'operator': op,
-                'requires': [base],
-                'priority': priority
-            }
-    raise ValueError("Unsupported or missing operator in formula")
+    target, compiled = split_rule(formula)
+    rule = {
+        'target': target,
+        'expression': compiled.expression,
+        'requires': compiled.dependencies,
+        'priority': priority
+    }
+
+    # Single-column linear formulas keep the compact proportion/ratio/offset form
+    if compiled.linear is not None and len(compiled.linear[0]) == 1:
+        coefficients, constant = compiled.linear
+        [(base, coefficient)] = coefficients.items()
+        if constant == 0:
+            rule.update(type='ratio' if compiled.operator == '/' else 'proportion',
+                        base=base, multiplier=coefficient)
+            return rule
+        if coefficient == 1:
+            rule.update(type='offset', base=base, offset=constant)
+            return rule
+
+    rule.update(type='formula', base=None)
+    return rule
 
 def build_dependency_graph(rules):
     """Create a dependency graph for all rules"""
@@ -69,34 +69,147 @@ def build_dependency_graph(rules):
                 graph.add_edge(dep, target)
     return graph
 
-def resolve_cycles(graph, rule_dict):
-    """Try to resolve cycles by removing lowest-priority rules"""
-    removed = []
-    while True:
-        try:
-            list(topological_sort(graph))
-            break  # Success! No more cycles
-        except NetworkXUnfeasible:
-            cycle = find_cycle(graph)
-            involved_targets = {dst for _, dst in cycle}
-
-            # Collect all rules involved in the cycle and pick the one with lowest priority
-            lowest_priority = float("inf")
-            weakest_target = None
-            for tgt in involved_targets:
-                for rule in rule_dict[tgt]:
-                    if rule["priority"] < lowest_priority:
-                        lowest_priority = rule["priority"]
-                        weakest_target = tgt
-
-            if weakest_target:
-                removed.append((weakest_target, rule_dict[weakest_target]))
-                del rule_dict[weakest_target]
-                graph = build_dependency_graph(rule_dict)
-            else:
-                raise RuntimeError("Cycle could not be resolved")
+def _is_cyclic(graph, component):
+    return len(component) > 1 or any(graph.has_edge(node, node) for node in component)
+
+class IncrementalOrder:
+    """Topological order of a growing DAG, repaired locally on every edge insert.
+
+    Pearce-Kelly: an edge that already agrees with the order costs O(1); otherwise
+    only the nodes between its endpoints in the order are searched and reordered.
+    """
+
+    def __init__(self, nodes):
+        self.position = {node: i for i, node in enumerate(nodes)}
+        self.successors = defaultdict(dict)
+        self.predecessors = defaultdict(dict)
+
+    def _search(self, start, adjacency, inside, stop=None):
+        seen, stack = {start}, [start]
+        while stack:
+            node = stack.pop()
+            for nxt in adjacency[node]:
+                if nxt == stop:
+                    return None
+                if nxt not in seen and inside(self.position[nxt]):
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return seen
+
+    def add_edge(self, source, target):
+        """Add source → target; returns False (graph unchanged) if it would close a cycle"""
+        if source == target:
+            return False
+        if not self.successors[source].get(target):
+            lower, upper = self.position[target], self.position[source]
+            if lower < upper:
+                forward = self._search(target, self.successors, lambda p: p <= upper, stop=source)
+                if forward is None:
+                    return False
+                backward = self._search(source, self.predecessors, lambda p: p >= lower)
+                moved = sorted(backward, key=self.position.get) + sorted(forward, key=self.position.get)
+                for node, slot in zip(moved, sorted(self.position[node] for node in moved)):
+                    self.position[node] = slot
+        self.successors[source][target] = self.successors[source].get(target, 0) + 1
+        self.predecessors[target][source] = self.predecessors[target].get(source, 0) + 1
+        return True
+
+    def remove_edge(self, source, target):
+        for adjacency, a, b in ((self.successors, source, target), (self.predecessors, target, source)):
+            adjacency[a][b] -= 1
+            if not adjacency[a][b]:
+                del adjacency[a][b]
+
+def resolve_cycles(graph, rule_dict, rows=None):
+    """Break every cycle by dropping individual lowest-priority rules inside each SCC.
+
+    Only edges inside a strongly connected component can lie on a cycle, so each
+    cyclic SCC is handled on its own: its rules are re-admitted from highest to
+    lowest priority into an IncrementalOrder, and a rule is dropped only when its
+    dependencies would close a cycle with the rules already kept. Rules outside
+    cycles are never touched. The graph is updated in place.
+
+    Equal priorities are broken by sheet row: `rows` maps (target, i) to the rule's
+    row in the relationship sheet, and the earlier row is kept. Without it, the
+    order of rule_dict stands in for the sheet. The sheet has no Priority column
+    today, so every rule is priority 0 and row order alone decides.
+
+    Returns (rule_dict, removed) with removed = [(target, rule), ...].
+    """
+    if rows is None:
+        listed = [(target, i) for target, rule_list in rule_dict.items() for i in range(len(rule_list))]
+        rows = {rule: n for n, rule in enumerate(listed)}
+    dropped = set()
+    for component in strongly_connected_components(graph):
+        if not _is_cyclic(graph, component):
+            continue
+        order = IncrementalOrder(sorted(component))
+        ranked = sorted(
+            (-rule["priority"], rows[(target, i)], target, i)
+            for target in component
+            for i, rule in enumerate(rule_dict.get(target, []))
+        )
+        for _, _, target, i in ranked:
+            deps = [dep for dep in dict.fromkeys(rule_dict[target][i]["requires"]) if dep in component]
+            added = []
+            for dep in deps:
+                if not order.add_edge(dep, target):
+                    for kept in added:
+                        order.remove_edge(kept, target)
+                    dropped.add((target, i))
+                    break
+                added.append(dep)
 
-    return rule_dict, removed
+    # Drop graph edges that no surviving rule needs any more
+    needed = defaultdict(int)
+    for target, rule_list in rule_dict.items():
+        for i, rule in enumerate(rule_list):
+            if (target, i) not in dropped:
+                for dep in set(rule["requires"]):
+                    needed[(dep, target)] += 1
+    for target, i in dropped:
+        for dep in set(rule_dict[target][i]["requires"]):
+            if not needed[(dep, target)] and graph.has_edge(dep, target):
+                graph.remove_edge(dep, target)
+
+    removed = [(target, rule_dict[target][i]) for target, i in sorted(dropped)]
+    resolved = {}
+    for target, rule_list in rule_dict.items():
+        kept = [rule for i, rule in enumerate(rule_list) if (target, i) not in dropped]
+        if kept:
+            resolved[target] = kept
+    return resolved, removed
+
+def describe_rule(target, rule):
+    """One-line form of a rule for reports: target = expression (priority p)"""
+    return f"{target} = {rule['expression']} (priority {rule['priority']})"
+
+def parse_row(row):
+    """One relationship row -> (target, rule entry); raises on a bad formula"""
+    formula = row["Typical Formula"]
+    priority = int(row.get("Priority", 0))
+    tolerance = float(row["Tolerance"]) if pd.notna(row["Tolerance"]) else 0.0
+    notes = row.get("Notes", "").strip()
+
+    parsed = parse_formula(formula, priority)
+
+    rule_entry = {
+        "type": parsed["type"],
+        "base": parsed["base"],
+        "expression": parsed["expression"],
+        "tolerance": tolerance,
+        "notes": notes,
+        "requires": parsed["requires"],
+        "priority": priority
+    }
+
+    if parsed["type"] in ("proportion", "ratio"):
+        rule_entry["multiplier"] = parsed["multiplier"]
+    elif parsed["type"] == "offset":
+        rule_entry["offset"] = parsed["offset"]
+
+    logging.info(f"✔️ Parsed rule: {formula} → {rule_entry}")
+    return parsed["target"], rule_entry
 
 def build_custom_rules(df):
     rules = defaultdict(list)
@@ -104,30 +217,8 @@ def build_custom_rules(df):
 
     for _, row in df.iterrows():
         try:
-            formula = row["Typical Formula"]
-            priority = int(row.get("Priority", 0))
-            tolerance = float(row["Tolerance"]) if pd.notna(row["Tolerance"]) else 0.0
-            notes = row.get("Notes", "").strip()
-
-            parsed = parse_formula(formula, priority)
-
-            rule_entry = {
-                "type": parsed["type"],
-                "base": parsed["base"],
-                "tolerance": tolerance,
-                "notes": notes,
-                "requires": parsed["requires"],
-                "priority": priority
-            }
-
-            if parsed["type"] in ("proportion", "ratio"):
-                rule_entry["multiplier"] = parsed["value"] if parsed["operator"] == '*' else 1 / parsed["value"]
-            elif parsed["type"] == "offset":
-                rule_entry["offset"] = parsed["value"] if parsed["operator"] == '+' else -parsed["value"]
-
-            rules[parsed["target"]].append(rule_entry)
-            logging.info(f"✔️ Parsed rule: {formula} → {rule_entry}")
-
+            target, rule_entry = parse_row(row)
+            rules[target].append(rule_entry)
         except Exception as e:
             msg = f"⛔ Skipped formula '{row.get('Typical Formula', 'N/A')}': {e}"
             logging.warning(msg)
@@ -135,68 +226,371 @@ def build_custom_rules(df):
 
     return rules, skipped
 
-def generate_fashion_rules():
-    try:
-        print("📂 Loading Excel files...")
-        df_rules = pd.read_excel("data/measurement_relationships.xlsx")
-        df_desc = pd.read_excel("data/measurement_descriptions.xlsx")
+def rule_state_path(sheet_path=RELATIONSHIPS_PATH):
+    """Hidden parse cache kept next to the relationships workbook"""
+    directory, name = os.path.split(os.path.abspath(sheet_path))
+    return os.path.join(directory, f".{name}.rules.json")
+
+def row_key(row):
+    """Content hash of one relationship row (formula, priority, tolerance, notes)"""
+    values = [RULE_STATE_FORMAT] + [str(row.get(col, "")) for col in ROW_COLUMNS]
+    return hashlib.sha256("\x1f".join(values).encode()).hexdigest()[:16]
+
+def _reachable(seeds, neighbours):
+    seen, stack = set(seeds), list(seeds)
+    while stack:
+        for nxt in neighbours(stack.pop()):
+            if nxt not in seen:
+                seen.add(nxt)
+                stack.append(nxt)
+    return seen
+
+class RuleState:
+    """What the last conversion knew, so the next one only redoes what an edit touched.
 
-        print("🔍 Building rules from formulas...")
-        rule_dict, skipped = build_custom_rules(df_rules)
+    rows maps a row's content key to its parsed rule (or the reason it was skipped),
+    graph holds the dependency edges of every parsed rule with a per-edge rule count,
+    and dropped/components record the cycle decisions and the cyclic SCCs they were
+    made in. Identical rows get distinct keys by occurrence (key:0, key:1, ...).
+    """
 
-        print("🔁 Checking dependencies...")
-        graph = build_dependency_graph(rule_dict)
+    def __init__(self):
+        self.rows = {}
+        self.keys = []
+        self.dropped = set()
+        self.components = []
+        self.descriptions = None
+        self.graph = DiGraph()
 
+    @classmethod
+    def load(cls, path):
+        state = cls()
         try:
-            processing_order = list(topological_sort(graph))
-        except NetworkXUnfeasible:
-            print("⚠️ Circular dependencies found. Attempting auto-fix based on priority...")
-            rule_dict, removed = resolve_cycles(graph, rule_dict)
-            print(f"✅ Removed {len(removed)} low-priority rule(s) to fix cycles.")
-            logging.warning(f"Removed rules to resolve cycles: {[r[0] for r in removed]}")
-            graph = build_dependency_graph(rule_dict)
-            processing_order = list(topological_sort(graph))
-
-        print("📝 Mapping descriptions...")
-        desc_map = df_desc.set_index("Measurement Name")["Description"].to_dict()
-
-        print("💾 Writing fashion_rules.py...")
-        with open("fashion_rules.py", "w", encoding="utf-8") as f:
-            f.write("# AUTOGENERATED FILE — DO NOT MODIFY MANUALLY\n\n")
-            
-            f.write("MEASUREMENT_DESCRIPTIONS = {\n")
-            for name, desc in desc_map.items():
-                f.write(f'    "{clean_name(name)}": """{desc.strip()}""",\n')
-            f.write("}\n\n")
-
-            f.write("CUSTOM_RULES = {\n")
-            for target in processing_order:
-                if target not in rule_dict:
-                    continue
-                f.write(f'    "{target}": [\n')
-                for rule in rule_dict[target]:
-                    f.write("        {\n")
-                    f.write(f'            "type": "{rule["type"]}",\n')
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return state
+        if saved.get("format") != RULE_STATE_FORMAT:
+            return state
+        state.rows = saved["rows"]
+        state.keys = saved["keys"]
+        state.dropped = set(saved["dropped"])
+        state.components = [set(component) for component in saved["components"]]
+        state.descriptions = saved["descriptions"]
+        for entry in state.rows.values():
+            if "rule" in entry:
+                state._link(entry, +1)
+        return state
+
+    def save(self, path):
+        # json.dumps runs the C encoder; json.dump to a file would not
+        text = json.dumps({
+            "format": RULE_STATE_FORMAT,
+            "keys": self.keys,
+            "rows": self.rows,
+            "dropped": sorted(self.dropped),
+            "components": [sorted(component) for component in self.components],
+            "descriptions": self.descriptions,
+        }, ensure_ascii=False)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _link(self, entry, step):
+        """Add (+1) or remove (-1) one rule's edges in the full dependency graph"""
+        target = entry["target"]
+        self.graph.add_node(target)
+        for dep in set(entry["rule"]["requires"]):
+            count = self.graph.get_edge_data(dep, target, {}).get("rules", 0) + step
+            if count:
+                self.graph.add_edge(dep, target, rules=count)
+            else:
+                self.graph.remove_edge(dep, target)
+
+    def update_rows(self, df_rules):
+        """Parse only new or edited rows.
+
+        Returns (added keys, removed keys, reordered, touched nodes). reordered is True
+        when the rows that stayed changed order; touched holds the targets and
+        dependencies of every added or removed rule and of every rule whose position
+        among its target's rules moved (the order decides pass ranks and cycle ties).
+        """
+        keys, occurrences = [], defaultdict(int)
+        for row in df_rules.to_dict("records"):
+            content = row_key(row)
+            key = f"{content}:{occurrences[content]}"
+            occurrences[content] += 1
+            keys.append(key)
+            if key in self.rows:
+                continue
+            try:
+                target, rule = parse_row(row)
+                self.rows[key] = {"target": target, "rule": rule}
+            except Exception as e:
+                msg = f"⛔ Skipped formula '{row.get('Typical Formula', 'N/A')}': {e}"
+                logging.warning(msg)
+                self.rows[key] = {"skipped": msg}
+
+        current, previous = set(keys), set(self.keys)
+        added = [key for key in keys if key not in previous]
+        removed = [key for key in self.rows if key not in current]
+        touched = set()
+        for key in removed:
+            entry = self.rows.pop(key)
+            if "rule" in entry:
+                self._link(entry, -1)
+                touched.add(entry["target"])
+                touched.update(entry["rule"]["requires"])
+            self.dropped.discard(key)
+        for key in added:
+            if "rule" in self.rows[key]:
+                self._link(self.rows[key], +1)
+                touched.add(self.rows[key]["target"])
+                touched.update(self.rows[key]["rule"]["requires"])
+
+        kept_before = [key for key in self.keys if key in current]
+        kept_now = [key for key in keys if key in previous]
+        reordered = kept_before != kept_now
+        if reordered:
+            before, now = self._by_target(kept_before), self._by_target(kept_now)
+            for target, target_keys in now.items():
+                if before.get(target) != target_keys:
+                    touched.add(target)
+                    for key in target_keys:
+                        touched.update(self.rows[key]["rule"]["requires"])
+            # Row order breaks priority ties, so a cyclic SCC whose rows swapped is re-decided
+            for component in self.components:
+                inside = [key for key in kept_before if self.rows[key].get("target") in component]
+                if inside != [key for key in kept_now if self.rows[key].get("target") in component]:
+                    touched |= component
+        self.keys = keys
+        return added, removed, reordered, touched
+
+    def _by_target(self, keys):
+        sequences = defaultdict(list)
+        for key in keys:
+            if "rule" in self.rows[key]:
+                sequences[self.rows[key]["target"]].append(key)
+        return sequences
+
+    def dropped_rules(self):
+        """(sheet row, target, rule) of every rule currently dropped to break a cycle"""
+        return [(n, self.rows[key]["target"], self.rows[key]["rule"])
+                for n, key in enumerate(self.keys) if key in self.dropped]
+
+    def affected_nodes(self, changed):
+        """Nodes whose cycle decisions an edit to the `changed` rules can alter.
+
+        Every SCC that contains a changed rule's target or dependency lies inside
+        (reachable from the seeds) ∩ (reaching the seeds), which is itself a union
+        of SCCs; old cyclic components the seeds belonged to are added so components
+        that split apart are re-decided too.
+        """
+        seeds = {node for node in changed if node in self.graph}
+        if not seeds:
+            return set()
+        region = (_reachable(seeds, self.graph.successors)
+                  & _reachable(seeds, self.graph.predecessors))
+        for component in self.components:
+            if component & seeds:
+                region |= component & set(self.graph)
+        return region
+
+    def rule_dict(self, keys=None, targets=None):
+        """{target: [rule, ...]} in sheet order, optionally limited to some targets; also the keys"""
+        rules, rule_keys = defaultdict(list), defaultdict(list)
+        for key in self.keys if keys is None else keys:
+            entry = self.rows[key]
+            if "rule" in entry and (targets is None or entry["target"] in targets):
+                rules[entry["target"]].append(entry["rule"])
+                rule_keys[entry["target"]].append(key)
+        return rules, rule_keys
+
+    def resolve(self, nodes):
+        """Re-decide cycles among `nodes`; returns the (target, rule) pairs dropped that weren't before"""
+        previous = set(self.dropped)
+        self.components = [component for component in self.components if not component & nodes]
+        self.dropped = {key for key in self.dropped if self.rows[key]["target"] not in nodes}
+
+        removed = []
+        subgraph = self.graph.subgraph(nodes)
+        rules, rule_keys = self.rule_dict(targets=nodes)
+        position = {key: n for n, key in enumerate(self.keys)}
+        for component in strongly_connected_components(subgraph):
+            if not _is_cyclic(subgraph, component):
+                continue
+            self.components.append(set(component))
+            component_rules = {target: rules[target] for target in component if target in rules}
+            component_graph = subgraph.subgraph(component).copy()
+            rows = {(target, i): position[key] for target in component_rules
+                    for i, key in enumerate(rule_keys[target])}
+            resolved, _ = resolve_cycles(component_graph, component_rules, rows)
+            for target, rule_list in component_rules.items():
+                kept = {id(rule) for rule in resolved.get(target, [])}
+                for key, rule in zip(rule_keys[target], rule_list):
+                    if id(rule) not in kept:
+                        self.dropped.add(key)
+                        if key not in previous:
+                            removed.append((target, rule))
+        return removed
+
+    def kept_rules(self):
+        """(rule_dict without dropped rules, its dependency graph)"""
+        rules, _ = self.rule_dict(keys=[key for key in self.keys if key not in self.dropped])
+        return rules, build_dependency_graph(rules)
+
+    def skipped(self):
+        return [self.rows[key]["skipped"] for key in self.keys if "skipped" in self.rows[key]]
+
+def write_fashion_rules(path, desc_map, rule_dict, processing_order):
+    """Write the rules as an importable Python module in dependency order"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# AUTOGENERATED FILE — DO NOT MODIFY MANUALLY\n\n")
+        
+        f.write("MEASUREMENT_DESCRIPTIONS = {\n")
+        for name, desc in desc_map.items():
+            f.write(f'    "{clean_name(name)}": """{desc.strip()}""",\n')
+        f.write("}\n\n")
+
+        f.write("CUSTOM_RULES = {\n")
+        for target in processing_order:
+            if target not in rule_dict:
+                continue
+            f.write(f'    "{target}": [\n')
+            for rule in rule_dict[target]:
+                f.write("        {\n")
+                f.write(f'            "type": "{rule["type"]}",\n')
+                if rule["base"] is not None:
                     f.write(f'            "base": "{rule["base"]}",\n')
-                    if "multiplier" in rule:
-                        f.write(f'            "multiplier": {rule["multiplier"]},\n')
-                    if "offset" in rule:
-                        f.write(f'            "offset": {rule["offset"]},\n')
-                    f.write(f'            "tolerance": {rule["tolerance"]},\n')
-                    f.write(f'            "notes": """{rule["notes"]}"""\n')
-                    f.write("        },\n")
-                f.write("    ],\n")
-            f.write("}\n")
+                f.write(f'            "expression": "{rule["expression"]}",\n')
+                if rule["type"] == "formula":
+                    f.write(f'            "requires": {rule["requires"]},\n')
+                if "multiplier" in rule:
+                    f.write(f'            "multiplier": {rule["multiplier"]},\n')
+                if "offset" in rule:
+                    f.write(f'            "offset": {rule["offset"]},\n')
+                f.write(f'            "tolerance": {rule["tolerance"]},\n')
+                f.write(f'            "priority": {rule["priority"]},\n')
+                f.write(f'            "notes": """{rule["notes"]}"""\n')
+                f.write("        },\n")
+            f.write("    ],\n")
+        f.write("}\n\n")
+
+        # Kept so scripts/rules_artifact.py rebuilds the artifact exactly as the converter does
+        f.write("PROCESSING_ORDER = [\n")
+        for name in processing_order:
+            f.write(f'    "{name}",\n')
+        f.write("]\n")
+
+def generate_fashion_rules(output_path=DEFAULT_OUTPUT_PATH, artifact_dir=None, state=None, incremental=True):
+    """Write fashion_rules.py and the compiled artifact (default: <output>_compiled/ next to it).
+
+    Rows are cached by content in a hidden file next to the workbook: only new or
+    edited rows are parsed and logged, and cycles are only re-resolved in the part
+    of the graph those rows touch. Pass `state` to keep it in memory between calls
+    (watch mode); incremental=False starts from scratch.
+    """
+    artifact_dir = artifact_dir or default_rules_dir(output_path)
+    state_path = rule_state_path()
+    try:
+        with stage("excel_to_rules.generate_fashion_rules"):
+            print("📂 Loading Excel files...")
+            with stage("load_sheets") as s:
+                df_rules = read_table(RELATIONSHIPS_PATH)
+                df_desc = read_table(DESCRIPTIONS_PATH)
+                s.set_rows(len(df_rules))
+
+            if state is None:
+                state = RuleState.load(state_path) if incremental else RuleState()
+
+            print("🔍 Building rules from formulas...")
+            with stage("build_custom_rules", rows=len(df_rules)):
+                added, removed_rows, reordered, touched = state.update_rows(df_rules)
+            print(f"   {len(added)} new/edited row(s), {len(removed_rows)} removed, "
+                  f"{len(state.keys) - len(added)} unchanged{', reordered' if reordered else ''}")
+
+            print("📝 Mapping descriptions...")
+            desc_map = df_desc.set_index("Measurement Name")["Description"].to_dict()
+            descriptions = {clean_name(name): desc.strip() for name, desc in desc_map.items()}
+            desc_hash = hashlib.sha256(json.dumps(descriptions, sort_keys=True).encode()).hexdigest()
+
+            outputs_exist = os.path.exists(output_path) and os.path.exists(os.path.join(artifact_dir, RULES_META_FILE))
+            if not added and not removed_rows and not reordered and desc_hash == state.descriptions and outputs_exist:
+                print("✅ Rules unchanged, nothing to write.")
+                return True
+
+            print("🔁 Checking dependencies...")
+            with stage("resolve_dependencies", rows=len(added) + len(removed_rows)):
+                removed = state.resolve(state.affected_nodes(touched))
+                if removed:
+                    print(f"⚠️ Circular dependencies found. Removed {len(removed)} low-priority rule(s) to fix cycles:")
+                    for target, rule in removed:
+                        print(f"   ✂️ {describe_rule(target, rule)}")
+                # The full list on every write, so the log shows what the written rules leave out
+                for row, target, rule in state.dropped_rules():
+                    logging.warning(f"Dropped to break a cycle: {describe_rule(target, rule)}, sheet row {row + 2}")
+
+                rule_dict, graph = state.kept_rules()
+                processing_order = list(topological_sort(graph))
+
+            print(f"💾 Writing {output_path}...")
+            with stage("write_fashion_rules", rows=len(rule_dict)):
+                write_fashion_rules(output_path, desc_map, rule_dict, processing_order)
+
+            print(f"📦 Compiling rules to {artifact_dir}...")
+            with stage("write_rules_artifact", rows=len(rule_dict)):
+                write_rules_artifact(compile_rules(rule_dict, processing_order, descriptions), artifact_dir)
+
+            state.descriptions = desc_hash
+            state.save(state_path)
 
         print(f"✅ Created {len(rule_dict)} measurements with resolved dependency order.")
+        skipped = state.skipped()
         if skipped:
             print(f"⚠️ Skipped {len(skipped)} rules. Check rule_conversion.log.")
+        return True
 
     except Exception as e:
         print(f"❌ ERROR: {e}")
         traceback.print_exc()
+        return False
+
+def watch_rules(output_path, artifact_dir=None, interval=0.2):
+    """Regenerate whenever either workbook is saved; the parse cache stays in memory"""
+    state = RuleState.load(rule_state_path())
+    last_seen = None
+    print(f"👀 Watching {RELATIONSHIPS_PATH} and {DESCRIPTIONS_PATH} (Ctrl+C to stop)...")
+    try:
+        while True:
+            seen = tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else None
+                         for path in (RELATIONSHIPS_PATH, DESCRIPTIONS_PATH))
+            if seen != last_seen:
+                last_seen = seen
+                started = time.perf_counter()
+                ok = generate_fashion_rules(output_path, artifact_dir, state=state)
+                elapsed_ms = (time.perf_counter() - started) * 1e3
+                if not ok:
+                    # The in-memory state may be half-updated; go back to the last saved one
+                    state = RuleState.load(rule_state_path())
+                print(f"{'⏱️' if ok else '❌'} {'Regenerated' if ok else 'Failed'} in {elapsed_ms:.0f} ms; watching...")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the relationship workbook into fashion_rules.py")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH, help="generated module (default: scripts/fashion_rules.py)")
+    parser.add_argument("--artifact", default=None, help="compiled rules directory (default: <output>_compiled)")
+    parser.add_argument("--full", action="store_true", help="ignore the row cache and reparse every row")
+    parser.add_argument("--watch", action="store_true", help="keep running and regenerate on every saved edit")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between checks in --watch mode")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch_rules(args.output, args.artifact, args.interval)
+        sys.exit(0)
+
     print("🚀 Starting Excel-to-Rules conversion...")
-    generate_fashion_rules()
+    ok = generate_fashion_rules(args.output, args.artifact, incremental=not args.full)
     print("🏁 Done!")
+    if not ok:
+        sys.exit(1)
@@ -0,0 +1,80 @@
+# export_model.py
+# Exports a joblib model package to the native artifact and compares the two formats.
+# Both hold the same boosters (main + pattern models), so predictions must match and
+# only loading should differ.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from predictor import (
+    DEFAULT_MODEL_PATH, export_native, input_patterns, native_artifact_path, predict_matrix,
+    read_model_package,
+)
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def cold_load_ms(path, runs=3):
+    """Median read_model_package time in a fresh interpreter.
+
+    predictor (and with it pandas and xgboost) is imported before the clock starts,
+    so the timing is the format's own load: pattern boosters, rules and surrogate included.
+    """
+    code = (
+        f"import sys; sys.path.insert(0, {SCRIPTS_DIR!r}); from predictor import read_model_package; "
+        f"import time; t = time.perf_counter(); read_model_package({path!r}); "
+        "print(time.perf_counter() - t)"
+    )
+    timings = [
+        float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+        for _ in range(runs)
+    ]
+    return statistics.median(timings) * 1000
+
+def single_row_us(predict, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        predict()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the model package to the native artifact")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--out", default=None, help="artifact directory (default: model path without .pkl)")
+    parser.add_argument("--repeat", type=int, default=500, help="single-row predictions to time")
+    args = parser.parse_args()
+
+    print("📂 Loading pickle package...")
+    package = read_model_package(args.model)
+    native_dir = export_native(package, args.out or native_artifact_path(args.model))
+    native = read_model_package(native_dir)
+    print(f"✅ Native artifact saved to: {native_dir}")
+
+    input_features = package["input_features"]
+    row = {"height_cm": 165.0, "bust_cm": 88.0, "waist_cm": 70.0, "hip_cm": 96.0, "chest_cm": np.nan}
+    row_matrix = np.array([[row.get(col, np.nan) for col in input_features]])
+
+    # One row per allowed input pattern, so every pattern booster is compared
+    full = {**row, "chest_cm": 92.0}
+    patterns = np.array([[full.get(col, np.nan) if col in features else np.nan for col in input_features]
+                         for features in input_patterns(input_features)])
+    old, new = predict_matrix(patterns, package), predict_matrix(patterns, native)
+    print(f"🔍 Max prediction difference over {len(patterns)} input patterns: {np.abs(old - new).max():.6f}")
+
+    print("⏱️ Timing...")
+    report = {
+        kind: (cold_load_ms(path), single_row_us(lambda: predict_matrix(row_matrix, loaded), args.repeat))
+        for kind, path, loaded in (("pickle", args.model, package), ("native", native_dir, native))
+    }
+    print(f"\n{'format':<8} {'cold load (ms)':>15} {'single row (µs)':>16}")
+    for kind, (load_ms, row_us) in report.items():
+        print(f"{kind:<8} {load_ms:>15.1f} {row_us:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -55,140 +55,192 @@ CUSTOM_RULES = {
         {
             "type": "proportion",
             "base": "back_shoulder_cm",
+            "expression": "6.5 * back_shoulder_cm",
             "multiplier": 6.5,
             "tolerance": 0.3,
+            "priority": 0,
             "notes": """Ergonomic shoulder proportion"""
         },
     ],
-    "around_calf_cm": [
+    "wrist_depth": [
         {
             "type": "proportion",
-            "base": "around_thigh_cm",
-            "multiplier": 0.7,
-            "tolerance": 1.0,
-            "notes": """Tapered leg design tolerance"""
-        },
-        {
-            "type": "proportion",
-            "base": "around_ankle_cm",
-            "multiplier": 1.5,
-            "tolerance": 0.2,
-            "notes": """Boot fit tolerance"""
+            "base": "wrist_width",
+            "expression": "0.8 * wrist_width",
+            "multiplier": 0.8,
+            "tolerance": 0.05,
+            "priority": 0,
+            "notes": """Glove articulation standard"""
         },
     ],
     "pant_inseam_cm": [
         {
             "type": "proportion",
             "base": "height_cm",
+            "expression": "0.5 * height_cm",
             "multiplier": 0.5,
             "tolerance": 0.03,
+            "priority": 0,
             "notes": """Vaia dataset ±3cm allowance for posture variations"""
         },
     ],
-    "skirt_full_length_cm": [
+    "around_thigh_cm": [
+        {
+            "type": "proportion",
+            "base": "hip_cm",
+            "expression": "0.6 * hip_cm",
+            "multiplier": 0.6,
+            "tolerance": 1.5,
+            "priority": 0,
+            "notes": """±1.5cm for athletic/muscular builds"""
+        },
         {
             "type": "proportion",
             "base": "height_cm",
-            "multiplier": 0.5,
-            "tolerance": 0.03,
-            "notes": """Midi skirt proportion standard"""
+            "expression": "0.35 * height_cm",
+            "multiplier": 0.35,
+            "tolerance": 0.05,
+            "priority": 0,
+            "notes": """Athletic wear standard (0.6±0.05)"""
         },
     ],
     "elbow_length_cm": [
+        {
+            "type": "formula",
+            "expression": "sleeve_length_cm - 0.2 * height_cm",
+            "requires": ['sleeve_length_cm', 'height_cm'],
+            "tolerance": 0.5,
+            "priority": 0,
+            "notes": """Sleeve articulation allowance"""
+        },
         {
             "type": "proportion",
             "base": "height_cm",
+            "expression": "0.25 * height_cm",
             "multiplier": 0.25,
             "tolerance": 0.02,
+            "priority": 0,
             "notes": """Long-sleeve garment standard"""
         },
     ],
-    "dress_full_length_cm": [
+    "skirt_full_length_cm": [
         {
             "type": "proportion",
             "base": "height_cm",
-            "multiplier": 0.9,
-            "tolerance": 0.02,
-            "notes": """Maxi dress standard (±2cm hem allowance"""
+            "expression": "0.5 * height_cm",
+            "multiplier": 0.5,
+            "tolerance": 0.03,
+            "priority": 0,
+            "notes": """Midi skirt proportion standard"""
         },
     ],
     "pant_knee_length_cm": [
         {
             "type": "proportion",
             "base": "height_cm",
+            "expression": "0.5 * height_cm",
             "multiplier": 0.5,
             "tolerance": 0.02,
+            "priority": 0,
             "notes": """Cropped trouser standard"""
         },
     ],
-    "hip_cm": [
+    "waist_cm": [
         {
             "type": "proportion",
-            "base": "around_calf_cm",
-            "multiplier": 1.8,
-            "tolerance": 0.8,
-            "notes": """Pencil skirt drafting tolerance"""
+            "base": "hip_cm",
+            "expression": "0.7 * hip_cm",
+            "multiplier": 0.7,
+            "tolerance": 0.05,
+            "priority": 0,
+            "notes": """Female: 0.65-0.75, Male: 0.85-0.95 (WHO standards)"""
         },
         {
             "type": "proportion",
-            "base": "around_knee_cm",
-            "multiplier": 2.0,
-            "tolerance": 0.5,
-            "notes": """Fitted skirt standard"""
+            "base": "height_cm",
+            "expression": "0.43 * height_cm",
+            "multiplier": 0.43,
+            "tolerance": 0.03,
+            "priority": 0,
+            "notes": """Health assessment guideline (WHO)"""
         },
-    ],
-    "skirt_knee_length_cm": [
         {
             "type": "proportion",
-            "base": "height_cm",
-            "multiplier": 0.4,
-            "tolerance": 0.03,
-            "notes": """Knee-length skirt proportion ±3cm"""
+            "base": "pant_inseam_cm",
+            "expression": "0.35 * pant_inseam_cm",
+            "multiplier": 0.35,
+            "tolerance": 0.02,
+            "priority": 0,
+            "notes": """High-rise trouser standard"""
         },
         {
             "type": "proportion",
-            "base": "skirt_full_length_cm",
-            "multiplier": 0.6,
+            "base": "waist_hip_distance_cm",
+            "expression": "2.5 * waist_hip_distance_cm",
+            "multiplier": 2.5,
             "tolerance": 0.02,
-            "notes": """Knee-length proportion"""
+            "priority": 0,
+            "notes": """Corset pattern standard"""
         },
     ],
-    "waist_cm": [
+    "around_calf_cm": [
         {
             "type": "proportion",
-            "base": "hip_cm",
+            "base": "around_thigh_cm",
+            "expression": "0.7 * around_thigh_cm",
             "multiplier": 0.7,
-            "tolerance": 0.05,
-            "notes": """Female: 0.65-0.75, Male: 0.85-0.95 (WHO standards)"""
+            "tolerance": 1.0,
+            "priority": 0,
+            "notes": """Tapered leg design tolerance"""
         },
+    ],
+    "skirt_knee_length_cm": [
         {
             "type": "proportion",
             "base": "height_cm",
-            "multiplier": 0.43,
+            "expression": "0.4 * height_cm",
+            "multiplier": 0.4,
             "tolerance": 0.03,
-            "notes": """Health assessment guideline (WHO)"""
+            "priority": 0,
+            "notes": """Knee-length skirt proportion ±3cm"""
         },
         {
             "type": "proportion",
-            "base": "pant_inseam_cm",
-            "multiplier": 0.35,
+            "base": "skirt_full_length_cm",
+            "expression": "0.6 * skirt_full_length_cm",
+            "multiplier": 0.6,
             "tolerance": 0.02,
-            "notes": """High-rise trouser standard"""
+            "priority": 0,
+            "notes": """Knee-length proportion"""
+        },
+    ],
+    "pant_body_rise_cm": [
+        {
+            "type": "formula",
+            "expression": "pant_outseam_cm - pant_inseam_cm",
+            "requires": ['pant_outseam_cm', 'pant_inseam_cm'],
+            "tolerance": 1.0,
+            "priority": 0,
+            "notes": """Trouser drafting standard ±1cm"""
         },
         {
             "type": "proportion",
-            "base": "waist_hip_distance_cm",
-            "multiplier": 2.5,
+            "base": "waist_cm",
+            "expression": "0.35 * waist_cm",
+            "multiplier": 0.35,
             "tolerance": 0.02,
-            "notes": """Corset pattern standard"""
+            "priority": 0,
+            "notes": """Low-rise trouser standard"""
         },
     ],
     "bust_cm": [
         {
             "type": "proportion",
             "base": "waist_cm",
+            "expression": "1.5 * waist_cm",
             "multiplier": 1.5,
             "tolerance": 0.1,
+            "priority": 0,
             "notes": """Hourglass body standard (1.5±0.1)"""
         },
     ],
@@ -196,47 +248,77 @@ CUSTOM_RULES = {
         {
             "type": "offset",
             "base": "waist_cm",
+            "expression": "10 + waist_cm",
             "offset": 10.0,
             "tolerance": 0.8,
+            "priority": 0,
             "notes": """Menswear standard ±0.8cm"""
         },
     ],
-    "pant_body_rise_cm": [
+    "around_ankle_cm": [
+        {
+            "type": "proportion",
+            "base": "around_calf_cm",
+            "expression": "0.6 * around_calf_cm",
+            "multiplier": 0.6,
+            "tolerance": 0.3,
+            "priority": 0,
+            "notes": """Skinny jean standard"""
+        },
+        {
+            "type": "proportion",
+            "base": "around_thigh_cm",
+            "expression": "0.5 * around_thigh_cm",
+            "multiplier": 0.5,
+            "tolerance": 0.2,
+            "priority": 0,
+            "notes": """Wide-leg trouser standard"""
+        },
         {
             "type": "proportion",
             "base": "waist_cm",
-            "multiplier": 0.35,
+            "expression": "0.15 * waist_cm",
+            "multiplier": 0.15,
             "tolerance": 0.02,
-            "notes": """Low-rise trouser standard"""
+            "priority": 0,
+            "notes": """High-waisted trouser standard"""
         },
     ],
     "bust_height_cm": [
         {
             "type": "proportion",
             "base": "bust_radius_cm",
+            "expression": "2.0 * bust_radius_cm",
             "multiplier": 2.0,
             "tolerance": 0.5,
+            "priority": 0,
             "notes": """Pattern drafting standard (ISO 8559-1:2020)"""
         },
         {
             "type": "proportion",
             "base": "bust_cm",
+            "expression": "0.6 * bust_cm",
             "multiplier": 0.6,
             "tolerance": 0.02,
+            "priority": 0,
             "notes": """Bra cup positioning standard"""
         },
         {
             "type": "proportion",
             "base": "height_cm",
+            "expression": "0.3 * height_cm",
             "multiplier": 0.3,
             "tolerance": 0.01,
+            "priority": 0,
             "notes": """Vertical bust position standard"""
         },
         {
             "type": "proportion",
             "base": "bust_cm",
+            "expression": "0.6 * bust_cm",
             "multiplier": 0.6,
             "tolerance": 0.01,
+            "priority": 0,
             "notes": """Bra band position standard"""
         },
     ],
@@ -244,15 +326,19 @@ CUSTOM_RULES = {
         {
             "type": "proportion",
             "base": "bust_cm",
+            "expression": "0.25 * bust_cm",
             "multiplier": 0.25,
             "tolerance": 0.4,
+            "priority": 0,
             "notes": """Sleeve cap adjustment tolerance"""
         },
         {
             "type": "proportion",
             "base": "back_shoulder_cm",
+            "expression": "0.25 * back_shoulder_cm",
             "multiplier": 0.25,
             "tolerance": 0.02,
+            "priority": 0,
             "notes": """Tailored jacket standard"""
         },
     ],
@@ -260,8 +346,10 @@ CUSTOM_RULES = {
         {
             "type": "proportion",
             "base": "bust_cm",
+            "expression": "0.5 * bust_cm",
             "multiplier": 0.5,
             "tolerance": 0.2,
+            "priority": 0,
             "notes": """Bra cup spacing standard"""
         },
     ],
@@ -269,8 +357,10 @@ CUSTOM_RULES = {
         {
             "type": "proportion",
             "base": "bust_cm",
+            "expression": "0.3 * bust_cm",
             "multiplier": 0.3,
             "tolerance": 0.4,
+            "priority": 0,
             "notes": """Sleeve mobility allowance"""
         },
     ],
@@ -278,52 +368,95 @@ CUSTOM_RULES = {
         {
             "type": "proportion",
             "base": "waist_cm",
+            "expression": "0.37 * waist_cm",
             "multiplier": 0.37,
             "tolerance": 0.8,
+            "priority": 0,
             "notes": """±0.8cm tolerance for collar styles"""
         },
         {
             "type": "proportion",
             "base": "chest_cm",
+            "expression": "0.4 * chest_cm",
             "multiplier": 0.4,
             "tolerance": 0.3,
+            "priority": 0,
             "notes": """Shirt collar standard"""
         },
         {
             "type": "proportion",
             "base": "height_cm",
+            "expression": "0.2 * height_cm",
             "multiplier": 0.2,
             "tolerance": 0.01,
+            "priority": 0,
             "notes": """Turtleneck standard"""
         },
     ],
+    "around_knee_cm": [
+        {
+            "type": "proportion",
+            "base": "hip_cm",
+            "expression": "0.5 * hip_cm",
+            "multiplier": 0.5,
+            "tolerance": 1.0,
+            "priority": 0,
+            "notes": """Jeans/legging design tolerance"""
+        },
+        {
+            "type": "proportion",
+            "base": "around_thigh_cm",
+            "expression": "0.6 * around_thigh_cm",
+            "multiplier": 0.6,
+            "tolerance": 0.1,
+            "priority": 0,
+            "notes": """Athletic legging standard"""
+        },
+        {
+            "type": "proportion",
+            "base": "around_ankle_cm",
+            "expression": "1.5 * around_ankle_cm",
+            "multiplier": 1.5,
+            "tolerance": 0.2,
+            "priority": 0,
+            "notes": """Jodhpur trouser standard"""
+        },
+    ],
     "front_waist_length_cm": [
         {
             "type": "proportion",
             "base": "height_cm",
+            "expression": "0.26 * height_cm",
             "multiplier": 0.26,
             "tolerance": 0.02,
+            "priority": 0,
             "notes": """Ergonomic clothing standard (EN 13402)"""
         },
         {
             "type": "proportion",
             "base": "back_waist_length_cm",
+            "expression": "1.2 * back_waist_length_cm",
             "multiplier": 1.2,
             "tolerance": 0.1,
+            "priority": 0,
             "notes": """Bodice block proportion (ISO 8559-2)"""
         },
         {
             "type": "proportion",
             "base": "bust_height_cm",
+            "expression": "1.3 * bust_height_cm",
             "multiplier": 1.3,
             "tolerance": 0.01,
+            "priority": 0,
             "notes": """Empire line dress standard"""
         },
         {
             "type": "proportion",
             "base": "height_cm",
+            "expression": "0.4 * height_cm",
             "multiplier": 0.4,
             "tolerance": 0.01,
+            "priority": 0,
             "notes": """Cropped jacket standard"""
         },
     ],
@@ -331,15 +464,19 @@ CUSTOM_RULES = {
         {
             "type": "proportion",
             "base": "height_cm",
+            "expression": "0.08 * height_cm",
             "multiplier": 0.08,
             "tolerance": 0.02,
+            "priority": 0,
             "notes": """Jacket/coat pattern standard"""
         },
         {
             "type": "proportion",
             "base": "around_bicep_cm",
+            "expression": "0.85 * around_bicep_cm",
             "multiplier": 0.85,
             "tolerance": 0.1,
+            "priority": 0,
             "notes": """Sleeve articulation standard"""
         },
     ],
@@ -347,30 +484,104 @@ CUSTOM_RULES = {
         {
             "type": "proportion",
             "base": "height_cm",
+            "expression": "0.05 * height_cm",
             "multiplier": 0.05,
             "tolerance": 0.01,
+            "priority": 0,
             "notes": """Bracelet/watch compatibility"""
         },
         {
             "type": "proportion",
             "base": "hand_entry_cm",
+            "expression": "0.6 * hand_entry_cm",
             "multiplier": 0.6,
             "tolerance": 0.1,
+            "priority": 0,
             "notes": """Glove design standard"""
         },
         {
             "type": "proportion",
             "base": "around_bicep_cm",
+            "expression": "0.6 * around_bicep_cm",
             "multiplier": 0.6,
             "tolerance": 0.1,
+            "priority": 0,
             "notes": """Long sleeve standard"""
         },
         {
             "type": "proportion",
             "base": "around_ankle_cm",
+            "expression": "1.1 * around_ankle_cm",
             "multiplier": 1.1,
             "tolerance": 0.05,
+            "priority": 0,
             "notes": """Proportion balance standard"""
         },
     ],
+    "dress_knee_length_cm": [
+        {
+            "type": "formula",
+            "expression": "front_waist_length_cm + skirt_knee_length_cm",
+            "requires": ['front_waist_length_cm', 'skirt_knee_length_cm'],
+            "tolerance": 1.2,
+            "priority": 0,
+            "notes": """Dressmaking ease allowance (ASTM D6960)"""
+        },
+    ],
+    "dress_full_length_cm": [
+        {
+            "type": "formula",
+            "expression": "front_waist_length_cm + skirt_full_length_cm",
+            "requires": ['front_waist_length_cm', 'skirt_full_length_cm'],
+            "tolerance": 1.5,
+            "priority": 0,
+            "notes": """Full-length dress standard (ISO 3635)"""
+        },
+        {
+            "type": "proportion",
+            "base": "height_cm",
+            "expression": "0.9 * height_cm",
+            "multiplier": 0.9,
+            "tolerance": 0.02,
+            "priority": 0,
+            "notes": """Maxi dress standard (±2cm hem allowance"""
+        },
+    ],
 }
+
+PROCESSING_ORDER = [
+    "hip_cm",
+    "waist_hip_distance_cm",
+    "bust_radius_cm",
+    "back_waist_length_cm",
+    "back_shoulder_cm",
+    "pant_outseam_cm",
+    "sleeve_length_cm",
+    "hand_entry_cm",
+    "wrist_width",
+    "height_cm",
+    "wrist_depth",
+    "pant_inseam_cm",
+    "around_thigh_cm",
+    "elbow_length_cm",
+    "skirt_full_length_cm",
+    "pant_knee_length_cm",
+    "waist_cm",
+    "around_calf_cm",
+    "skirt_knee_length_cm",
+    "pant_body_rise_cm",
+    "bust_cm",
+    "chest_cm",
+    "around_ankle_cm",
+    "bust_height_cm",
+    "around_bicep_cm",
+    "breast_distance_cm",
+    "around_armhole_cm",
+    "around_neck_cm",
+    "around_knee_cm",
+    "front_waist_length_cm",
+    "around_elbow_cm",
+    "around_wrist_cm",
+    "dress_knee_length_cm",
+    "dress_full_length_cm",
+]
@@ -1,9 +1,10 @@
-import pandas as pd
 import numpy as np
-import re
+
+from data_store import read_table, write_table
+from formula_compiler import compile_formula
 
 # Load your original dataset
-df = pd.read_excel('data/original_measurements.xlsx')
+df = read_table('data/original_measurements.xlsx')
 
 # List of rules extracted from your image (simplified to formula and columns)
 rules = [
@@ -57,11 +58,11 @@ for target, formula in rules:
 
     # Attempt to evaluate the formula only if all base columns exist
     try:
-        # Extract base columns used in formula
-        base_columns = re.findall(r'[a-zA-Z_]+_cm', formula)
-        if all(col in df.columns for col in base_columns):
-            # Evaluate the formula row-wise
-            df.loc[missing_rows, target] = df.loc[missing_rows].eval(formula)
+        # Compiled once per formula; dependencies come from the parsed expression
+        kernel = compile_formula(formula)
+        if all(col in df.columns for col in kernel.dependencies):
+            # One NumPy expression over the whole columns
+            df.loc[missing_rows, target] = kernel(df)[missing_rows.to_numpy()]
     except Exception as e:
         print(f"Skipping rule: {target} = {formula} due to error: {e}")
 
@@ -70,5 +71,5 @@ df = df.round(1)
 
 # Save the cleaned and filled dataset
 output_path = 'data/cleaned_filled_measurements.xlsx'
-df.to_excel(output_path, index=False)
+write_table(df, output_path)
 print(f"✅ Cleaned file saved to: {output_path}")
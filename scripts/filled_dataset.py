@@ -1,4 +1,4 @@
-import pandas as pd
+from data_store import read_table, write_table
 
 # Paths to your files
 original_path = "data/original_measurements.xlsx"
@@ -6,8 +6,8 @@ relationships_path = "data/measurement_relationships.xlsx"
 output_path = "data/cleaned_measurements_filled.xlsx"
 
 # Load the original dataset and rules
-df_original = pd.read_excel(original_path)
-df_rules = pd.read_excel(relationships_path)
+df_original = read_table(original_path)
+df_rules = read_table(relationships_path)
 
 # Make a copy of the original data
 df_filled = df_original.copy()
@@ -29,5 +29,5 @@ for idx, row in df_rules.iterrows():
 df_filled = df_filled.round(1)
 
 # Save to new file
-df_filled.to_excel(output_path, index=False)
+write_table(df_filled, output_path)
 print(f"✅ Cleaned file saved to: {output_path}")
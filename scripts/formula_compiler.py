@@ -0,0 +1,119 @@
+# formula_compiler.py
+import ast
+import re
+from functools import lru_cache
+
+import numpy as np
+
+_BINARY_OPS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+_UNARY_OPS = (ast.UAdd, ast.USub)
+
+def clean_name(text):
+    """Convert measurement names to snake_case"""
+    cleaned = re.sub(r'[^a-z0-9_]', '_', str(text).strip().lower())
+    return re.sub(r'_+', '_', cleaned)
+
+class _NameCleaner(ast.NodeTransformer):
+    """Validates the arithmetic-only grammar and snake_cases every column name"""
+
+    def visit_Expression(self, node):
+        self.generic_visit(node)
+        return node
+
+    def visit_BinOp(self, node):
+        if type(node.op) not in _BINARY_OPS:
+            raise ValueError(f"Unsupported operator: {ast.unparse(node)}")
+        self.generic_visit(node)
+        return node
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _UNARY_OPS):
+            raise ValueError(f"Unsupported operator: {ast.unparse(node)}")
+        self.generic_visit(node)
+        return node
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ValueError(f"Unsupported constant: {node.value!r}")
+        return node
+
+    def visit_Name(self, node):
+        return ast.copy_location(ast.Name(id=clean_name(node.id), ctx=ast.Load()), node)
+
+    def generic_visit(self, node):
+        if not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant,
+                                 ast.Name, ast.operator, ast.unaryop, ast.expr_context)):
+            raise ValueError(f"Unsupported syntax in formula: {type(node).__name__}")
+        return super().generic_visit(node)
+
+def _linear_form(node):
+    """Return ({column: coefficient}, constant) for linear expressions, else None"""
+    if isinstance(node, ast.Constant):
+        return {}, float(node.value)
+    if isinstance(node, ast.Name):
+        return {node.id: 1.0}, 0.0
+    if isinstance(node, ast.UnaryOp):
+        inner = _linear_form(node.operand)
+        if inner is None or isinstance(node.op, ast.UAdd):
+            return inner
+        return {col: -coef for col, coef in inner[0].items()}, -inner[1]
+
+    left, right = _linear_form(node.left), _linear_form(node.right)
+    if left is None or right is None:
+        return None
+    if isinstance(node.op, (ast.Add, ast.Sub)):
+        sign = 1.0 if isinstance(node.op, ast.Add) else -1.0
+        coefs = dict(left[0])
+        for col, coef in right[0].items():
+            coefs[col] = coefs.get(col, 0.0) + sign * coef
+        return coefs, left[1] + sign * right[1]
+    if isinstance(node.op, ast.Mult):
+        if not left[0]:
+            left, right = right, left
+        if right[0]:
+            return None  # column * column
+        factor = right[1]
+        return {col: coef * factor for col, coef in left[0].items()}, left[1] * factor
+    if isinstance(node.op, ast.Div) and not right[0] and right[1] != 0:
+        divisor = right[1]
+        return {col: coef / divisor for col, coef in left[0].items()}, left[1] / divisor
+    return None
+
+class CompiledFormula:
+    """Arithmetic formula compiled once into a vectorized kernel over column arrays"""
+
+    def __init__(self, source):
+        tree = _NameCleaner().visit(ast.parse(source.strip(), mode="eval"))
+        ast.fix_missing_locations(tree)
+
+        self.expression = ast.unparse(tree)
+        self.dependencies = list(dict.fromkeys(
+            node.id for node in ast.walk(tree) if isinstance(node, ast.Name)
+        ))
+        body = tree.body
+        self.operator = _BINARY_OPS[type(body.op)] if isinstance(body, ast.BinOp) else None
+        self.linear = _linear_form(body)
+        self._code = compile(tree, f"<formula: {self.expression}>", "eval")
+
+    def __call__(self, columns):
+        """Evaluate over a DataFrame or any mapping of column name -> array"""
+        env = {name: np.asarray(columns[name], dtype=float) for name in self.dependencies}
+        return eval(self._code, {"__builtins__": {}}, env)
+
+    def __repr__(self):
+        return f"CompiledFormula({self.expression!r})"
+
+@lru_cache(maxsize=None)
+def compile_formula(source: str) -> CompiledFormula:
+    """Parse and compile a right-hand-side expression, cached per formula string"""
+    try:
+        return CompiledFormula(source)
+    except SyntaxError as e:
+        raise ValueError(f"Invalid formula '{source}': {e.msg}") from None
+
+def split_rule(formula: str):
+    """Split 'target = expression' into (snake_case target, CompiledFormula)"""
+    if '=' not in formula:
+        raise ValueError("Missing '=' in formula")
+    left_side, right_side = formula.split('=', 1)
+    return clean_name(left_side.strip()), compile_formula(right_side.strip())
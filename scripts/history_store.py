@@ -0,0 +1,213 @@
+# history_store.py
+# Per-customer measurement history kept as running state, so a new session is cleaned
+# against it without re-sorting and re-grouping every visit ever recorded:
+# running sum/count for the stable columns, last-known value for the time-sensitive ones.
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from data_store import DATA_DIR
+
+HISTORY_FORMAT = "bmp-history-1"
+DEFAULT_HISTORY_PATH = os.path.join(DATA_DIR, "customer_history.feather")
+# Sessions added with clean_data --append: one raw and one cleaned Feather file per batch
+VISIT_LOG_DIR = os.path.join(DATA_DIR, "visit_log")
+VISIT_LOG_MANIFEST = "manifest.json"
+DATE_COL = "Date Measured (YYYY-MM-DD)"
+
+# Filled with the customer's mean over all their sessions
+STABLE_COLS = ["height_cm", "elbow_length_cm", "around_bicep_cm", "around_elbow_cm"]
+# Filled with the customer's last known value (body shape changes over time)
+TIME_SENSITIVE_COLS = ["waist_cm", "hip_cm", "bust_cm"]
+
+class HistoryStore:
+    """Running per-customer state in flat arrays, one row per customer id.
+
+    `rows` maps a customer id to its row, so folding in a visit is a dict lookup
+    plus a few array writes: O(1) per visit however long the history is.
+    Arrays grow by doubling. `medians` holds the column medians of the last full
+    clean, used for gaps neither the history nor the rules can fill.
+    """
+
+    def __init__(self, stable_cols=STABLE_COLS, time_sensitive_cols=TIME_SENSITIVE_COLS):
+        self.stable_cols = list(stable_cols)
+        self.time_sensitive_cols = list(time_sensitive_cols)
+        self.ids = []
+        self.rows = {}
+        self.medians = {}
+        self.columns = {"visits": np.zeros(0, dtype=np.int64),
+                        "last_date": np.full(0, np.datetime64("NaT"), dtype="datetime64[ns]")}
+        for col in self.stable_cols:
+            self.columns[f"{col}__sum"] = np.zeros(0)
+            self.columns[f"{col}__count"] = np.zeros(0, dtype=np.int64)
+        for col in self.time_sensitive_cols:
+            self.columns[f"{col}__last"] = np.full(0, np.nan)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _positions(self, ids):
+        """Rows of `ids`, adding empty rows for customers seen for the first time"""
+        positions = np.fromiter((self.rows.get(customer, -1) for customer in ids), dtype=np.intp, count=len(ids))
+        new = np.flatnonzero(positions < 0)
+        if len(new):
+            needed = len(self.ids) + len(new)
+            capacity = len(self.columns["visits"])
+            if needed > capacity:
+                grow = max(needed, 2 * capacity, 1024) - capacity
+                for name, array in self.columns.items():
+                    fill = np.datetime64("NaT") if array.dtype.kind == "M" else (np.nan if array.dtype.kind == "f" else 0)
+                    self.columns[name] = np.concatenate([array, np.full(grow, fill, dtype=array.dtype)])
+            for i in new:
+                positions[i] = self.rows[ids[i]] = len(self.ids)
+                self.ids.append(ids[i])
+        return positions
+
+    def _add_round(self, visits):
+        """Fill and fold in visits of distinct customers"""
+        positions = self._positions(visits["id"].tolist())
+        filled = visits.copy()
+
+        for col in self.stable_cols:
+            observed = visits[col].to_numpy(dtype=float)
+            seen = ~np.isnan(observed)
+            sums, counts = self.columns[f"{col}__sum"], self.columns[f"{col}__count"]
+            sums[positions] += np.where(seen, observed, 0.0)
+            counts[positions] += seen
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = sums[positions] / counts[positions]
+            filled[col] = np.where(seen, observed, mean)
+
+        dates = visits[DATE_COL].to_numpy(dtype="datetime64[ns]")
+        last_dates = self.columns["last_date"][positions]
+        newest = np.isnat(last_dates) | (dates >= last_dates)
+        for col in self.time_sensitive_cols:
+            observed = visits[col].to_numpy(dtype=float)
+            seen = ~np.isnan(observed)
+            last = self.columns[f"{col}__last"]
+            filled[col] = np.where(seen, observed, last[positions])
+            last[positions] = np.where(seen & newest, observed, last[positions])
+
+        self.columns["visits"][positions] += 1
+        self.columns["last_date"][positions] = np.where(newest, dates, last_dates)
+        return filled
+
+    def is_new(self, visits):
+        """True for sessions newer than everything stored for their customer.
+
+        Every folded-in (customer, date) pair is at or before the customer's last
+        stored date, so this rejects re-appended sessions (and older ones) in O(visits).
+        """
+        positions = np.fromiter((self.rows.get(customer, -1) for customer in visits["id"]),
+                                dtype=np.intp, count=len(visits))
+        last_dates = np.where(positions >= 0, self.columns["last_date"][np.maximum(positions, 0)],
+                              np.datetime64("NaT"))
+        dates = visits[DATE_COL].to_numpy(dtype="datetime64[ns]")
+        return np.isnat(last_dates) | (dates > last_dates)
+
+    def add_visits(self, visits):
+        """Fill the gaps in newly measured sessions from the stored history and fold them in.
+
+        Returns the visits sorted by id and date, like clean_data.load_data. Visits
+        are expected to be newer than what is stored: an older one is still filled
+        from the latest known values, but doesn't replace them.
+        """
+        visits = visits.sort_values(by=["id", DATE_COL], kind="stable")
+        # Sessions of one customer are folded in one at a time, in date order
+        session = visits.groupby("id", sort=False).cumcount().to_numpy()
+        parts = [self._add_round(visits[session == n]) for n in range(session.max() + 1 if len(visits) else 0)]
+        return pd.concat(parts).loc[visits.index] if parts else visits.copy()
+
+    @classmethod
+    def from_history(cls, data, stable_cols=STABLE_COLS, time_sensitive_cols=TIME_SENSITIVE_COLS):
+        """Build the state from a whole raw history (sorted by id and date) in one pass"""
+        store = cls(stable_cols, time_sensitive_cols)
+        grouped = data.groupby("id", sort=False)
+        ids = list(grouped.size().index)
+        positions = store._positions(ids)
+        store.columns["visits"][positions] = grouped.size().to_numpy()
+        store.columns["last_date"][positions] = grouped[DATE_COL].max().to_numpy(dtype="datetime64[ns]")
+        for col in store.stable_cols:
+            store.columns[f"{col}__sum"][positions] = grouped[col].sum().to_numpy(dtype=float)
+            store.columns[f"{col}__count"][positions] = grouped[col].count().to_numpy()
+        for col in store.time_sensitive_cols:
+            # last() skips NaN: the value a forward fill would carry into the next visit
+            store.columns[f"{col}__last"][positions] = grouped[col].last().to_numpy(dtype=float)
+        return store
+
+    def save(self, path=DEFAULT_HISTORY_PATH):
+        frame = pd.DataFrame({"id": self.ids, **{name: array[:len(self.ids)] for name, array in self.columns.items()}})
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        meta = {"format": HISTORY_FORMAT, "stable_cols": self.stable_cols,
+                "time_sensitive_cols": self.time_sensitive_cols, "medians": self.medians}
+        table = table.replace_schema_metadata({"history_store": json.dumps(meta)})
+        feather.write_feather(table, path, compression="uncompressed")
+
+    @classmethod
+    def load(cls, path=DEFAULT_HISTORY_PATH):
+        table = feather.read_table(path)
+        meta = json.loads((table.schema.metadata or {}).get(b"history_store", b"{}"))
+        if meta.get("format") != HISTORY_FORMAT:
+            raise ValueError(f"{path} is not a customer history store ({meta.get('format')!r})")
+
+        store = cls(meta["stable_cols"], meta["time_sensitive_cols"])
+        store.medians = meta["medians"]
+        frame = table.to_pandas()
+        store.ids = frame["id"].tolist()
+        store.rows = {customer: i for i, customer in enumerate(store.ids)}
+        for name, array in store.columns.items():
+            store.columns[name] = frame[name].to_numpy(dtype=array.dtype, copy=True)
+        return store
+
+def _read_manifest(log_dir):
+    try:
+        with open(os.path.join(log_dir, VISIT_LOG_MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"batches": []}
+
+def _write_manifest(manifest, log_dir):
+    # The pipeline hashes this file, so it changes whenever the log does
+    path = os.path.join(log_dir, VISIT_LOG_MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def _write_frame(df, path):
+    df.reset_index(drop=True).to_feather(path + ".tmp", compression="uncompressed")
+    os.replace(path + ".tmp", path)
+
+def append_visit_log(raw, cleaned, log_dir=VISIT_LOG_DIR):
+    """Add one batch of sessions: cost depends on the batch, not on what is already logged"""
+    os.makedirs(log_dir, exist_ok=True)
+    manifest = _read_manifest(log_dir)
+    batch = max((entry["batch"] for entry in manifest["batches"]), default=0) + 1
+    _write_frame(raw, os.path.join(log_dir, f"raw-{batch:05d}.feather"))
+    _write_frame(cleaned, os.path.join(log_dir, f"cleaned-{batch:05d}.feather"))
+    manifest["batches"].append({"batch": batch, "rows": len(raw), "cleaned": True})
+    _write_manifest(manifest, log_dir)
+    return batch
+
+def read_visit_log(kind, log_dir=VISIT_LOG_DIR):
+    """All logged "raw" sessions, or the "cleaned" rows not yet in the cleaned workbook (None if none)"""
+    batches = [entry["batch"] for entry in _read_manifest(log_dir)["batches"] if kind == "raw" or entry["cleaned"]]
+    frames = [feather.read_feather(os.path.join(log_dir, f"{kind}-{batch:05d}.feather")) for batch in batches]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+def fold_visit_log(log_dir=VISIT_LOG_DIR):
+    """After a full clean: the cleaned workbook now holds every logged session, so drop the cleaned batches.
+
+    The raw batches stay; they are the only copy of the appended sessions.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    manifest = _read_manifest(log_dir)
+    for entry in manifest["batches"]:
+        path = os.path.join(log_dir, f"cleaned-{entry['batch']:05d}.feather")
+        if os.path.exists(path):
+            os.remove(path)
+        entry["cleaned"] = False
+    _write_manifest(manifest, log_dir)
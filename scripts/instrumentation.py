@@ -0,0 +1,129 @@
+# instrumentation.py
+# Per-stage wall time, CPU time, peak traced memory and row counts for the pipeline.
+#
+#   BMP_PROFILE=1             enable (anything except "" / "0")
+#   BMP_PROFILE_REPORT=path   JSON run report (default: profiles/<script>-<timestamp>.json)
+#   BMP_CPROFILE=path         also dump a cProfile of the whole run (view with snakeviz/pstats)
+#
+# When BMP_PROFILE is off, stage() returns one shared no-op object and @instrumented
+# returns the function untouched, so the scripts pay nothing.
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ENABLED = os.environ.get("BMP_PROFILE", "") not in ("", "0")
+
+_records = []
+_stack = []
+
+class _Stage:
+    """Times one stage; nested stages keep their parent's peak memory correct"""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self._peak = 0
+
+    def set_rows(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        if _stack:
+            parent = _stack[-1]
+            parent._peak = max(parent._peak, tracemalloc.get_traced_memory()[1])
+        _stack.append(self)
+        self._start_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        current, peak = tracemalloc.get_traced_memory()
+        self._peak = max(self._peak, peak)
+        _stack.pop()
+        if _stack:
+            _stack[-1]._peak = max(_stack[-1]._peak, self._peak)
+
+        _records.append({
+            "stage": self.name,
+            "depth": len(_stack),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_mb": round(self._peak / 2**20, 3),
+            "net_alloc_mb": round((current - self._start_memory) / 2**20, 3),
+            "rows": self.rows,
+            "failed": exc_type is not None,
+        })
+        return False
+
+class _NoopStage:
+    def set_rows(self, rows):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP = _NoopStage()
+
+def stage(name, rows=None):
+    """Context manager for one pipeline stage; use .set_rows() once the row count is known"""
+    return _Stage(name, rows) if ENABLED else _NOOP
+
+def _row_count(value):
+    shape = getattr(value, "shape", None)
+    if shape:
+        return int(shape[0])
+    return len(value) if hasattr(value, "__len__") else None
+
+def instrumented(name=None):
+    """Decorator form of stage(); rows are taken from the return value when it has a length"""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__qualname__) as current:
+                result = func(*args, **kwargs)
+                current.set_rows(_row_count(result))
+                return result
+        return wrapper
+    return decorate
+
+def write_report(path=None):
+    """Write the stages recorded so far as a JSON run report"""
+    script = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+    path = path or os.environ.get("BMP_PROFILE_REPORT") or os.path.join(
+        "profiles", f"{script}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"script": script, "argv": sys.argv, "stages": _records}, f, indent=2)
+    print(f"⏱️ Profile report saved to: {path}")
+    return path
+
+if ENABLED:
+    tracemalloc.start()
+    _profiler = None
+    if os.environ.get("BMP_CPROFILE"):
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+    @atexit.register
+    def _finish():
+        if _profiler is not None:
+            _profiler.disable()
+            _profiler.dump_stats(os.environ["BMP_CPROFILE"])
+        if _records:
+            write_report()
@@ -0,0 +1,300 @@
+# pipeline.py
+# Incremental runner for the workbook → model chain. Each stage declares its inputs and
+# outputs; a stage is skipped when the hash of its inputs, code and arguments matches the
+# last successful run and its outputs are still the files it wrote. Stages whose
+# dependencies are done run in parallel, each in its own interpreter.
+#
+#   python scripts/pipeline.py                    # bring everything up to date
+#   python scripts/pipeline.py --dry-run          # show what would run
+#   python scripts/pipeline.py retrain_model      # one stage plus whatever it needs
+#   python scripts/pipeline.py --force clean_data
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from data_store import ROOT_DIR, file_hash
+
+STATE_PATH = os.path.join(ROOT_DIR, ".pipeline_state.json")
+MODULE_DIRS = ["scripts", "notebooks"]
+
+# Paths are relative to the project root; every stage runs with the root as cwd
+STAGES = {
+    "excel_to_rules": {
+        "script": "scripts/excel_to_rules.py",
+        "args": ["--output", "scripts/fashion_rules.py"],
+        "inputs": ["data/measurement_relationships.xlsx", "data/measurement_descriptions.xlsx"],
+        "outputs": ["scripts/fashion_rules.py", "scripts/fashion_rules_compiled/meta.json"],
+    },
+    "clean_data": {
+        "script": "scripts/clean_data.py",
+        "args": [],
+        "inputs": ["data/original_measurements.xlsx"],
+        "outputs": ["data/cleaned_measurements.xlsx", "data/customer_history.feather"],
+    },
+    "round_and_validate": {
+        "script": "scripts/round_and_validate.py",
+        "args": [],
+        # The manifest changes with every clean_data --append batch
+        "inputs": ["data/cleaned_measurements.xlsx", "data/visit_log/manifest.json"],
+        "outputs": ["data/rounded_measurements.xlsx"],
+    },
+    "augment_data": {
+        "script": "scripts/augment_data.py",
+        # Fixed seed so a re-run reproduces the same rows and downstream stages can be skipped
+        "args": ["--seed", "42"],
+        "inputs": ["data/rounded_measurements.xlsx"],
+        "outputs": ["data/augmented_measurements.xlsx"],
+    },
+    "round_excel": {
+        "script": "scripts/round_excel.py",
+        "args": ["--input", "data/augmented_measurements.xlsx",
+                 "--output", "data/augmented_measurements_rounded.xlsx"],
+        "inputs": ["data/augmented_measurements.xlsx"],
+        "outputs": ["data/augmented_measurements_rounded.xlsx"],
+    },
+    "retrain_model": {
+        "script": "notebooks/retrain_model.py",
+        "args": ["--data", "data/augmented_measurements_rounded.xlsx",
+                 "--model", "models/body_measurement_predictor_v5.pkl"],
+        "inputs": ["data/augmented_measurements_rounded.xlsx", "scripts/fashion_rules_compiled/meta.json"],
+        "outputs": ["models/body_measurement_predictor_v5.pkl",
+                    "models/body_measurement_predictor_v5/booster.ubj",
+                    "models/body_measurement_predictor_v5/meta.json"],
+    },
+    "body_index": {
+        "script": "scripts/body_index.py",
+        "args": ["--data", "data/model_ready_measurements.xlsx",
+                 "--model", "models/body_measurement_predictor_v5.pkl"],
+        "inputs": ["data/model_ready_measurements.xlsx"],
+        "outputs": ["models/body_measurement_predictor_v5_bodies.pkl"],
+    },
+}
+
+def dependencies(stages):
+    """stage -> set of stages that produce one of its inputs"""
+    producers = {output: name for name, spec in stages.items() for output in spec["outputs"]}
+    return {
+        name: {producers[path] for path in spec["inputs"] if path in producers and producers[path] != name}
+        for name, spec in stages.items()
+    }
+
+def with_ancestors(targets, deps):
+    selected, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(deps[name])
+    return selected
+
+def downstream(name, deps):
+    found, pending = set(), [name]
+    while pending:
+        current = pending.pop()
+        for other, needs in deps.items():
+            if current in needs and other not in found:
+                found.add(other)
+                pending.append(other)
+    return found
+
+def code_files(script):
+    """The script plus every project module it imports, followed transitively"""
+    found, pending = set(), [script]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        with open(os.path.join(ROOT_DIR, path), encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                for directory in MODULE_DIRS:
+                    candidate = f"{directory}/{name.split('.')[0]}.py"
+                    if os.path.exists(os.path.join(ROOT_DIR, candidate)):
+                        pending.append(candidate)
+                        break
+    return sorted(found)
+
+class HashCache:
+    """Content hashes that are only recomputed when a file's mtime or size changed"""
+
+    def __init__(self, known):
+        self.known = known
+
+    def __call__(self, path):
+        full_path = os.path.join(ROOT_DIR, path)
+        stat = os.stat(full_path)
+        entry = self.known.get(path)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["sha256"]
+        digest = file_hash(full_path)
+        self.known[path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+        return digest
+
+def stage_key(spec, hashes):
+    """Hash of everything that decides a stage's outputs: inputs, code and arguments"""
+    inputs = set(spec["inputs"])
+    payload = {
+        "script": spec["script"],
+        "args": spec["args"],
+        "inputs": {path: hashes(path) for path in spec["inputs"]},
+        # A generated module that is also a declared input is already covered above
+        "code": {path: hashes(path) for path in code_files(spec["script"]) if path not in inputs},
+        "python": sys.version_info[:2],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def outputs_intact(spec, record, hashes):
+    for path in spec["outputs"]:
+        if not os.path.exists(os.path.join(ROOT_DIR, path)):
+            return False
+        if record["outputs"].get(path) != hashes(path):
+            return False
+    return True
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"stages": {}, "files": {}}
+
+def save_state(state, path=STATE_PATH):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, path)
+
+def run_stage(name, spec):
+    """Run one stage in a fresh interpreter; returns (returncode, captured output, seconds)"""
+    # Captured pipes default to the ANSI code page on Windows, which can't encode the emoji
+    env = {**os.environ, "PYTHONIOENCODING": "utf-8"}
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, spec["script"], *spec["args"]],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, encoding="utf-8", errors="replace",
+    )
+    return result.returncode, result.stdout + result.stderr, time.perf_counter() - started
+
+def run_pipeline(targets=None, force=False, jobs=None, dry_run=False, stages=STAGES):
+    """Bring the selected stages (and what they need) up to date; returns the failed stage names"""
+    deps = dependencies(stages)
+    selected = with_ancestors(targets or list(stages), deps)
+    forced = set(targets or stages) if force else set()
+    state = load_state()
+    hashes = HashCache(state["files"])
+
+    done, failed, running = set(), set(), {}
+    will_run = set()  # dry run: stages that would have run, so their dependents would too
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        while True:
+            ready = [
+                name for name in stages
+                if name in selected and name not in done | failed and name not in running
+                and deps[name] <= done
+            ]
+            for name in ready:
+                spec = stages[name]
+                missing = [path for path in spec["inputs"] if not os.path.exists(os.path.join(ROOT_DIR, path))]
+                if missing and not (dry_run and deps[name] & will_run):
+                    print(f"❌ {name}: missing input(s) {', '.join(missing)}")
+                    failed.add(name)
+                    continue
+
+                # Keys are computed only once upstream stages have finished, so an upstream
+                # re-run that rewrote identical bytes still lets this stage be skipped
+                record = state["stages"].get(name)
+                upstream_changed = dry_run and deps[name] & will_run
+                key = None if upstream_changed else stage_key(spec, hashes)
+                up_to_date = (
+                    name not in forced and record is not None and record["key"] == key
+                    and outputs_intact(spec, record, hashes)
+                )
+                if up_to_date:
+                    print(f"✅ {name}: up to date")
+                    done.add(name)
+                elif dry_run:
+                    reason = "forced" if name in forced else "upstream changes" if upstream_changed else "inputs/code/args changed"
+                    print(f"🔜 {name}: would run ({reason})")
+                    will_run.add(name)
+                    done.add(name)
+                else:
+                    print(f"🚀 {name}: running {' '.join([spec['script'], *spec['args']])}")
+                    running[name] = (pool.submit(run_stage, name, spec), key)
+
+            if not running:
+                if not ready:
+                    break
+                continue
+
+            finished, _ = wait([future for future, _ in running.values()], return_when=FIRST_COMPLETED)
+            for name in [name for name, (future, _) in running.items() if future in finished]:
+                future, key = running.pop(name)
+                returncode, output, seconds = future.result()
+                spec = stages[name]
+                if output.strip():
+                    header = f"----- {name} -----"
+                    print(f"{header}\n{output.rstrip()}\n{'-' * len(header)}")
+
+                missing = [path for path in spec["outputs"] if not os.path.exists(os.path.join(ROOT_DIR, path))]
+                if returncode != 0 or missing:
+                    reason = f"exit code {returncode}" if returncode != 0 else f"missing output(s) {', '.join(missing)}"
+                    print(f"❌ {name} failed after {seconds:.1f}s ({reason})")
+                    failed.add(name)
+                    state["stages"].pop(name, None)
+                else:
+                    print(f"✅ {name} finished in {seconds:.1f}s")
+                    done.add(name)
+                    state["stages"][name] = {
+                        "key": key,
+                        "outputs": {path: hashes(path) for path in spec["outputs"]},
+                        "seconds": round(seconds, 3),
+                        "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    }
+                if not dry_run:
+                    save_state(state)
+
+    blocked = set()
+    for name in failed:
+        blocked |= (downstream(name, deps) & selected) - done - failed
+    for name in sorted(blocked):
+        print(f"⏭️ {name}: skipped (an upstream stage failed)")
+    if not dry_run:
+        save_state(state)
+    return sorted(failed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the data → model pipeline, skipping up-to-date stages")
+    parser.add_argument("stages", nargs="*", metavar="STAGE",
+                        help=f"stages to bring up to date (default: all of {', '.join(STAGES)})")
+    parser.add_argument("--force", action="store_true", help="re-run the named stages (or all) even if up to date")
+    parser.add_argument("--jobs", type=int, default=None, help="stages to run at once (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    args = parser.parse_args()
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    started = time.perf_counter()
+    failed = run_pipeline(args.stages or None, force=args.force, jobs=args.jobs, dry_run=args.dry_run)
+    if failed:
+        print(f"❌ Pipeline failed at: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"🏁 Pipeline finished in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
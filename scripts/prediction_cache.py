@@ -0,0 +1,80 @@
+# prediction_cache.py
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+class PredictionCache:
+    """Bounded LRU cache of prediction rows keyed on quantized inputs + model version.
+
+    Inputs are snapped to `decimals` places (the app already rounds to 0.1 cm), so
+    repeat lookups of the same body skip the model entirely. Thread-safe, so the
+    Streamlit sessions and the service can share one instance.
+    """
+
+    def __init__(self, max_entries=50_000, decimals=1):
+        self.max_entries = max_entries
+        self.decimals = decimals
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, version, row):
+        # NaN != NaN, so missing inputs are keyed as None
+        return (version,) + tuple(None if np.isnan(value) else float(value) for value in row)
+
+    def predict(self, inputs, version, compute):
+        """Return predictions for an (N, n_inputs) matrix, calling `compute` only for misses.
+
+        `compute` receives the quantized rows that were not cached and must return
+        their (M, n_targets) predictions.
+        """
+        quantized = np.round(np.asarray(inputs, dtype=float), self.decimals)
+        if len(quantized) == 0:
+            return compute(quantized)
+        keys = [self._key(version, row) for row in quantized]
+
+        with self._lock:
+            cached = [self._entries.get(key) for key in keys]
+            for key, value in zip(keys, cached):
+                if value is not None:
+                    self._entries.move_to_end(key)
+        missing = [i for i, value in enumerate(cached) if value is None]
+
+        fresh = compute(quantized[missing]) if missing else None
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+            for i, row in zip(missing, fresh if fresh is not None else []):
+                cached[i] = row
+                self._entries[keys[i]] = row.copy()
+                self._entries.move_to_end(keys[i])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return np.vstack(cached)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+# Process-wide instance shared by the Streamlit app and the service
+shared_cache = PredictionCache()
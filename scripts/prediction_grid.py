@@ -0,0 +1,228 @@
+# prediction_grid.py
+# Offline lookup table: the model evaluated over a regular grid of the present inputs,
+# one memory-mapped .npy per input pattern, answered by multilinear interpolation
+# without touching XGBoost.
+#
+#   python scripts/prediction_grid.py build --points 12      # build + validation report
+#   python scripts/prediction_grid.py validate --samples 20000
+import argparse
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from predictor import (
+    DEFAULT_MODEL_PATH, input_masks, input_patterns, load_model_package, native_artifact_path,
+    pattern_mask, predict_matrix,
+)
+
+GRID_FORMAT = "bmp-grid-1"
+GRID_META_FILE = "meta.json"
+
+# Grid box per input (cm). Narrower than the app's limits (height 100-250, circumferences
+# 0-200) so the points land where real bodies are; rows outside go to the model.
+GRID_RANGES = {
+    "height_cm": (140.0, 200.0),
+    "bust_cm": (65.0, 150.0),
+    "waist_cm": (50.0, 140.0),
+    "hip_cm": (70.0, 160.0),
+    "chest_cm": (60.0, 150.0),
+}
+
+def default_grid_dir(model_path):
+    return native_artifact_path(model_path) + "_grid"
+
+def build_prediction_grid(package, output_dir, points=12, ranges=GRID_RANGES, chunk_rows=65_536):
+    """Evaluate the full predictor (patterns + rule blend) on every grid point of every pattern.
+
+    Each pattern with k present inputs gets a (points,) * k + (n_targets,) float32
+    array written through np.lib.format.open_memmap, filled in chunks so the whole
+    table never has to sit in memory.
+    """
+    if points < 2:
+        raise ValueError(f"points must be at least 2 (one cell per axis needs both ends), got {points}")
+    input_features = package["input_features"]
+    n_targets = len(package["target_features"])
+    os.makedirs(output_dir, exist_ok=True)
+
+    meta = {
+        "format": GRID_FORMAT,
+        "model_version": package.get("model_version"),
+        "input_features": list(input_features),
+        "target_features": list(package["target_features"]),
+        "patterns": {},
+    }
+    for features in input_patterns(input_features):
+        mask = pattern_mask(features, input_features)
+        columns = [input_features.index(col) for col in features]
+        axes = [np.linspace(*ranges[col], points) for col in features]
+        shape = tuple(len(axis) for axis in axes)
+        file_name = f"grid_{mask}.npy"
+
+        table = np.lib.format.open_memmap(
+            os.path.join(output_dir, file_name), mode="w+", dtype=np.float32, shape=shape + (n_targets,)
+        )
+        flat = table.reshape(-1, n_targets)
+        n_cells = int(np.prod(shape))
+        for start in range(0, n_cells, chunk_rows):
+            index = np.unravel_index(np.arange(start, min(start + chunk_rows, n_cells)), shape)
+            inputs = np.full((len(index[0]), len(input_features)), np.nan)
+            for axis, column, positions in zip(axes, columns, index):
+                inputs[:, column] = axis[positions]
+            flat[start:start + len(inputs)] = predict_matrix(inputs, package)
+        table.flush()
+        del flat, table
+
+        meta["patterns"][str(mask)] = {
+            "features": features,
+            "columns": columns,
+            "file": file_name,
+            "axes": [[float(axis[0]), float(axis[-1]), len(axis)] for axis in axes],
+        }
+        print(f"🧮 {'+'.join(col.replace('_cm', '') for col in features)}: {n_cells} points")
+
+    with open(os.path.join(output_dir, GRID_META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return output_dir
+
+def load_prediction_grid(grid_dir, package=None):
+    """Open a grid directory; tables are memory-mapped read-only.
+
+    With `package`, refuses a grid that was built from a different model version.
+    """
+    with open(os.path.join(grid_dir, GRID_META_FILE), encoding="utf-8") as f:
+        grid = json.load(f)
+    if grid.get("format") != GRID_FORMAT:
+        raise ValueError(f"{grid_dir} is not a prediction grid ({grid.get('format')!r})")
+    if package is not None and grid["model_version"] != package.get("model_version"):
+        raise ValueError(f"{grid_dir} was built for model {grid['model_version']}, "
+                         f"loaded model is {package.get('model_version')}; rebuild the grid")
+
+    patterns = {}
+    for mask, entry in grid["patterns"].items():
+        lows, highs, points = (np.array(values, dtype=float) for values in zip(*entry["axes"]))
+        patterns[int(mask)] = {
+            **entry,
+            "table": np.load(os.path.join(grid_dir, entry["file"]), mmap_mode="r"),
+            "lows": lows,
+            "steps": (highs - lows) / (points - 1),
+            "points": points.astype(np.intp),
+        }
+    grid["patterns"] = patterns
+    return grid
+
+def _inside(coords, entry):
+    """Rows of (m, k) coordinates that lie inside the pattern's grid box"""
+    highs = entry["lows"] + entry["steps"] * (entry["points"] - 1)
+    return ((coords >= entry["lows"]) & (coords <= highs)).all(axis=1)
+
+def _interpolate(coords, entry):
+    """Multilinear interpolation of one pattern's table at (m, k) coordinates inside its box"""
+    points = entry["points"]
+    # The clip only absorbs rounding at the box edges
+    position = np.clip((coords - entry["lows"]) / entry["steps"], 0, points - 1)
+    lower = np.minimum(np.floor(position).astype(np.intp), points - 2)
+    fraction = position - lower
+
+    table = entry["table"]
+    result = np.zeros((len(coords), table.shape[-1]))
+    for corner in itertools.product((0, 1), repeat=coords.shape[1]):
+        corner = np.array(corner)
+        weight = np.prod(np.where(corner, fraction, 1 - fraction), axis=1)
+        result += weight[:, None] * table[tuple((lower + corner).T)]
+    return result
+
+def grid_predict(inputs, grid, package=None):
+    """Interpolated predictions for an (N, n_inputs) matrix.
+
+    Rows whose input pattern has no grid, or that fall outside the grid box, go to
+    predict_matrix(package) when a package is given, and come back as NaN otherwise.
+    """
+    inputs = np.asarray(inputs, dtype=float)
+    predictions = np.full((len(inputs), len(grid["target_features"])), np.nan)
+    masks = input_masks(inputs)
+    uncovered = np.ones(len(inputs), dtype=bool)
+    for mask in np.unique(masks):
+        entry = grid["patterns"].get(int(mask))
+        if entry is None:
+            continue
+        rows = np.flatnonzero(masks == mask)
+        coords = inputs[np.ix_(rows, entry["columns"])]
+        inside = _inside(coords, entry)
+        rows = rows[inside]
+        predictions[rows] = _interpolate(coords[inside], entry)
+        uncovered[rows] = False
+
+    if package is not None and uncovered.any():
+        predictions[uncovered] = predict_matrix(inputs[uncovered], package)
+    return predictions
+
+def validate_grid(grid, package, samples=5_000, seed=0):
+    """Interpolation error against the real model at random off-grid points, per pattern"""
+    rng = np.random.default_rng(seed)
+    n_inputs = len(grid["input_features"])
+    target_features = grid["target_features"]
+    report = {}
+
+    print(f"\n{'input pattern':<30} {'points':>9} {'MAE':>7} {'p95':>7} {'max':>7} "
+          f"{'worst target':<28} {'grid µs/row':>11} {'model µs/row':>12}")
+    for mask, entry in grid["patterns"].items():
+        inputs = np.full((samples, n_inputs), np.nan)
+        for column, low, step, points in zip(entry["columns"], entry["lows"], entry["steps"], entry["points"]):
+            inputs[:, column] = rng.uniform(low, low + step * (points - 1), samples)
+
+        started = time.perf_counter()
+        approx = grid_predict(inputs, grid)
+        grid_us = (time.perf_counter() - started) / samples * 1e6
+        started = time.perf_counter()
+        exact = predict_matrix(inputs, package)
+        model_us = (time.perf_counter() - started) / samples * 1e6
+
+        errors = np.abs(approx - exact)
+        per_target = errors.mean(axis=0)
+        worst = target_features[int(np.argmax(per_target))]
+        report[mask] = {
+            "features": entry["features"],
+            "points": int(np.prod(entry["points"])),
+            "mae": float(errors.mean()),
+            "p95": float(np.percentile(errors, 95)),
+            "max": float(errors.max()),
+            "mae_per_target": dict(zip(target_features, per_target.round(4).tolist())),
+            "grid_us_per_row": grid_us,
+            "model_us_per_row": model_us,
+        }
+        label = "+".join(col.replace("_cm", "") for col in entry["features"])
+        print(f"{label:<30} {report[mask]['points']:>9} {report[mask]['mae']:>7.3f} {report[mask]['p95']:>7.3f} "
+              f"{report[mask]['max']:>7.3f} {worst:<28} {grid_us:>11.2f} {model_us:>12.2f}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed prediction grid with interpolated lookups")
+    parser.add_argument("command", choices=["build", "validate"])
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--grid", default=None, help="grid directory (default: <model>_grid next to the model)")
+    parser.add_argument("--points", type=int, default=12, help="grid points per input axis")
+    parser.add_argument("--samples", type=int, default=5_000, help="random points per pattern for validation")
+    parser.add_argument("--report", default=None, help="also save the validation report as JSON")
+    args = parser.parse_args()
+    if args.points < 2:
+        parser.error("--points must be at least 2")
+
+    package = load_model_package(args.model)
+    grid_dir = args.grid or default_grid_dir(args.model)
+    if args.command == "build":
+        started = time.perf_counter()
+        print(f"🚀 Building a {args.points}-point grid per input axis...")
+        build_prediction_grid(package, grid_dir, points=args.points)
+        print(f"✅ Grid saved to: {grid_dir} ({time.perf_counter() - started:.1f}s)")
+
+    report = validate_grid(load_prediction_grid(grid_dir, package), package, samples=args.samples)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({str(mask): entry for mask, entry in report.items()}, f, indent=2)
+        print(f"💾 Validation report saved to: {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+# scripts/predictor.py
+import json
+import logging
+import os
+import threading
+import time
+from itertools import combinations
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from data_store import file_hash
+from surrogate import MODES, surrogate_predict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_PATH = os.path.join(ROOT_DIR, "models", "body_measurement_predictor_v5.pkl")
+
+# Share of the rule estimate in the gentle blend (model keeps the remaining 80%)
+RULE_WEIGHT = 0.2
+
+# Native artifact layout: <dir>/booster.ubj (XGBoost UBJSON) + <dir>/meta.json (header)
+NATIVE_BOOSTER_FILE = "booster.ubj"
+NATIVE_META_FILE = "meta.json"
+_RULE_DTYPES = {"target": np.intp, "base": np.intp, "multiplier": float, "offset": float}
+_SURROGATE_ARRAYS = ("means", "scales", "weights")
+
+# Requests carry height plus at least two of the optional circumferences
+REQUIRED_INPUTS = ("height_cm",)
+MIN_OPTIONAL_INPUTS = 2
+
+logger = logging.getLogger("bmp.predictor")
+
+# One loaded package per model file per process: {abs_path: {"package", "mtime_ns", "size", "sha256"}}
+_registry = {}
+_registry_lock = threading.Lock()
+
+def native_artifact_path(model_path):
+    """Directory holding the native export of a .pkl package (same name, no suffix)"""
+    return os.path.splitext(model_path)[0]
+
+def serving_model_path(model_path=DEFAULT_MODEL_PATH):
+    """What to serve for a .pkl: its native export when there is one (retrain_model writes both)"""
+    native_dir = native_artifact_path(model_path)
+    return native_dir if os.path.exists(os.path.join(native_dir, NATIVE_META_FILE)) else model_path
+
+def input_patterns(input_features, required=REQUIRED_INPUTS, min_optional=MIN_OPTIONAL_INPUTS):
+    """Every allowed set of present inputs, as feature lists in input order"""
+    optional = [col for col in input_features if col not in required]
+    for count in range(min_optional, len(optional) + 1):
+        for chosen in combinations(optional, count):
+            yield [col for col in input_features if col in required or col in chosen]
+
+def pattern_mask(features, input_features):
+    """Bitmask of the present inputs: bit i is input_features[i]"""
+    return sum(1 << input_features.index(col) for col in features)
+
+def input_masks(inputs):
+    """Bitmask of the non-NaN inputs for every row of an (N, n_inputs) matrix"""
+    present = ~np.isnan(inputs)
+    return present.astype(np.int64) @ (1 << np.arange(inputs.shape[1], dtype=np.int64))
+
+def export_native(package, artifact_dir):
+    """Write the booster in XGBoost's UBJSON format plus a small JSON header.
+
+    The header carries feature order, target order and the compiled rules, so
+    loading needs neither pickle nor the sklearn wrapper. Pattern models are
+    saved as pattern_<mask>.ubj next to the main booster.
+    """
+    os.makedirs(artifact_dir, exist_ok=True)
+    booster_path = os.path.join(artifact_dir, NATIVE_BOOSTER_FILE)
+    package["booster"].save_model(booster_path)
+
+    patterns = {}
+    for mask, entry in package.get("patterns", {}).items():
+        file_name = f"pattern_{mask}.ubj"
+        entry["booster"].save_model(os.path.join(artifact_dir, file_name))
+        patterns[str(mask)] = {
+            "features": list(entry["features"]),
+            "columns": list(entry["columns"]),
+            "file": file_name,
+            "report": entry.get("report"),
+        }
+
+    meta = {
+        "format": "bmp-native-1",
+        "input_features": list(package["input_features"]),
+        "target_features": list(package["target_features"]),
+        "data_columns": list(package.get("data_columns", [])),
+        "compiled_rules": [
+            {key: values.tolist() for key, values in rule_pass.items()}
+            for rule_pass in package["compiled_rules"]
+        ],
+        "lineage": list(package.get("lineage", [])),
+        "patterns": patterns,
+        "surrogate": None if package.get("surrogate") is None else {
+            key: value.tolist() if key in _SURROGATE_ARRAYS else value
+            for key, value in package["surrogate"].items()
+        },
+        "booster_sha256": file_hash(booster_path),
+    }
+    # Header goes last: its hash is what load_model_package watches for reloads
+    with open(os.path.join(artifact_dir, NATIVE_META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return artifact_dir
+
+def _read_native(artifact_dir):
+    with open(os.path.join(artifact_dir, NATIVE_META_FILE), encoding="utf-8") as f:
+        package = json.load(f)
+    package["booster"] = xgb.Booster(model_file=os.path.join(artifact_dir, NATIVE_BOOSTER_FILE))
+    package["compiled_rules"] = [
+        {key: np.array(values, dtype=_RULE_DTYPES[key]) for key, values in rule_pass.items()}
+        for rule_pass in package["compiled_rules"]
+    ]
+    if package.get("surrogate") is not None:
+        for key in _SURROGATE_ARRAYS:
+            package["surrogate"][key] = np.array(package["surrogate"][key], dtype=float)
+    package["patterns"] = {
+        int(mask): {**entry, "booster": xgb.Booster(model_file=os.path.join(artifact_dir, entry["file"]))}
+        for mask, entry in package.get("patterns", {}).items()
+    }
+    return package
+
+def serving_booster(model):
+    """The wrapper's booster, cut at the best round when training used early stopping.
+
+    inplace_predict always uses every tree, so the rounds after the best one are
+    dropped here instead of relying on the sklearn wrapper's iteration_range.
+    """
+    booster = model.get_booster()
+    best = booster.attr("best_iteration")
+    return booster[: int(best) + 1] if best is not None else booster
+
+def serving_package(package):
+    """Copy of a training package with the serving boosters attached (main + patterns)"""
+    return {
+        **package,
+        "booster": serving_booster(package["model"]),
+        "patterns": {
+            mask: {**entry, "booster": serving_booster(entry["model"])}
+            for mask, entry in package.get("patterns", {}).items()
+        },
+    }
+
+def read_model_package(model_path):
+    """Read a .pkl package or a native artifact directory from disk, uncached.
+
+    Both come back with the serving boosters (main + patterns) attached, so they
+    predict the same through predict_matrix. Serving code uses load_model_package.
+    """
+    if os.path.isdir(model_path):
+        return _read_native(model_path)
+
+    package = serving_package(joblib.load(model_path))
+    if "compiled_rules" not in package:
+        # Packages saved before rule compilation existed: compile once here
+        package["compiled_rules"] = compile_blend_rules(
+            package["rules"], package["input_features"], package["target_features"]
+        )
+    return package
+
+def load_model_package(model_path=DEFAULT_MODEL_PATH):
+    """Return the hybrid model package written by retrain_model.py, loaded once per process.
+
+    `model_path` is either the joblib .pkl or a native artifact directory.
+    Later calls only stat the file. The package is reloaded when the file's
+    mtime/size changed and its SHA-256 differs from the loaded copy.
+    """
+    path = os.path.abspath(model_path)
+    watched = os.path.join(path, NATIVE_META_FILE) if os.path.isdir(path) else path
+    stat = os.stat(watched)
+    with _registry_lock:
+        entry = _registry.get(path)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["package"]
+
+        digest = file_hash(watched)
+        if entry and entry["sha256"] == digest:
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            return entry["package"]
+
+        started = time.perf_counter()
+        package = read_model_package(path)
+        package["model_version"] = digest[:16]
+        logger.info(
+            "%s model package %s (version %s) in %.1f ms",
+            "Reloaded" if entry else "Loaded", path, package["model_version"],
+            (time.perf_counter() - started) * 1000,
+        )
+        _registry[path] = {
+            "package": package, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest,
+        }
+        return package
+
+def to_input_matrix(rows, input_features):
+    """Convert dicts, a DataFrame or a 2-D array into an (N, n_inputs) float matrix"""
+    if isinstance(rows, pd.DataFrame):
+        return rows.reindex(columns=input_features).to_numpy(dtype=float)
+
+    if isinstance(rows, np.ndarray):
+        matrix = np.asarray(rows, dtype=float)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if matrix.shape[1] != len(input_features):
+            raise ValueError(
+                f"Expected {len(input_features)} input columns {input_features}, got {matrix.shape[1]}"
+            )
+        return matrix
+
+    if isinstance(rows, dict):
+        rows = [rows]
+    frame = pd.DataFrame(list(rows)).reindex(columns=input_features)
+    return frame.to_numpy(dtype=float)
+
+def compile_blend_rules(fashion_rules, input_features, target_features):
+    """Compile proportion/offset rules into index arrays for the batch blend.
+
+    Every usable rule becomes (target column, base column, multiplier, offset),
+    with rule_value = base * multiplier + offset. A target with several rules is
+    blended once per rule in file order, so rules are split into passes by their
+    position in the target's list; inside a pass each target appears once.
+    """
+    input_index = {col: i for i, col in enumerate(input_features)}
+    target_index = {col: i for i, col in enumerate(target_features)}
+
+    passes = []
+    for measurement, rules in fashion_rules.items():
+        if measurement in input_index or measurement not in target_index:
+            continue  # Skip user-provided measurements
+
+        rank = 0
+        for rule in rules:
+            base = rule.get("base")
+            if base not in input_index:
+                continue
+            if rule.get("type") == "proportion" and pd.notna(rule.get("multiplier")):
+                multiplier, offset = float(rule["multiplier"]), 0.0
+            elif rule.get("type") == "offset" and pd.notna(rule.get("offset")):
+                multiplier, offset = 1.0, float(rule["offset"])
+            else:
+                continue
+
+            if rank == len(passes):
+                passes.append({"target": [], "base": [], "multiplier": [], "offset": []})
+            rule_pass = passes[rank]
+            rule_pass["target"].append(target_index[measurement])
+            rule_pass["base"].append(input_index[base])
+            rule_pass["multiplier"].append(multiplier)
+            rule_pass["offset"].append(offset)
+            rank += 1
+
+    return [
+        {
+            "target": np.array(rule_pass["target"], dtype=np.intp),
+            "base": np.array(rule_pass["base"], dtype=np.intp),
+            "multiplier": np.array(rule_pass["multiplier"], dtype=float),
+            "offset": np.array(rule_pass["offset"], dtype=float),
+        }
+        for rule_pass in passes
+    ]
+
+def gentle_rule_adjustment(predictions, inputs, compiled_rules):
+    """Blend compiled rule estimates into a batch of raw predictions (80% model, 20% rule)"""
+    adjusted = predictions.copy()
+    for rule_pass in compiled_rules:
+        rule_values = inputs[:, rule_pass["base"]] * rule_pass["multiplier"] + rule_pass["offset"]
+        current = adjusted[:, rule_pass["target"]]
+        blended = current * (1 - RULE_WEIGHT) + rule_values * RULE_WEIGHT
+        adjusted[:, rule_pass["target"]] = np.where(np.isnan(rule_values), current, blended)
+    return adjusted
+
+def predict_matrix(inputs, package, cache=None, mode="accurate"):
+    """Run the model once over an (N, n_inputs) matrix and apply the rule blend.
+
+    With a PredictionCache, rows seen before (after 0.1 cm quantization) are served
+    from the cache and only the misses reach the model. mode="fast" uses the
+    package's linear surrogate instead (one matrix multiply, no cache needed).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {', '.join(MODES)}")
+    if mode == "fast":
+        if package.get("surrogate") is None:
+            raise ValueError("This model package has no fast-mode surrogate; retrain it to add one")
+        return surrogate_predict(inputs, package["surrogate"])
+
+    if cache is not None:
+        version = package.get("model_version", id(package))
+        return cache.predict(inputs, version, lambda rows: predict_matrix(rows, package))
+
+    n_targets = len(package["target_features"])
+    if len(inputs) == 0:
+        return np.empty((0, n_targets))
+
+    # Contiguous float32 straight into the booster: no DataFrame, no DMatrix copy
+    matrix = np.ascontiguousarray(inputs, dtype=np.float32)
+    raw_pred = route_predict(matrix, package)
+
+    return gentle_rule_adjustment(raw_pred, inputs, package["compiled_rules"])
+
+def route_predict(matrix, package):
+    """Raw predictions, each sub-batch of rows sent to the model for its input pattern.
+
+    Rows whose pattern has no specialized model (or packages without pattern
+    models) go to the all-features booster with the missing inputs as NaN.
+    """
+    n_targets = len(package["target_features"])
+    patterns = package.get("patterns")
+    if not patterns:
+        raw_pred = package["booster"].inplace_predict(matrix, validate_features=False)
+        return np.asarray(raw_pred, dtype=float).reshape(len(matrix), n_targets)
+
+    raw_pred = np.empty((len(matrix), n_targets))
+    masks = input_masks(matrix)
+    unrouted = np.ones(len(matrix), dtype=bool)
+    for mask in np.unique(masks):
+        entry = patterns.get(int(mask))
+        if entry is None:
+            continue
+        rows = np.flatnonzero(masks == mask)
+        sub_batch = np.ascontiguousarray(matrix[np.ix_(rows, entry["columns"])])
+        raw_pred[rows] = np.asarray(
+            entry["booster"].inplace_predict(sub_batch, validate_features=False), dtype=float
+        ).reshape(len(rows), n_targets)
+        unrouted[rows] = False
+
+    if unrouted.any():
+        rest = np.ascontiguousarray(matrix[unrouted])
+        raw_pred[unrouted] = np.asarray(
+            package["booster"].inplace_predict(rest, validate_features=False), dtype=float
+        ).reshape(len(rest), n_targets)
+    return raw_pred
+
+def predict_batch(rows, package=None, model_path=DEFAULT_MODEL_PATH, cache=None, mode="accurate"):
+    """Predict all target measurements for N input rows.
+
+    `rows` may be a dict, a list of dicts, a DataFrame or a NumPy array whose
+    columns follow `input_features`. Missing inputs are passed to XGBoost as NaN.
+    `mode` is "accurate" (trees + rule blend) or "fast" (linear surrogate).
+    Returns a DataFrame with one row per input and one column per target.
+    """
+    if package is None:
+        package = load_model_package(model_path)
+
+    inputs = to_input_matrix(rows, package["input_features"])
+    predictions = predict_matrix(inputs, package, cache, mode)
+
+    index = rows.index if isinstance(rows, pd.DataFrame) else None
+    return pd.DataFrame(predictions, columns=package["target_features"], index=index)
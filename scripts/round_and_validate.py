@@ -1,11 +1,19 @@
 # round_and_validate.py
+import os
 import pandas as pd
 
+from data_store import DATA_DIR, read_table, write_table
+from history_store import read_visit_log
+
 # 1. Load cleaned data
-input_path = r"C:\Users\User\Documents\my_project\body-measurement-predictor\data\cleaned_measurements.xlsx"
-output_path = r"C:\Users\User\Documents\my_project\body-measurement-predictor\data\rounded_measurements.xlsx"
+input_path = os.path.join(DATA_DIR, "cleaned_measurements.xlsx")
+output_path = os.path.join(DATA_DIR, "rounded_measurements.xlsx")
 
-df = pd.read_excel(input_path)
+df = read_table(input_path)
+# Sessions cleaned with clean_data --append since the last full run
+appended = read_visit_log("cleaned")
+if appended is not None:
+    df = pd.concat([df, appended], ignore_index=True)
 
 # 2. Round all numeric columns to 1 decimal place
 numeric_cols = df.select_dtypes(include=['number']).columns
@@ -27,7 +35,7 @@ for col, (min_val, max_val) in outlier_checks.items():
         outliers = pd.concat([outliers, col_outliers])
 
 # 5. Save results
-df.to_excel(output_path, index=False)
+write_table(df, output_path)
 
 if not outliers.empty:
     print("⚠️ POTENTIAL OUTLIERS FOUND ⚠️")
@@ -1,11 +1,18 @@
-import pandas as pd
+import argparse
+
+from data_store import read_table, write_table
+
+parser = argparse.ArgumentParser(description="Round every numeric column to 1 decimal")
+parser.add_argument("--input", default="data/augmented_measurements_v1.xlsx")
+parser.add_argument("--output", default="data/augmented_measurements_rounded.xlsx")
+args = parser.parse_args()
 
 # Load the original Excel file
-input_file = "data/augmented_measurements_v1.xlsx"
-output_file = "data/augmented_measurements_rounded.xlsx"
+input_file = args.input
+output_file = args.output
 
 # Read the Excel file
-df = pd.read_excel(input_file)
+df = read_table(input_file)
 
 # Round all numeric columns to 1 decimal place
 df_rounded = df.copy()
@@ -14,6 +21,6 @@ df_rounded[df_rounded.select_dtypes(include=['float', 'int']).columns] = (
 )
 
 # Save the new file
-df_rounded.to_excel(output_file, index=False)
+write_table(df_rounded, output_file)
 
 print(f"✅ Rounded file saved as: {output_file}")
@@ -0,0 +1,139 @@
+# rule_engine.py
+import numpy as np
+import pandas as pd
+
+# Gap-filling rules shared by clean_data.py and augment_data.py.
+# Lower priority number = tried first. Formulas work on a row or on a whole DataFrame.
+FILL_RULES = {
+    # Height Rules
+    "height_cm": [
+        {"formula": lambda row: row["front_waist_length_cm"] / 0.26, "inputs": ["front_waist_length_cm"], "priority": 1},
+        {"formula": lambda row: row["skirt_knee_length_cm"] / 0.4, "inputs": ["skirt_knee_length_cm"], "priority": 2},
+        {"formula": lambda row: row["around_thigh_cm"] / 0.4, "inputs": ["around_thigh_cm"], "priority": 3}
+    ],
+    
+    # Upper Body Rules
+    "shoulder_underbust_distance_cm": [
+        {"formula": lambda row: row["bust_height_cm"] + row["bust_radius_cm"], "inputs": ["bust_height_cm", "bust_radius_cm"], "priority": 1}
+    ],
+    
+    # Arm Measurements
+    "around_elbow_cm": [
+        {"formula": lambda row: 0.85 * row["around_bicep_cm"], "inputs": ["around_bicep_cm"], "priority": 1}
+    ],
+    "around_bicep_cm": [
+        {"formula": lambda row: row["around_elbow_cm"] / 0.85, "inputs": ["around_elbow_cm"], "priority": 1}
+    ],
+    
+    # Wrist/Hand Rules
+    "around_wrist_cm": [
+        {"formula": lambda row: 0.85 * row["hand_entry_cm"], "inputs": ["hand_entry_cm"], "priority": 1}
+    ],
+    "hand_entry_cm": [
+        {"formula": lambda row: row["around_wrist_cm"] / 0.85, "inputs": ["around_wrist_cm"], "priority": 1}
+    ],
+    
+    # Dress/Elbow Rules
+    "elbow_length_cm": [
+        {"formula": lambda row: 0.23 * row["height_cm"], "inputs": ["height_cm"], "priority": 1}
+    ],
+    "dress_knee_length_cm": [
+        {"formula": lambda row: row["front_waist_length_cm"] + row["skirt_knee_length_cm"], "inputs": ["front_waist_length_cm", "skirt_knee_length_cm"], "priority": 1}
+    ],
+    
+    # Full Length Rules
+    "dress_full_length_cm": [
+        {"formula": lambda row: 0.9 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
+        {"formula": lambda row: row["front_waist_length_cm"] + row["skirt_full_length_cm"], "inputs": ["front_waist_length_cm", "skirt_full_length_cm"], "priority": 2}
+    ],
+    
+    # Skirt Rules
+    "skirt_knee_length_cm": [
+        {"formula": lambda row: 0.4 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
+        {"formula": lambda row: 0.6 * row["skirt_full_length_cm"], "inputs": ["skirt_full_length_cm"], "priority": 2}
+    ],
+    "skirt_full_length_cm": [
+        {"formula": lambda row: 0.67 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
+        {"formula": lambda row: row["skirt_knee_length_cm"] / 0.6, "inputs": ["skirt_knee_length_cm"], "priority": 2}
+    ],
+    
+    # Flare/Walking Rules
+    "flare_out_cm": [
+        {"formula": lambda row: row["skirt_knee_length_cm"] - 8, "inputs": ["skirt_knee_length_cm"], "priority": 1}
+    ],
+    "walking_step_cm": [
+        {"formula": lambda row: row["hip_cm"] - 5, "inputs": ["hip_cm"], "priority": 1}
+    ],
+    
+    # Pants Rules
+    "pant_waist_cm": [
+        {"formula": lambda row: row["waist_cm"] * 1, "inputs": ["waist_cm"], "priority": 1}
+    ],
+    "pant_hip_cm": [
+        {"formula": lambda row: row["hip_cm"] * 1, "inputs": ["hip_cm"], "priority": 1}
+    ],
+    "pant_waist_hip_seam_cm": [
+        {"formula": lambda row: row["waist_hip_distance_cm"] * 1, "inputs": ["waist_hip_distance_cm"], "priority": 1}
+    ],
+    "pant_body_rise_cm": [
+        {"formula": lambda row: 0.35 * row["waist_cm"], "inputs": ["waist_cm"], "priority": 1},
+        {"formula": lambda row: row["pant_outseam_cm"] - row["pant_inseam_cm"], "inputs": ["pant_outseam_cm", "pant_inseam_cm"], "priority": 2}
+    ],
+    "pant_outseam_cm": [
+        {"formula": lambda row: row["pant_ankle_length_cm"] * 1, "inputs": ["pant_ankle_length_cm"], "priority": 1},
+        {"formula": lambda row: row["pant_inseam_cm"] + row["pant_body_rise_cm"], "inputs": ["pant_inseam_cm", "pant_body_rise_cm"], "priority": 2}
+    ],
+    "pant_inseam_cm": [
+        {"formula": lambda row: row["pant_outseam_cm"] - row["pant_body_rise_cm"], "inputs": ["pant_outseam_cm", "pant_body_rise_cm"], "priority": 1}
+    ],
+    "pant_full_length_cm": [
+        {"formula": lambda row: row["skirt_full_length_cm"] * 1, "inputs": ["skirt_full_length_cm"], "priority": 1}
+    ],
+    
+    # Leg Measurements
+    "around_thigh_cm": [
+        {"formula": lambda row: 0.45 * row["height_cm"], "inputs": ["height_cm"], "priority": 1},
+        {"formula": lambda row: 0.6 * row["hip_cm"], "inputs": ["hip_cm"], "priority": 2}
+    ],
+    "around_knee_cm": [
+        {"formula": lambda row: 0.65 * row["around_thigh_cm"], "inputs": ["around_thigh_cm"], "priority": 1},
+        {"formula": lambda row: 1.5 * row["around_ankle_cm"], "inputs": ["around_ankle_cm"], "priority": 2}
+    ],
+    "around_calf_cm": [
+        {"formula": lambda row: row["around_thigh_cm"] / 1.7, "inputs": ["around_thigh_cm"], "priority": 1}
+    ],
+    "around_ankle_cm": [
+        {"formula": lambda row: 0.5 * row["around_thigh_cm"], "inputs": ["around_thigh_cm"], "priority": 1}
+    ]
+}
+
+def apply_fashion_rules(data, rules=FILL_RULES):
+    """Fill missing cells column-wise: priority-1 rules first, then lower priorities.
+
+    Only missing cells are written, so other cells (numbers or text such as 'N/A')
+    stay as they are. Non-numeric input cells count as missing for the formulas.
+    """
+    for target_col, target_rules in rules.items():
+        missing = data[target_col].isna().to_numpy(copy=True)
+        if not missing.any():
+            continue
+
+        was_missing = missing.copy()
+        fills = np.full(len(data), np.nan)
+        for rule in sorted(target_rules, key=lambda x: x["priority"]):
+            inputs = data[rule["inputs"]].apply(pd.to_numeric, errors="coerce")
+            usable = missing & inputs.notna().all(axis=1).to_numpy()
+            if not usable.any():
+                continue
+            values = np.asarray(rule["formula"](inputs), dtype=float)
+            fills[usable] = values[usable]
+            missing &= ~usable
+            if not missing.any():
+                break
+
+        assigned = was_missing & ~missing
+        if assigned.any():
+            if not pd.api.types.is_numeric_dtype(data[target_col]):
+                data[target_col] = data[target_col].astype(object)  # text dtypes reject floats
+            data.loc[assigned, target_col] = fills[assigned]
+    return data
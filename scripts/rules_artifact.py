@@ -0,0 +1,213 @@
+# rules_artifact.py
+# Precompiled form of the generated rules: flat per-rule arrays (one memory-mapped .npy
+# each) plus a small meta.json, so consumers load the rules without importing and
+# walking the nested dicts in fashion_rules.py.
+#
+#   python scripts/rules_artifact.py                 # compile scripts/fashion_rules.py
+#   python scripts/rules_artifact.py --check         # load it back and compare
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+RULES_FORMAT = "bmp-rules-1"
+RULES_META_FILE = "meta.json"
+DEFAULT_RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fashion_rules_compiled")
+
+# rule_type codes; the position in this tuple is the code stored in rule_type.npy
+RULE_TYPES = ("proportion", "ratio", "offset", "formula")
+
+# name -> dtype of every array file in the artifact
+#   order          measurement indices in topological processing order
+#   target_indptr  rules of order[k] are rules target_indptr[k]:target_indptr[k + 1]
+#   dep_indptr     dependencies of rule r are dep_indices[dep_indptr[r]:dep_indptr[r + 1]]
+#   rule_*         one entry per rule; rule_base is -1 for formulas, NaN marks unused numbers
+RULE_ARRAYS = {
+    "order": np.int32,
+    "target_indptr": np.int32,
+    "dep_indptr": np.int32,
+    "dep_indices": np.int32,
+    "rule_target": np.int32,
+    "rule_type": np.int8,
+    "rule_base": np.int32,
+    "multiplier": np.float64,
+    "offset": np.float64,
+    "tolerance": np.float64,
+    "priority": np.int32,
+}
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+def default_rules_dir(rules_module_path):
+    """fashion_rules.py -> fashion_rules_compiled/ next to it"""
+    return os.path.splitext(rules_module_path)[0] + "_compiled"
+
+def _requires(rule):
+    return list(dict.fromkeys(rule.get("requires") or [rule["base"]]))
+
+def compile_rules(rule_dict, processing_order, descriptions=None):
+    """Flatten {target: [rule, ...]} into the artifact's arrays and metadata.
+
+    Rules are stored grouped by target in the converter's processing order (file
+    order inside a target). Every rule needs its expression and priority.
+    """
+    measurements = sorted(set(processing_order))
+    index = {name: i for i, name in enumerate(measurements)}
+
+    columns = {name: [] for name in RULE_ARRAYS if name not in ("order", "target_indptr", "dep_indptr")}
+    target_indptr, dep_indptr = [0], [0]
+    expressions, notes = [], []
+    for target in processing_order:
+        for rule in rule_dict.get(target, []):
+            requires = _requires(rule)
+            columns["rule_target"].append(index[target])
+            columns["rule_type"].append(RULE_TYPES.index(rule["type"]))
+            columns["rule_base"].append(index[rule["base"]] if rule.get("base") is not None else -1)
+            columns["multiplier"].append(rule.get("multiplier", np.nan))
+            columns["offset"].append(rule.get("offset", np.nan))
+            columns["tolerance"].append(rule.get("tolerance", 0.0))
+            columns["priority"].append(rule["priority"])
+            columns["dep_indices"].extend(index[dep] for dep in requires)
+            dep_indptr.append(len(columns["dep_indices"]))
+            expressions.append(rule["expression"])
+            notes.append(rule.get("notes", ""))
+        target_indptr.append(len(columns["rule_target"]))
+
+    arrays = {
+        "order": [index[name] for name in processing_order],
+        "target_indptr": target_indptr,
+        "dep_indptr": dep_indptr,
+        **columns,
+    }
+    arrays = {name: np.asarray(values, dtype=RULE_ARRAYS[name]) for name, values in arrays.items()}
+    return {
+        "format": RULES_FORMAT,
+        "measurements": measurements,
+        "types": list(RULE_TYPES),
+        "expressions": expressions,
+        "notes": notes,
+        "descriptions": dict(descriptions or {}),
+        **arrays,
+    }
+
+def rules_digest(rules):
+    digest = hashlib.sha256()
+    for name in RULE_ARRAYS:
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(rules[name]).tobytes())
+    for key in ("measurements", "expressions", "notes", "descriptions"):
+        digest.update(json.dumps(rules[key], sort_keys=True).encode())
+    return digest.hexdigest()
+
+def write_rules_artifact(rules, output_dir):
+    """Write the arrays as .npy files and everything else to meta.json.
+
+    meta.json carries a digest over all of it, so it changes whenever any part of
+    the rules does.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for name in RULE_ARRAYS:
+        np.save(os.path.join(output_dir, f"{name}.npy"), rules[name])
+
+    meta = {key: rules[key] for key in ("format", "measurements", "types", "expressions", "notes", "descriptions")}
+    meta["rules"] = len(rules["rule_target"])
+    meta["digest"] = rules_digest(rules)
+    with open(os.path.join(output_dir, RULES_META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1, ensure_ascii=False)
+    return output_dir
+
+def load_rules_artifact(rules_dir=DEFAULT_RULES_DIR):
+    """Open an artifact once per process (arrays memory-mapped read-only); re-read when meta.json changes"""
+    rules_dir = os.path.abspath(rules_dir)
+    meta_path = os.path.join(rules_dir, RULES_META_FILE)
+    mtime_ns = os.stat(meta_path).st_mtime_ns
+    with _loaded_lock:
+        entry = _loaded.get(rules_dir)
+        if entry is None or entry[0] != mtime_ns:
+            with open(meta_path, encoding="utf-8") as f:
+                rules = json.load(f)
+            if rules.get("format") != RULES_FORMAT:
+                raise ValueError(f"{rules_dir} is not a compiled rules artifact ({rules.get('format')!r})")
+            for name in RULE_ARRAYS:
+                rules[name] = np.load(os.path.join(rules_dir, f"{name}.npy"), mmap_mode="r")
+            entry = _loaded[rules_dir] = (mtime_ns, rules)
+        return entry[1]
+
+def rule_targets(rules):
+    """Measurements that have at least one rule, in processing order"""
+    counts = np.diff(rules["target_indptr"])
+    return [rules["measurements"][i] for i in np.asarray(rules["order"])[counts > 0]]
+
+def blend_rules(rules, input_features, target_features):
+    """The predictor's blend passes (see predictor.compile_blend_rules), straight from the arrays.
+
+    Proportion and offset rules whose base is a model input and whose target is a
+    model target are kept; a rule's pass is its position among the kept rules of
+    its target.
+    """
+    input_index = {col: i for i, col in enumerate(input_features)}
+    target_index = {col: i for i, col in enumerate(target_features)}
+    as_input = np.array([input_index.get(name, -1) for name in rules["measurements"]], dtype=np.intp)
+    as_target = np.array([-1 if name in input_index else target_index.get(name, -1)
+                          for name in rules["measurements"]], dtype=np.intp)
+
+    rule_type, rule_base = np.asarray(rules["rule_type"]), np.asarray(rules["rule_base"])
+    multiplier, offset = np.asarray(rules["multiplier"]), np.asarray(rules["offset"])
+    proportion = (rule_type == RULE_TYPES.index("proportion")) & ~np.isnan(multiplier)
+    shifted = (rule_type == RULE_TYPES.index("offset")) & ~np.isnan(offset)
+    targets = as_target[np.asarray(rules["rule_target"])]
+    bases = np.where(rule_base >= 0, as_input[rule_base], -1)
+
+    selected = np.flatnonzero((targets >= 0) & (bases >= 0) & (proportion | shifted))
+    if not len(selected):
+        return []
+    positions = np.arange(len(selected))
+    starts = np.r_[True, targets[selected][1:] != targets[selected][:-1]]
+    rank = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+
+    passes = []
+    for r in range(rank.max() + 1):
+        in_pass = selected[rank == r]
+        passes.append({
+            "target": targets[in_pass].astype(np.intp),
+            "base": bases[in_pass].astype(np.intp),
+            "multiplier": np.where(proportion[in_pass], multiplier[in_pass], 1.0),
+            "offset": np.where(shifted[in_pass], offset[in_pass], 0.0),
+        })
+    return passes
+
+def compile_rules_module():
+    """Compile the generated fashion_rules.py exactly as excel_to_rules does"""
+    import fashion_rules
+
+    if not hasattr(fashion_rules, "PROCESSING_ORDER"):
+        raise SystemExit("❌ fashion_rules.py predates PROCESSING_ORDER; regenerate it with excel_to_rules.py")
+    return compile_rules(fashion_rules.CUSTOM_RULES, fashion_rules.PROCESSING_ORDER,
+                         fashion_rules.MEASUREMENT_DESCRIPTIONS)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile fashion_rules.py into the memory-mapped rules artifact")
+    parser.add_argument("--output", default=DEFAULT_RULES_DIR, help="artifact directory")
+    parser.add_argument("--check", action="store_true", help="only check that the artifact matches fashion_rules.py")
+    args = parser.parse_args()
+
+    compiled = compile_rules_module()
+    if not args.check:
+        write_rules_artifact(compiled, args.output)
+        print(f"✅ Compiled {len(compiled['rule_target'])} rules to: {args.output}")
+
+    started = time.perf_counter()
+    rules = load_rules_artifact(args.output)
+    print(f"⏱️ Loaded in {(time.perf_counter() - started) * 1e3:.2f} ms")
+    if rules["digest"] != rules_digest(compiled):
+        print("❌ Artifact is out of date: its digest differs from a fresh compile of fashion_rules.py")
+        raise SystemExit(1)
+    print(f"✅ {rules['rules']} rules match fashion_rules.py (digest {rules['digest'][:12]})")
+
+if __name__ == "__main__":
+    main()
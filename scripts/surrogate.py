@@ -0,0 +1,71 @@
+# surrogate.py
+# "Fast mode": a per-target ridge regression fitted to the full model's outputs, so a
+# prediction is one small matrix multiply instead of a pass over the tree ensemble.
+import numpy as np
+
+MODES = ("accurate", "fast")
+
+def with_missing_patterns(inputs, copies=2, missing=0.3, keep=(0,), seed=0):
+    """Stack `inputs` with copies whose optional columns are blanked at random.
+
+    Training rows are mostly complete, while requests usually are not; the copies
+    let the missing-value indicators learn what the model does for partial input.
+    Columns in `keep` (height) are never blanked.
+    """
+    rng = np.random.default_rng(seed)
+    inputs = np.asarray(inputs, dtype=float)
+    optional = np.ones(inputs.shape[1], dtype=bool)
+    optional[list(keep)] = False
+
+    stacked = [inputs]
+    for _ in range(copies):
+        masked = inputs.copy()
+        masked[(rng.random(inputs.shape) < missing) & optional] = np.nan
+        stacked.append(masked)
+    return np.vstack(stacked)
+
+def _design(inputs, means, scales):
+    """[standardized inputs with NaN → mean, missing indicators, intercept]"""
+    missing = np.isnan(inputs)
+    standardized = (np.where(missing, means, inputs) - means) / scales
+    return np.hstack([standardized, missing, np.ones((len(inputs), 1))])
+
+def fit_surrogate(inputs, model_outputs, target_features, truth=None, alpha=1.0,
+                  validation_fraction=0.1, seed=0):
+    """Closed-form ridge from (N, n_inputs) inputs to the model's (N, n_targets) outputs.
+
+    Returns the package entry: standardization, the (2 * n_inputs + 1, n_targets)
+    weight matrix and per-target MAE on held-out rows, against the full model and,
+    when `truth` is given, against the measured values.
+    """
+    inputs = np.asarray(inputs, dtype=float)
+    model_outputs = np.asarray(model_outputs, dtype=float)
+    held_out = np.random.default_rng(seed).random(len(inputs)) < validation_fraction
+    fit_rows = ~held_out if held_out.any() and (~held_out).any() else np.ones(len(inputs), dtype=bool)
+
+    means = np.nanmean(inputs[fit_rows], axis=0)
+    scales = np.nanstd(inputs[fit_rows], axis=0)
+    means = np.nan_to_num(means)
+    scales = np.where(np.nan_to_num(scales) > 0, np.nan_to_num(scales), 1.0)
+
+    design = _design(inputs[fit_rows], means, scales)
+    penalty = alpha * np.eye(design.shape[1])
+    penalty[-1, -1] = 0.0  # leave the intercept unpenalized
+    weights = np.linalg.solve(design.T @ design + penalty, design.T @ model_outputs[fit_rows])
+
+    surrogate = {"means": means, "scales": scales, "weights": weights, "alpha": alpha,
+                 "rows": int(fit_rows.sum())}
+    check = held_out if held_out.any() else fit_rows
+    predictions = _design(inputs[check], means, scales) @ weights
+    surrogate["mae_vs_model"] = dict(zip(
+        target_features, np.abs(predictions - model_outputs[check]).mean(axis=0).round(4).tolist()
+    ))
+    if truth is not None:
+        errors = np.abs(predictions - np.asarray(truth, dtype=float)[check])
+        surrogate["mae_vs_truth"] = dict(zip(target_features, np.nanmean(errors, axis=0).round(4).tolist()))
+    return surrogate
+
+def surrogate_predict(inputs, surrogate):
+    """(N, n_inputs) → (N, n_targets) with one matrix multiply"""
+    inputs = np.asarray(inputs, dtype=float)
+    return _design(inputs, surrogate["means"], surrogate["scales"]) @ surrogate["weights"]
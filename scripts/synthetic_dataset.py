@@ -0,0 +1,105 @@
+# synthetic_dataset.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+PERTURB_COLUMNS = ["height_cm", "waist_cm", "hip_cm", "bust_cm"]
+
+# Philox4x64 turns one counter value into four 64-bit words
+_WORDS_PER_BLOCK = 4
+
+class SyntheticDataset:
+    """Virtual augmented dataset whose rows are produced on demand.
+
+    Synthetic row i is source row i // copies (copy index i % copies) with uniform
+    noise added to the perturbed columns. The noise comes from a Philox generator
+    keyed by `seed` and positioned by counter at row i, so any slice can be
+    materialized without generating the rows before it, and every shard layout
+    gives identical values.
+    """
+
+    def __init__(self, source, copies=4, noise_range=(-2, 2), perturb_columns=PERTURB_COLUMNS, seed=None):
+        self.source = source.reset_index(drop=True)
+        self.copies = copies
+        self.noise_range = noise_range
+        self.perturb_columns = list(perturb_columns)
+        # Keep the drawn entropy so an unseeded dataset can still be reproduced
+        self.seed = np.random.SeedSequence().entropy if seed is None else seed
+        self._blocks_per_row = -(-len(self.perturb_columns) // _WORDS_PER_BLOCK)
+
+    def __len__(self):
+        return len(self.source) * self.copies
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("SyntheticDataset slices must be contiguous")
+            return self.materialize(start, stop)
+        index = range(len(self))[key]
+        return self.materialize(index, index + 1).iloc[0]
+
+    def noise(self, start, stop):
+        """Uniform noise of shape (stop - start, n_perturbed) for synthetic rows [start, stop)"""
+        n_rows = stop - start
+        width = self._blocks_per_row * _WORDS_PER_BLOCK
+        bit_generator = np.random.Philox(key=self.seed, counter=start * self._blocks_per_row)
+        raw = bit_generator.random_raw(n_rows * width).reshape(n_rows, width)
+        raw = raw[:, :len(self.perturb_columns)]
+
+        unit = (raw >> np.uint64(11)) * (1.0 / (1 << 53))  # 53-bit float in [0, 1)
+        low, high = self.noise_range
+        return low + (high - low) * unit
+
+    def materialize(self, start, stop):
+        """Build synthetic rows [start, stop) as a DataFrame"""
+        stop = min(stop, len(self))
+        rows = self.source.iloc[np.arange(start, stop) // self.copies].reset_index(drop=True)
+        noise = self.noise(start, stop)
+        for j, col in enumerate(self.perturb_columns):
+            # NaN + noise stays NaN, so missing cells are left missing
+            rows[col] = np.round(rows[col].to_numpy(dtype=float) + noise[:, j], 1)
+        return rows
+
+    def shards(self, n_shards):
+        """Split the row range into `n_shards` contiguous (start, stop) pairs"""
+        bounds = np.linspace(0, len(self), n_shards + 1).astype(int)
+        return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+# Per-process state for the shard pool: the dataset is shipped once per worker, not per task
+_worker_dataset = None
+_worker_transform = None
+
+def _init_worker(dataset, transform):
+    global _worker_dataset, _worker_transform
+    _worker_dataset, _worker_transform = dataset, transform
+
+def _fill_shard(task):
+    start, stop, path = task
+    # start None marks the shard of original rows
+    chunk = _worker_dataset.source.copy() if start is None else _worker_dataset.materialize(start, stop)
+    if _worker_transform is not None:
+        chunk = _worker_transform(chunk)
+    chunk.to_parquet(path, index=False)
+    return path, len(chunk)
+
+def generate_parallel(dataset, output_dir, n_shards=None, processes=None, transform=None, include_source=False):
+    """Materialize every shard in a process pool, one Parquet file per shard.
+
+    `transform` (a picklable top-level function) runs on each shard before writing,
+    e.g. rule filling and rounding. With `include_source`, shard 0 holds the original
+    rows, so the shards together hold originals + synthetic rows like augment_data.
+    Returns [(path, rows), ...] in shard order.
+    """
+    processes = processes or os.cpu_count() or 1
+    n_shards = n_shards or processes * 4
+    os.makedirs(output_dir, exist_ok=True)
+
+    ranges = ([(None, None)] if include_source else []) + dataset.shards(n_shards)
+    tasks = [
+        (start, stop, os.path.join(output_dir, f"part-{i:05d}.parquet"))
+        for i, (start, stop) in enumerate(ranges)
+    ]
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(dataset, transform)) as pool:
+        return list(pool.map(_fill_shard, tasks))